@@ -3,20 +3,43 @@
 This package contains the implementation of specialized AI agents for the automated
 software development pipeline using Gemini 2.0 Flash.
 """
+import importlib
 
-# Core agent classes
-from .base_agent import BaseAgent
-from .product_manager import ProductManager
-from .brainstorm_facilitator import BrainstormFacilitator
-from .architect import Architect
-from .planner import Planner
-from .engineer import Engineer
-from .reviewer import Reviewer
-from .qa_engineer import QAEngineer
-from .devops_manager import DevOpsManager
-from .monitoring_analytics import MonitoringAnalytics
-from .refactor_analyst import RefactorAnalyst
-from .documenter import Documenter
-from .project_manager import ProjectManager
+from ._gemini_client import load_env
+
+# Make .env settings visible to agents and CLIs as soon as the package is imported
+load_env()
+
+# Core agent classes, imported on first access so unused agents cost nothing
+_AGENT_MODULES = {
+    "BaseAgent": ".base_agent",
+    "ProductManager": ".product_manager",
+    "BrainstormFacilitator": ".brainstorm_facilitator",
+    "Architect": ".architect",
+    "Planner": ".planner",
+    "Engineer": ".engineer",
+    "Reviewer": ".reviewer",
+    "QAEngineer": ".qa_engineer",
+    "DevOpsManager": ".devops_manager",
+    "MonitoringAnalytics": ".monitoring_analytics",
+    "RefactorAnalyst": ".refactor_analyst",
+    "Documenter": ".documenter",
+    "ProjectManager": ".project_manager",
+}
+
+__all__ = list(_AGENT_MODULES)
 
 __version__ = "3.2.0"
+
+def __getattr__(name: str):
+    """Import an agent class the first time it is requested."""
+    module_name = _AGENT_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,77 @@
+"""
+Single-pass structural analysis of Python syntax trees.
+"""
+import ast
+from typing import Dict, List
+
+# Branch points counted toward cyclomatic complexity; a BoolOp adds one per extra operand
+DECISION_NODES = (ast.If, ast.While, ast.For, ast.ExceptHandler)
+MAX_FUNCTION_COMPLEXITY = 10
+MAX_FUNCTION_RETURNS = 3
+MAX_TRY_BODY = 15
+
+class CodeCollector(ast.NodeVisitor):
+    """Gather names, imports, complexity and issues of a module in a single traversal.
+
+    A function's or class's complexity and return count cover its whole body, nested
+    definitions included, as a standalone walk of that node would.
+    """
+
+    def __init__(self):
+        self.imports: List[str] = []
+        self.from_imports: List[str] = []
+        self.classes: List[str] = []
+        self.functions: List[str] = []
+        self.complexity: Dict[str, int] = {}
+        self.issues: List[str] = []
+        # [decision points, returns] of each enclosing function or class, innermost last
+        self._scopes: List[List[int]] = []
+
+    def visit_Import(self, node: ast.Import) -> None:
+        self.imports.append(node.names[0].name)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        self.from_imports.extend(f"{node.module}.{name.name}" for name in node.names)
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self.classes.append(node.name)
+        self._visit_scope(node)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self.functions.append(node.name)
+        decisions, returns = self._visit_scope(node)
+        if decisions + 1 > MAX_FUNCTION_COMPLEXITY:
+            self.issues.append(f"High complexity in function {node.name}")
+        if returns > MAX_FUNCTION_RETURNS:
+            self.issues.append(f"Multiple return statements in {node.name}")
+
+    def _visit_scope(self, node: ast.AST) -> List[int]:
+        """Visit a function or class body and record its complexity; returns its counts."""
+        self._scopes.append([0, 0])
+        self.generic_visit(node)
+        counts = self._scopes.pop()
+        if self._scopes:
+            self._scopes[-1][0] += counts[0]
+            self._scopes[-1][1] += counts[1]
+        self.complexity[node.name] = counts[0] + 1
+        return counts
+
+    def visit_Try(self, node: ast.Try) -> None:
+        if len(node.body) > MAX_TRY_BODY:
+            self.issues.append("Large try-except block detected")
+        self.generic_visit(node)
+
+    def visit_Return(self, node: ast.Return) -> None:
+        if self._scopes:
+            self._scopes[-1][1] += 1
+        self.generic_visit(node)
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> None:
+        if self._scopes:
+            self._scopes[-1][0] += len(node.values) - 1
+        self.generic_visit(node)
+
+    def generic_visit(self, node: ast.AST) -> None:
+        if self._scopes and isinstance(node, DECISION_NODES):
+            self._scopes[-1][0] += 1
+        super().generic_visit(node)
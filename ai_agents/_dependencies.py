@@ -0,0 +1,22 @@
+"""
+Dependency names found in source code by a regex scan, without parsing it.
+"""
+import re
+from typing import List
+
+# Python and CommonJS imports in one scan; the lookahead leaves a from-import's
+# "import <name>" for the first branch to pick up, as separate searches would.
+# No branch can backtrack more than a token, so the scan stays linear in the source size.
+DEPENDENCY_PATTERN = re.compile(r"""import\s+(\w+)|from\s+(\w+)\s+(?=import)|require\s*\(\s*['"]([^'"\n]+)['"]\s*\)""")
+
+def extract_dependencies(code: str) -> List[str]:
+    """Return the modules ``code`` imports or requires, in no particular order.
+
+    This works on any source text, parsable or not, and costs one regex scan; use it
+    when dependency names are all that is needed.
+    """
+    # Every branch needs one of these literals; substring search is far cheaper than the regex scan
+    if "import" not in code and "require" not in code:
+        return []
+    # Exactly one group matches per hit, and it is the last one that took part
+    return list({match[match.lastindex] for match in DEPENDENCY_PATTERN.finditer(code)})
@@ -0,0 +1,21 @@
+"""
+Pickle and copy support for frozen dataclasses that list their ``__slots__`` by hand.
+"""
+from dataclasses import fields
+from typing import Any, Tuple
+
+class FrozenSlots:
+    """Base for ``@dataclass(frozen=True)`` classes with hand-written ``__slots__``.
+
+    Restoring a slotted instance sets its fields one by one, which a frozen dataclass
+    rejects; this restores them through ``object.__setattr__``, as the methods
+    generated by ``dataclass(slots=True)`` on Python 3.10+ do.
+    """
+    __slots__ = ()
+
+    def __getstate__(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, field.name) for field in fields(self))
+
+    def __setstate__(self, state: Tuple[Any, ...]) -> None:
+        for field, value in zip(fields(self), state):
+            object.__setattr__(self, field.name, value)
@@ -0,0 +1,194 @@
+"""
+Process-wide Gemini setup shared by the agents.
+"""
+from typing import Annotated, Any, Dict, Optional, Tuple
+from functools import lru_cache
+import asyncio
+import os
+import pathlib
+import orjson
+import google.generativeai as genai
+from dotenv import load_dotenv
+from google.api_core import exceptions as google_exceptions
+from loguru import logger
+from pydantic import BeforeValidator, TypeAdapter, ValidationError, WithJsonSchema
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+from ._llm_cache import cached_generate
+
+# Quota and transient server errors worth backing off on
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+)
+
+# Appended to a prompt whose reply failed validation
+REASK_INSTRUCTIONS = ("Your previous reply did not match the required JSON schema:\n{errors}\n"
+                      "Reply again with only JSON that matches the schema exactly.")
+
+def default_concurrency() -> int:
+    """Maximum in-flight Gemini requests per agent, from GEMINI_CONCURRENCY."""
+    return int(os.getenv("GEMINI_CONCURRENCY", "8"))
+
+@lru_cache(maxsize=1)
+def load_env() -> None:
+    """Load the project .env once per process."""
+    env_path = pathlib.Path(__file__).resolve().parent.parent / '.env'
+    load_dotenv(dotenv_path=env_path)
+
+@lru_cache(maxsize=1)
+def gemini_api_key() -> str:
+    """Return GEMINI_API_KEY, read once after the .env has been loaded."""
+    load_env()
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY environment variable not set")
+    return api_key
+
+@lru_cache(maxsize=1)
+def configure_gemini() -> None:
+    """Configure the Gemini SDK once per process."""
+    genai.configure(api_key=gemini_api_key())
+
+# A model opens its gRPC channels on first use and keeps them; sharing it keeps one
+# long-lived HTTP/2 connection per process instead of a handshake per agent
+@lru_cache(maxsize=None)
+def get_model(model: str) -> genai.GenerativeModel:
+    """Return the shared GenerativeModel for ``model``, configuring Gemini first."""
+    configure_gemini()
+    return genai.GenerativeModel(model)
+
+def retrying() -> AsyncRetrying:
+    """Retry policy for Gemini calls: up to five attempts with jittered exponential backoff."""
+    return AsyncRetrying(retry=retry_if_exception_type(RETRYABLE_ERRORS),
+                         wait=wait_exponential_jitter(initial=1, max=30),
+                         stop=stop_after_attempt(5),
+                         reraise=True)
+
+async def generate_with_retry(client: Any,
+                              prompt: str,
+                              *,
+                              namespace: str,
+                              semaphore: asyncio.Semaphore,
+                              **kwargs) -> str:
+    """Run ``cached_generate`` under ``semaphore``, retrying 429/5xx with jittered backoff."""
+    async for attempt in retrying():
+        with attempt:
+            async with semaphore:
+                return await cached_generate(client, prompt, namespace=namespace, **kwargs)
+
+async def generate_validated(client: Any,
+                             prompt: str,
+                             *,
+                             namespace: str,
+                             semaphore: asyncio.Semaphore,
+                             schema: Any,
+                             exclude: Tuple[str, ...] = (),
+                             reask: bool = True,
+                             **kwargs) -> Any:
+    """Generate structured JSON for ``schema`` and return it validated.
+
+    A reply that fails validation is re-asked once with the validation errors
+    appended, unless ``reask`` is False. Only replies that validate are stored in
+    the response cache.
+    """
+    adapter = type_adapter(schema)
+    generation_config = json_generation_config(schema, exclude)
+    try:
+        text = await generate_with_retry(client, prompt, namespace=namespace, semaphore=semaphore,
+                                         generation_config=generation_config,
+                                         validate=adapter.validate_json, **kwargs)
+        return adapter.validate_json(text)
+    except ValidationError as e:
+        if not reask:
+            raise
+        errors = str(e)
+        logger.warning(f"{namespace} reply did not match its schema, asking again: {errors}")
+
+    retry_prompt = f"{prompt}\n\n{REASK_INSTRUCTIONS.format(errors=errors)}"
+    text = await generate_with_retry(client, retry_prompt, namespace=namespace, semaphore=semaphore,
+                                     generation_config=generation_config,
+                                     validate=adapter.validate_json, **kwargs)
+    return adapter.validate_json(text)
+
+def _decode_json_text(value: Any) -> Any:
+    """Parse a JSON-encoded reply field; blank strings mean the field was left empty."""
+    if not isinstance(value, str):
+        return value
+    if not value.strip():
+        return None
+    try:
+        return orjson.loads(value)
+    except orjson.JSONDecodeError:
+        return value
+
+def json_text(tp: Any) -> Any:
+    """Annotate ``tp`` to be requested from Gemini as a JSON-encoded string.
+
+    Gemini schemas cannot describe free-form maps, so fields such as ``Dict[str, Any]``
+    are asked for as a string holding JSON and decoded again before validation.
+    """
+    return Annotated[tp, BeforeValidator(_decode_json_text),
+                     WithJsonSchema({"type": "string", "description": "A JSON object encoded as a string"})]
+
+@lru_cache(maxsize=None)
+def type_adapter(tp: Any) -> TypeAdapter:
+    """Return a shared TypeAdapter for ``tp``; building one is the expensive part."""
+    return TypeAdapter(tp)
+
+def json_generation_config(tp: Any, exclude: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """Generation config that constrains the response to JSON matching ``tp``."""
+    return {"response_mime_type": "application/json", "response_schema": response_schema(tp, exclude)}
+
+@lru_cache(maxsize=None)
+def response_schema(tp: Any, exclude: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """Convert a pydantic type into a Gemini ``response_schema`` dict.
+
+    Gemini schemas have no ``$ref``, ``anyOf`` or free-form map support, so refs are
+    inlined and ``Optional`` becomes ``nullable``. Dict fields should be declared with
+    ``json_text`` so they are requested as JSON strings; any other untyped dict field
+    is left out of the schema. Top-level fields named in ``exclude`` are dropped so the
+    caller can fill them in itself.
+    """
+    schema = type_adapter(tp).json_schema()
+    for name in exclude:
+        schema.get("properties", {}).pop(name, None)
+    return _convert_schema(schema, schema.pop("$defs", {}))
+
+def _convert_schema(node: Dict[str, Any], defs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Recursively map one JSON-schema node; returns None for unrepresentable nodes."""
+    if "$ref" in node:
+        return _convert_schema(defs[node["$ref"].rsplit("/", 1)[-1]], defs)
+
+    if "anyOf" in node:
+        variants = [v for v in node["anyOf"] if v.get("type") != "null"]
+        if len(variants) != 1:
+            return None
+        converted = _convert_schema(variants[0], defs)
+        if converted is not None:
+            converted["nullable"] = True
+        return converted
+
+    if "type" not in node:
+        return None
+
+    converted = {"type": node["type"]}
+    if "description" in node:
+        converted["description"] = node["description"]
+    if node["type"] == "object":
+        properties = {}
+        for name, value in node.get("properties", {}).items():
+            prop = _convert_schema(value, defs)
+            if prop is not None:
+                properties[name] = prop
+        if not properties:
+            return None
+        converted["properties"] = properties
+        converted["required"] = [name for name in node.get("required", []) if name in properties]
+    elif node["type"] == "array":
+        items = _convert_schema(node.get("items", {"type": "string"}), defs)
+        if items is None:
+            return None
+        converted["items"] = items
+    return converted
@@ -0,0 +1,342 @@
+"""
+Response cache for Gemini calls, shared by agents that issue repeatable prompts.
+"""
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from functools import lru_cache
+from pathlib import Path
+import asyncio
+import hashlib
+import os
+import time
+import orjson
+import google.generativeai as genai
+from loguru import logger
+
+# numpy is only needed by the opt-in semantic tier, so it is imported where that tier runs
+if TYPE_CHECKING:
+    import numpy as np
+
+EMBEDDING_MODEL = "models/text-embedding-004"
+DEFAULT_CACHE_DIR = "~/.cache/aiaw/llm"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 2000
+
+# Requests currently waiting on Gemini, keyed like the exact cache tier
+_inflight: Dict[str, "asyncio.Future[str]"] = {}
+
+class ResponseCache:
+    """Two-tier response cache.
+
+    The exact tier maps a hash of (model, cached context, namespace, request
+    options, prompt) to the response text on disk. The optional semantic tier keeps
+    prompt embeddings in memory, persisted next to the responses, and serves a
+    stored response when a new prompt in the same scope is at least
+    ``similarity_threshold`` cosine-similar to a previous one. Entries expire after
+    ``ttl`` seconds and the oldest are dropped once there are more than ``max_entries``.
+    """
+
+    def __init__(self,
+                 directory: Optional[str] = None,
+                 similarity_threshold: Optional[float] = None,
+                 ttl: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.directory = Path(directory or DEFAULT_CACHE_DIR).expanduser()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._count = sum(1 for _ in self.directory.glob("*.txt"))
+
+        # Semantic index: parallel lists of (namespace, key) and unit-norm vectors
+        self._entries: List[Tuple[str, str]] = []
+        self._vectors: List["np.ndarray"] = []
+        if self.similarity_threshold:
+            self._load_vectors()
+
+    @staticmethod
+    def make_key(client: Any, namespace: str, prompt: str,
+                 options: Optional[Dict[str, Any]] = None) -> str:
+        """Build the exact-match key for a prompt sent through ``client`` with ``options``."""
+        model = getattr(client, "model_name", "")
+        cached_content = getattr(client, "cached_content", None) or ""
+        material = f"{model}|{cached_content}|{scope(namespace, options)}|{prompt}"
+        return hashlib.blake2b(material.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the stored response for ``key``, if any and not yet expired."""
+        path = self.directory / f"{key}.txt"
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                self.delete(key)
+                return None
+            return path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def delete(self, key: str) -> None:
+        """Drop ``key`` from both tiers."""
+        for suffix in (".txt", ".npz"):
+            try:
+                (self.directory / f"{key}{suffix}").unlink()
+                if suffix == ".txt":
+                    self._count -= 1
+            except FileNotFoundError:
+                pass
+
+        for index, (_, entry_key) in enumerate(self._entries):
+            if entry_key == key:
+                del self._entries[index]
+                del self._vectors[index]
+                break
+
+    def set(self, key: str, text: str) -> None:
+        """Store a response atomically so concurrent readers never see partial writes."""
+        path = self.directory / f"{key}.txt"
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        exists = path.exists()
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+        if not exists:
+            self._count += 1
+            if self._count > self.max_entries:
+                self._prune()
+
+    def _prune(self) -> None:
+        """Drop the oldest responses until the cache is back within ``max_entries``."""
+        entries = []
+        for path in self.directory.glob("*.txt"):
+            try:
+                entries.append((path.stat().st_mtime, path.stem))
+            except FileNotFoundError:
+                pass
+        self._count = len(entries)
+
+        entries.sort()
+        for _, key in entries[:len(entries) - self.max_entries]:
+            self.delete(key)
+
+    async def embed(self, prompt: str) -> "np.ndarray":
+        """Embed a prompt as a unit-norm vector for the semantic tier."""
+        import numpy as np
+        result = await genai.embed_content_async(model=EMBEDDING_MODEL, content=prompt)
+        vector = np.asarray(result["embedding"], dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def find_similar(self, namespace: str, vector: "np.ndarray") -> Optional[str]:
+        """Return the key of the closest prompt in ``namespace`` above the threshold.
+
+        ``namespace`` is the request scope, as returned by ``scope``.
+        """
+        import numpy as np
+        candidates = [i for i, (ns, _) in enumerate(self._entries) if ns == namespace]
+        if not candidates:
+            return None
+
+        scores = np.stack([self._vectors[i] for i in candidates]) @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+        return self._entries[candidates[best]][1]
+
+    def add_vector(self, namespace: str, key: str, vector: "np.ndarray") -> None:
+        """Index a prompt embedding for later similarity lookups and persist it."""
+        import numpy as np
+        self._entries.append((namespace, key))
+        self._vectors.append(vector)
+
+        path = self.directory / f"{key}.npz"
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, namespace=namespace, vector=vector)
+        os.replace(tmp_path, path)
+
+    def _load_vectors(self) -> None:
+        """Restore the semantic index persisted by earlier runs."""
+        import numpy as np
+        for path in self.directory.glob("*.npz"):
+            with np.load(path) as data:
+                self._entries.append((str(data["namespace"]), path.stem))
+                self._vectors.append(data["vector"])
+
+def get_response_cache(persist: bool = False) -> Optional[ResponseCache]:
+    """Return the process-wide cache, or None when responses should not be stored.
+
+    GEMINI_RESPONSE_CACHE=1 enables the cache for every call and =0 disables it for
+    all of them; when it is unset, only call sites that ask to ``persist`` use it.
+    """
+    setting = os.getenv("GEMINI_RESPONSE_CACHE", "")
+    if setting == "0" or (setting != "1" and not persist):
+        return None
+    return _shared_response_cache()
+
+@lru_cache(maxsize=1)
+def _shared_response_cache() -> ResponseCache:
+    """Build the process-wide cache from the GEMINI_RESPONSE_CACHE_* settings."""
+    threshold = os.getenv("GEMINI_SEMANTIC_CACHE_THRESHOLD")
+    return ResponseCache(
+        directory=os.getenv("GEMINI_RESPONSE_CACHE_DIR"),
+        similarity_threshold=float(threshold) if threshold else None,
+        ttl=float(os.getenv("GEMINI_RESPONSE_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+        max_entries=int(os.getenv("GEMINI_RESPONSE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+    )
+
+def scope(namespace: str, options: Optional[Dict[str, Any]]) -> str:
+    """Combine ``namespace`` with a digest of the request options sent alongside the prompt.
+
+    Generation configs, schemas and safety settings change the reply, so requests that
+    differ only in those never share cache entries.
+    """
+    if not options:
+        return namespace
+    encoded = orjson.dumps(options, default=repr,
+                           option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return f"{namespace}#{hashlib.blake2b(encoded, digest_size=8).hexdigest()}"
+
+def _is_sampled(options: Optional[Dict[str, Any]]) -> bool:
+    """Whether ``options`` ask for a non-zero temperature, so replies are meant to vary."""
+    if not options:
+        return False
+    temperature = options.get("temperature")
+    if temperature is None:
+        config = options.get("generation_config")
+        if isinstance(config, dict):
+            temperature = config.get("temperature")
+        else:
+            temperature = getattr(config, "temperature", None)
+    return bool(temperature)
+
+async def _generate_text(client: Any,
+                         prompt: str,
+                         *,
+                         namespace: str,
+                         stream: bool,
+                         on_chunk: Optional[Callable[[str], None]],
+                         **kwargs) -> str:
+    """Call Gemini and return the full response text, streaming it when asked."""
+    if not stream:
+        response = await client.generate_content_async(prompt, **kwargs)
+        return response.text
+
+    started = time.perf_counter()
+    response = await client.generate_content_async(prompt, stream=True, **kwargs)
+    first_chunk = True
+    async for chunk in response:
+        if first_chunk:
+            logger.debug("{}: first chunk after {:.2f}s", namespace, time.perf_counter() - started)
+            first_chunk = False
+        if on_chunk:
+            on_chunk(chunk.text)
+    # The streamed response aggregates its chunks once fully consumed
+    return response.text
+
+async def cached_generate(client: Any,
+                          prompt: str,
+                          *,
+                          namespace: str,
+                          stream: bool = False,
+                          on_chunk: Optional[Callable[[str], None]] = None,
+                          validate: Optional[Callable[[str], Any]] = None,
+                          persist: bool = False,
+                          **kwargs) -> str:
+    """Return the response text for ``prompt``, calling Gemini only on a cache miss.
+
+    ``namespace`` identifies the call site so identical prompts used for different
+    purposes never share entries. With ``stream`` the response is consumed chunk by
+    chunk, passing each piece to ``on_chunk``. ``persist`` opts this call site into
+    the disk cache unless GEMINI_RESPONSE_CACHE=0. Extra keyword arguments are
+    forwarded to ``generate_content_async`` and are part of the cache key.
+    """
+    return await cached_text(
+        client, prompt, namespace=namespace, options=kwargs, validate=validate, persist=persist,
+        fetch=lambda: _generate_text(client, prompt, namespace=namespace,
+                                     stream=stream, on_chunk=on_chunk, **kwargs)
+    )
+
+async def cached_text(client: Any,
+                      prompt: str,
+                      *,
+                      namespace: str,
+                      fetch: Callable[[], Awaitable[str]],
+                      options: Optional[Dict[str, Any]] = None,
+                      validate: Optional[Callable[[str], Any]] = None,
+                      persist: bool = False) -> str:
+    """Return the cached text for ``prompt``, awaiting ``fetch`` only on a miss.
+
+    For callers with their own request path; ``client`` only contributes its model
+    name and cached context to the key, ``options`` the request settings. Requests
+    with a non-zero temperature bypass the disk cache. ``validate`` is called on the
+    reply before it is stored, and on stored replies before they are served; stored
+    replies that fail it are dropped. ``persist`` is passed to ``get_response_cache``.
+    Identical requests made while one is still in flight share its result instead of
+    calling Gemini again.
+    """
+    key = ResponseCache.make_key(client, namespace, prompt, options)
+    task = _inflight.get(key)
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.ensure_future(_lookup_or_fetch(client, prompt, key, namespace=namespace,
+                                                      fetch=fetch, options=options, validate=validate,
+                                                      persist=persist))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    else:
+        logger.debug("Joining in-flight request for {}", namespace)
+    # A cancelled caller must not cancel the request for the others waiting on it
+    return await asyncio.shield(task)
+
+async def _lookup_or_fetch(client: Any,
+                           prompt: str,
+                           key: str,
+                           *,
+                           namespace: str,
+                           fetch: Callable[[], Awaitable[str]],
+                           options: Optional[Dict[str, Any]],
+                           validate: Optional[Callable[[str], Any]],
+                           persist: bool) -> str:
+    """Serve ``key`` from the cache tiers, falling back to ``fetch``."""
+    cache = get_response_cache(persist)
+    if cache is None or _is_sampled(options):
+        return await fetch()
+
+    text = _valid_entry(cache, key, validate)
+    if text is not None:
+        logger.debug("Response cache hit for {}", namespace)
+        return text
+
+    # Prompts answered from a server-side context cache are not comparable by embedding
+    vector = None
+    request_scope = scope(namespace, options)
+    if cache.similarity_threshold and not getattr(client, "cached_content", None):
+        try:
+            vector = await cache.embed(prompt)
+            similar_key = cache.find_similar(request_scope, vector)
+            text = _valid_entry(cache, similar_key, validate) if similar_key else None
+            if text is not None:
+                logger.debug("Semantic response cache hit for {}", namespace)
+                return text
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed for {namespace}: {str(e)}")
+            vector = None
+
+    text = await fetch()
+    # Replies the caller rejects are never stored
+    if validate is not None:
+        validate(text)
+
+    cache.set(key, text)
+    if vector is not None:
+        cache.add_vector(request_scope, key, vector)
+    return text
+
+def _valid_entry(cache: ResponseCache, key: str,
+                 validate: Optional[Callable[[str], Any]]) -> Optional[str]:
+    """Return the stored reply for ``key``, dropping it if it fails ``validate``."""
+    text = cache.get(key)
+    if text is None or validate is None:
+        return text
+    try:
+        validate(text)
+    except Exception:
+        logger.debug("Dropping cached reply that no longer validates: {}", key)
+        cache.delete(key)
+        return None
+    return text
@@ -0,0 +1,73 @@
+"""
+Outline summaries of Python sources, used to keep code prompts small.
+"""
+import ast
+from typing import List, Union
+
+FunctionNode = Union[ast.FunctionDef, ast.AsyncFunctionDef]
+
+def summarize_python(source: str, max_body_lines: int = 3) -> str:
+    """Reduce ``source`` to the outline a documentation prompt needs.
+
+    Imports, one-line module assignments, class attributes, decorators, signatures and
+    docstrings are kept verbatim; each function body is cut to its first ``max_body_lines``
+    lines. Sources that do not parse are returned unchanged.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return source
+
+    lines = source.splitlines()
+    out: List[str] = []
+    _summarize_body(tree.body, lines, out, max_body_lines, in_class=False)
+    return "\n".join(out) + "\n" if out else ""
+
+def _segment(lines: List[str], node: ast.AST) -> List[str]:
+    """Source lines spanned by ``node``."""
+    return lines[node.lineno - 1:node.end_lineno]
+
+def _is_docstring(node: ast.stmt) -> bool:
+    return (isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)
+            and isinstance(node.value.value, str))
+
+def _summarize_body(body: List[ast.stmt], lines: List[str], out: List[str],
+                    max_body_lines: int, *, in_class: bool) -> None:
+    """Append the outline of a module or class body to ``out``."""
+    for index, node in enumerate(body):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            _summarize_function(node, lines, out, max_body_lines)
+        elif isinstance(node, ast.ClassDef):
+            _header(node, lines, out)
+            if node.body[0].lineno > node.lineno:
+                _summarize_body(node.body, lines, out, max_body_lines, in_class=True)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)) or (index == 0 and _is_docstring(node)):
+            out.extend(_segment(lines, node))
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)) and (in_class or node.end_lineno == node.lineno):
+            out.extend(_segment(lines, node))
+
+def _header(node: Union[FunctionNode, ast.ClassDef], lines: List[str], out: List[str]) -> None:
+    """Append the decorators and signature of ``node``, up to where its body starts."""
+    start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+    body_start = node.body[0].lineno
+    # A one-line definition has its body on the signature line
+    out.extend(lines[start - 1:max(body_start - 1, node.lineno)])
+
+def _summarize_function(node: FunctionNode, lines: List[str], out: List[str], max_body_lines: int) -> None:
+    """Append a function's signature, docstring and the first lines of its body."""
+    _header(node, lines, out)
+    if node.body[0].lineno == node.lineno:
+        return
+
+    body = node.body
+    if _is_docstring(body[0]):
+        out.extend(_segment(lines, body[0]))
+        body = body[1:]
+    if not body:
+        return
+
+    kept = lines[body[0].lineno - 1:body[-1].end_lineno]
+    out.extend(kept[:max_body_lines])
+    if len(kept) > max_body_lines:
+        indent = kept[0][:len(kept[0]) - len(kept[0].lstrip())]
+        out.append(f"{indent}...")
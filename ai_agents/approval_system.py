@@ -1,12 +1,20 @@
-import os
 from typing import Dict, Any, Optional, List
-from dotenv import load_dotenv
-import google.generativeai as genai
+from collections import OrderedDict
+import hashlib
 import pathlib
 from loguru import logger
-import json
+import orjson
 from pydantic import BaseModel
 import datetime
+import asyncio
+from ._gemini_client import default_concurrency, generate_validated, get_model
+
+# Validation results kept in memory per ApprovalSystem, least recently used evicted first
+VALIDATION_MEMO_SIZE = 256
+
+def _to_json(data: Any) -> str:
+    """Serialize prompt content as indented JSON."""
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
 
 class ValidationResult(BaseModel):
     is_approved: bool
@@ -21,33 +29,36 @@ class ApprovalSystem:
     def __init__(self, model: str = "gemini-2.0-flash"):
         """Initialize the approval system with Gemini configuration."""
         self.model = model
-        
-        # Load environment variables from local .env
-        current_dir = pathlib.Path(__file__).parent.parent.absolute()
-        env_path = current_dir / '.env'
-        load_dotenv(dotenv_path=env_path)
-        
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-            
-        # Initialize Gemini
-        genai.configure(api_key=api_key)
-        self.client = genai.GenerativeModel(self.model)
-        
-        # Test connection
-        try:
-            response = self.client.generate_content("Test connection")
-            logger.info("Successfully connected to Gemini API")
-        except Exception as e:
-            logger.error(f"Failed to connect to Gemini API: {str(e)}")
-            raise
-    
+        self.client = get_model(self.model)
+        self._sem = asyncio.Semaphore(default_concurrency())
+        self._memo: "OrderedDict[bytes, Any]" = OrderedDict()
+
+    async def _call(self, prompt: str, *, namespace: str, schema: Any) -> Any:
+        """Send a prompt to Gemini and return the reply validated as ``schema``.
+
+        Results are memoized on the prompt, which embeds the validated content,
+        role and context, so resubmitting unchanged content costs a dict lookup.
+        """
+        key = hashlib.blake2b(f"{namespace}|{prompt}".encode("utf-8"), digest_size=16).digest()
+        result = self._memo.get(key)
+        if result is not None:
+            self._memo.move_to_end(key)
+            return result
+
+        result = await generate_validated(self.client, prompt,
+                                          namespace=namespace,
+                                          semaphore=self._sem,
+                                          schema=schema)
+        self._memo[key] = result
+        if len(self._memo) > VALIDATION_MEMO_SIZE:
+            self._memo.popitem(last=False)
+        return result
+
     async def validate_product_specs(self, specs: Dict[str, Any]) -> ValidationResult:
         """Validate product specifications."""
         prompt = f"""Validate the following product specifications for completeness and clarity:
 
-        {json.dumps(specs, indent=2)}
+        {_to_json(specs)}
 
         Consider:
         1. Are all required fields present and properly defined?
@@ -63,9 +74,8 @@ class ApprovalSystem:
         """
         
         try:
-            response = await self.client.generate_content(prompt)
-            validation = json.loads(response.text)
-            return ValidationResult(**validation)
+            return await self._call(prompt, namespace="approval.product_specs",
+                                    schema=ValidationResult)
         except Exception as e:
             logger.error(f"Error validating product specs: {str(e)}")
             return ValidationResult(
@@ -79,10 +89,10 @@ class ApprovalSystem:
         prompt = f"""Validate the following system architecture against the product specifications:
 
         Product Specifications:
-        {json.dumps(specs, indent=2)}
+        {_to_json(specs)}
 
         System Architecture:
-        {json.dumps(architecture, indent=2)}
+        {_to_json(architecture)}
 
         Consider:
         1. Does the architecture satisfy all requirements?
@@ -98,9 +108,8 @@ class ApprovalSystem:
         """
         
         try:
-            response = await self.client.generate_content(prompt)
-            validation = json.loads(response.text)
-            return ValidationResult(**validation)
+            return await self._call(prompt, namespace="approval.architecture",
+                                    schema=ValidationResult)
         except Exception as e:
             logger.error(f"Error validating architecture: {str(e)}")
             return ValidationResult(
@@ -115,10 +124,10 @@ class ApprovalSystem:
                                      context: Optional[Dict[str, Any]] = None) -> RoleFeedback:
         """Cross-validate content with another role's perspective."""
         # Add context if provided
-        context_str = f"\nAdditional Context:\n{json.dumps(context, indent=2)}" if context else ""
+        context_str = f"\nAdditional Context:\n{_to_json(context)}" if context else ""
         prompt = f"""From the perspective of a {role}, review this content:
 
-        {json.dumps(content, indent=2)}
+        {_to_json(content)}
         {context_str}
 
         Provide feedback considering your role's specific concerns and expertise.
@@ -128,9 +137,8 @@ class ApprovalSystem:
         """
         
         try:
-            response = await self.client.generate_content(prompt)
-            feedback = json.loads(response.text)
-            return RoleFeedback(**feedback)
+            return await self._call(prompt, namespace="approval.cross_validation",
+                                    schema=RoleFeedback)
         except Exception as e:
             logger.error(f"Error in cross-validation with {role}: {str(e)}")
             return RoleFeedback(
@@ -138,7 +146,7 @@ class ApprovalSystem:
                 suggestions=["Please retry the validation process"]
             )
     
-    def save_validation_report(self, 
+    async def save_validation_report(self, 
                              result: ValidationResult,
                              artifact_type: str,
                              artifact_id: str) -> str:
@@ -149,8 +157,8 @@ class ApprovalSystem:
         
         report_path = report_dir / f"{artifact_type}_{artifact_id}_{timestamp}.json"
         
-        with open(report_path, "w") as f:
-            json.dump(result.dict(), f, indent=2)
+        # Keep the event loop free while the report is written
+        await asyncio.to_thread(report_path.write_text, result.model_dump_json(indent=2))
         
         logger.info(f"Validation report saved to {report_path}")
         return str(report_path)
@@ -1,35 +1,76 @@
 import click
 from loguru import logger
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import google.generativeai as genai
-import os
-from dotenv import load_dotenv
+from google.generativeai import caching
 import pathlib
-from pydantic import BaseModel
-import json
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+import io
+import orjson
 import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta
+from ._gemini_client import default_concurrency, generate_validated, generate_with_retry, get_model, json_text, type_adapter
+
+# Gemini only accepts explicit context caches above a minimum size
+CONTEXT_CACHE_MIN_TOKENS = 2048
+CONTEXT_CACHE_TTL = timedelta(minutes=10)
+# Rough chars-per-token ratio used to size prompts without a count_tokens round-trip
+CHARS_PER_TOKEN = 4
+# Inputs up to this size are designed in a single call before falling back to one call per section
+ONESHOT_MAX_INPUT_TOKENS = 32_000
+
+def _to_json(data: Any) -> str:
+    """Serialize prompt context as indented JSON."""
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+
+def _bullets(items: List[str]) -> str:
+    """Render a markdown bullet list."""
+    return "\n".join(f"- {item}" for item in items)
+
+def _brainstorm_source(brainstorm_file: str) -> str:
+    """Prefer the JSON outcome saved next to a brainstorm markdown file."""
+    path = pathlib.Path(brainstorm_file)
+    json_path = path.with_suffix(".json")
+    return str(json_path) if path.suffix != ".json" and json_path.exists() else brainstorm_file
+
+def _json_or_na(data: Any) -> str:
+    """Render an optional JSON section, or N/A when it is empty."""
+    return _to_json(data) if data else "N/A"
+
+# Compile schemas at import instead of on first validation
+_MODEL_CONFIG = ConfigDict(defer_build=False, validate_assignment=False, extra='ignore')
+
+# Free-form maps are requested from Gemini as JSON strings
+JsonMap = json_text(Dict[str, Any])
+StrMap = json_text(Dict[str, str])
+StrListMap = json_text(Dict[str, List[str]])
 
 class TechStack(BaseModel):
+    model_config = _MODEL_CONFIG
+
     frontend: List[str]
     backend: List[str]
     database: List[str]
     infrastructure: List[str]
     tools_and_services: List[str]
-    version_constraints: Optional[Dict[str, str]] = None
+    version_constraints: Optional[StrMap] = None
     integration_points: Optional[List[str]] = None
 
 class Component(BaseModel):
+    model_config = _MODEL_CONFIG
+
     name: str
     description: str
     responsibilities: List[str]
     dependencies: List[str]
     technical_requirements: List[str]
-    api_endpoints: Optional[List[Dict[str, Any]]] = None
-    performance_requirements: Optional[Dict[str, str]] = None
+    api_endpoints: Optional[List[JsonMap]] = None
+    performance_requirements: Optional[StrMap] = None
     testing_strategy: Optional[List[str]] = None
 
 class DataFlow(BaseModel):
+    model_config = _MODEL_CONFIG
+
     source: str
     destination: str
     description: str
@@ -37,17 +78,21 @@ class DataFlow(BaseModel):
     frequency: str
     security_requirements: List[str]
     validation_rules: Optional[List[str]] = None
-    error_handling: Optional[Dict[str, str]] = None
+    error_handling: Optional[StrMap] = None
     monitoring_metrics: Optional[List[str]] = None
 
 class SecurityMeasure(BaseModel):
+    model_config = _MODEL_CONFIG
+
     category: str
     measures: List[str]
     implementation_priority: str
     compliance_requirements: Optional[List[str]] = None
-    threat_mitigations: Optional[Dict[str, List[str]]] = None
+    threat_mitigations: Optional[StrListMap] = None
 
 class DeploymentStage(BaseModel):
+    model_config = _MODEL_CONFIG
+
     name: str
     components: List[str]
     prerequisites: List[str]
@@ -55,9 +100,22 @@ class DeploymentStage(BaseModel):
     rollback_plan: List[str]
     monitoring_metrics: Optional[List[str]] = None
     automation_scripts: Optional[List[str]] = None
-    environment_config: Optional[Dict[str, Any]] = None
+    environment_config: Optional[JsonMap] = None
+
+class ArchitectureOverview(BaseModel):
+    model_config = _MODEL_CONFIG
+
+    overview: str
+    design_patterns: List[str]
+    scalability_considerations: List[str]
+    monitoring_requirements: List[str]
+    api_documentation: Optional[JsonMap] = None
+    performance_benchmarks: Optional[JsonMap] = None
+    disaster_recovery_plan: Optional[JsonMap] = None
 
 class SystemArchitecture(BaseModel):
+    model_config = _MODEL_CONFIG
+
     overview: str
     components: List[Component]
     data_flows: List[DataFlow]
@@ -67,255 +125,352 @@ class SystemArchitecture(BaseModel):
     design_patterns: List[str]
     scalability_considerations: List[str]
     monitoring_requirements: List[str]
-    session_id: str = datetime.now().strftime("%Y%m%d_%H%M%S")
-    api_documentation: Optional[Dict[str, Any]] = None
-    performance_benchmarks: Optional[Dict[str, Any]] = None
-    disaster_recovery_plan: Optional[Dict[str, Any]] = None
+    session_id: str = Field(default_factory=lambda: datetime.now().strftime("%Y%m%d_%H%M%S"))
+    api_documentation: Optional[JsonMap] = None
+    performance_benchmarks: Optional[JsonMap] = None
+    disaster_recovery_plan: Optional[JsonMap] = None
+
+# Adapters are built once at import; per-call validation and dumping reuse them
+_COMPONENTS_ADAPTER = type_adapter(List[Component])
+_FLOWS_ADAPTER = type_adapter(List[DataFlow])
+_SEC_ADAPTER = type_adapter(List[SecurityMeasure])
+_STAGES_ADAPTER = type_adapter(List[DeploymentStage])
 
 class Architect:
     def __init__(self, model: str = "gemini-2.0-flash"):
         """Initialize the Architect with Gemini configuration."""
         self.model = model
-        
-        # Load environment variables and configure Gemini
-        current_dir = pathlib.Path(__file__).parent.parent.absolute()
-        env_path = current_dir / '.env'
-        load_dotenv(dotenv_path=env_path)
-        
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-            
-        genai.configure(api_key=api_key)
-        self.client = genai.GenerativeModel(self.model)
-    
-    async def generate_tech_stack(self, 
-                                product_specs: Dict[str, Any], 
-                                brainstorm_outcome: Dict[str, Any]) -> TechStack:
-        """Generate technology stack recommendations."""
+        self.client = get_model(self.model)
+        self._sem = asyncio.Semaphore(default_concurrency())
+
+    async def _call(self,
+                    prompt: str,
+                    *,
+                    namespace: str,
+                    schema: Any = None,
+                    exclude: Tuple[str, ...] = (),
+                    client: Optional[genai.GenerativeModel] = None,
+                    stream: bool = False,
+                    reask: bool = True) -> Any:
+        """Send a prompt to Gemini and return the reply.
+
+        With ``schema`` the reply is constrained to that type and returned validated;
+        ``exclude`` drops top-level schema fields we fill in ourselves and ``reask``
+        controls the one retry on a reply that fails validation. ``stream`` consumes
+        large responses incrementally so time-to-first-token is visible in the debug log.
+        Quota and transient server errors are retried inside the shared client helpers.
+        """
+        client = client or self.client
         try:
-            prompt = f"""Analyze the product specifications and brainstorm outcome to recommend a comprehensive technology stack.
-
-            Product Specifications:
-            {json.dumps(product_specs, indent=2)}
-
-            Selected Solution Ideas:
-            {json.dumps(brainstorm_outcome.get('ideas', []), indent=2)}
-
-            Provide a detailed technology stack that:
-            1. Aligns with the technical requirements
-            2. Supports the proposed features and scalability needs
-            3. Considers integration requirements
-            4. Specifies version constraints where critical
-            5. Identifies key integration points
-
-            Format as JSON with fields matching the TechStack model.
-            """
-
-            response = await self.client.generate_content(prompt)
-            tech_stack_data = json.loads(response.text)
-            return TechStack(**tech_stack_data)
-
+            if schema is None:
+                return await generate_with_retry(client, prompt,
+                                                 namespace=namespace,
+                                                 semaphore=self._sem,
+                                                 stream=stream)
+            return await generate_validated(client, prompt,
+                                            namespace=namespace,
+                                            semaphore=self._sem,
+                                            schema=schema,
+                                            exclude=exclude,
+                                            reask=reask,
+                                            stream=stream)
+        except ValidationError:
+            raise
         except Exception as e:
-            logger.error(f"Error generating tech stack: {str(e)}")
+            logger.error(f"Gemini call failed for {namespace}: {str(e)}")
             raise
+    
+    async def generate_tech_stack(self, 
+                                specs_json: str, 
+                                ideas_json: str,
+                                cached_client: Optional[genai.GenerativeModel] = None) -> TechStack:
+        """Generate technology stack recommendations.
+
+        When ``cached_client`` is given, the specs and ideas are already held in its
+        cached context and are not repeated in the prompt.
+        """
+        if cached_client:
+            context = "The product specifications and selected solution ideas are provided in the cached context."
+        else:
+            context = f"""Product Specifications:
+        {specs_json}
+
+        Selected Solution Ideas:
+        {ideas_json}"""
+
+        prompt = f"""Analyze the product specifications and brainstorm outcome to recommend a comprehensive technology stack.
+
+        {context}
+
+        Provide a detailed technology stack that:
+        1. Aligns with the technical requirements
+        2. Supports the proposed features and scalability needs
+        3. Considers integration requirements
+        4. Specifies version constraints where critical
+        5. Identifies key integration points
+        """
+
+        return await self._call(prompt, namespace="architect.tech_stack",
+                                schema=TechStack,
+                                client=cached_client)
 
     async def generate_components(self, 
-                                product_specs: Dict[str, Any], 
-                                tech_stack: TechStack) -> List[Component]:
-        """Generate component definitions with detailed specifications."""
-        try:
-            prompt = f"""Design the system components based on the product specifications and selected technology stack.
-
-            Product Specifications:
-            {json.dumps(product_specs, indent=2)}
-
-            Technology Stack:
-            {json.dumps(tech_stack.dict(), indent=2)}
-
-            For each major feature or functional area, define a component that:
-            1. Has clear responsibilities and boundaries
-            2. Specifies its API endpoints and interfaces
-            3. Includes performance requirements
-            4. Defines testing strategies
-            5. Lists dependencies and technical requirements
-
-            Format as JSON array of Component objects.
-            """
-
-            response = await self.client.generate_content(prompt)
-            components_data = json.loads(response.text)
-            return [Component(**comp) for comp in components_data]
-
-        except Exception as e:
-            logger.error(f"Error generating components: {str(e)}")
-            raise
+                                specs_json: str, 
+                                tech_stack_json: str,
+                                cached_client: Optional[genai.GenerativeModel] = None) -> List[Component]:
+        """Generate component definitions with detailed specifications.
+
+        When ``cached_client`` is given, the specs are already held in its cached
+        context and are not repeated in the prompt.
+        """
+        if cached_client:
+            specs_context = "The product specifications are provided in the cached context."
+        else:
+            specs_context = f"""Product Specifications:
+        {specs_json}"""
+
+        prompt = f"""Design the system components based on the product specifications and selected technology stack.
+
+        {specs_context}
+
+        Technology Stack:
+        {tech_stack_json}
+
+        For each major feature or functional area, define a component that:
+        1. Has clear responsibilities and boundaries
+        2. Specifies its API endpoints and interfaces
+        3. Includes performance requirements
+        4. Defines testing strategies
+        5. Lists dependencies and technical requirements
+        """
+
+        return await self._call(prompt, namespace="architect.components",
+                                schema=List[Component],
+                                client=cached_client,
+                                stream=True)
 
     async def generate_data_flows(self, 
-                                components: List[Component], 
-                                tech_stack: TechStack) -> List[DataFlow]:
+                                components_json: str, 
+                                tech_stack_json: str) -> List[DataFlow]:
         """Generate data flow specifications between components."""
-        try:
-            prompt = f"""Define the data flows between system components.
-
-            Components:
-            {json.dumps([comp.dict() for comp in components], indent=2)}
+        prompt = f"""Define the data flows between system components.
 
-            Technology Stack:
-            {json.dumps(tech_stack.dict(), indent=2)}
+        Components:
+        {components_json}
 
-            For each significant interaction between components, specify:
-            1. Data flow details and types
-            2. Security requirements
-            3. Validation rules
-            4. Error handling strategies
-            5. Monitoring metrics
+        Technology Stack:
+        {tech_stack_json}
 
-            Format as JSON array of DataFlow objects.
-            """
-
-            response = await self.client.generate_content(prompt)
-            flows_data = json.loads(response.text)
-            return [DataFlow(**flow) for flow in flows_data]
+        For each significant interaction between components, specify:
+        1. Data flow details and types
+        2. Security requirements
+        3. Validation rules
+        4. Error handling strategies
+        5. Monitoring metrics
+        """
 
-        except Exception as e:
-            logger.error(f"Error generating data flows: {str(e)}")
-            raise
+        return await self._call(prompt, namespace="architect.data_flows",
+                                schema=List[DataFlow],
+                                stream=True)
 
     async def generate_security_measures(self, 
-                                      components: List[Component], 
-                                      data_flows: List[DataFlow]) -> List[SecurityMeasure]:
+                                      components_json: str, 
+                                      flows_json: str) -> List[SecurityMeasure]:
         """Generate comprehensive security measures."""
-        try:
-            prompt = f"""Define security measures for the system components and data flows.
-
-            Components:
-            {json.dumps([comp.dict() for comp in components], indent=2)}
-
-            Data Flows:
-            {json.dumps([flow.dict() for flow in data_flows], indent=2)}
+        prompt = f"""Define security measures for the system components and data flows.
 
-            For each security category, specify:
-            1. Required security measures
-            2. Implementation priorities
-            3. Compliance requirements
-            4. Threat mitigations
-            5. Integration with existing security tools
+        Components:
+        {components_json}
 
-            Format as JSON array of SecurityMeasure objects.
-            """
+        Data Flows:
+        {flows_json}
 
-            response = await self.client.generate_content(prompt)
-            security_data = json.loads(response.text)
-            return [SecurityMeasure(**measure) for measure in security_data]
+        For each security category, specify:
+        1. Required security measures
+        2. Implementation priorities
+        3. Compliance requirements
+        4. Threat mitigations
+        5. Integration with existing security tools
+        """
 
-        except Exception as e:
-            logger.error(f"Error generating security measures: {str(e)}")
-            raise
+        return await self._call(prompt, namespace="architect.security_measures",
+                                schema=List[SecurityMeasure])
 
     async def generate_deployment_strategy(self, 
-                                        components: List[Component], 
-                                        tech_stack: TechStack) -> List[DeploymentStage]:
+                                        components_json: str, 
+                                        tech_stack_json: str) -> List[DeploymentStage]:
         """Generate deployment strategy with stages and automation."""
-        try:
-            prompt = f"""Define a comprehensive deployment strategy.
-
-            Components:
-            {json.dumps([comp.dict() for comp in components], indent=2)}
-
-            Technology Stack:
-            {json.dumps(tech_stack.dict(), indent=2)}
-
-            For each deployment stage, specify:
-            1. Required components and order
-            2. Prerequisites and dependencies
-            3. Success criteria and validation
-            4. Rollback procedures
-            5. Monitoring metrics
-            6. Automation scripts
-            7. Environment configurations
-
-            Format as JSON array of DeploymentStage objects.
-            """
-
-            response = await self.client.generate_content(prompt)
-            stages_data = json.loads(response.text)
-            return [DeploymentStage(**stage) for stage in stages_data]
+        prompt = f"""Define a comprehensive deployment strategy.
+
+        Components:
+        {components_json}
+
+        Technology Stack:
+        {tech_stack_json}
+
+        For each deployment stage, specify:
+        1. Required components and order
+        2. Prerequisites and dependencies
+        3. Success criteria and validation
+        4. Rollback procedures
+        5. Monitoring metrics
+        6. Automation scripts
+        7. Environment configurations
+        """
+
+        return await self._call(prompt, namespace="architect.deployment_strategy",
+                                schema=List[DeploymentStage],
+                                stream=True)
+
+    async def generate_overview(self,
+                                components_json: str,
+                                tech_stack_json: str) -> ArchitectureOverview:
+        """Generate the architecture overview and cross-cutting guidance."""
+        prompt = f"""Summarize the architecture formed by these system components.
+
+        Components:
+        {components_json}
+
+        Technology Stack:
+        {tech_stack_json}
+
+        Provide:
+        1. Overview of the architecture
+        2. Recommended design patterns
+        3. Scalability considerations
+        4. Monitoring requirements
+        5. API documentation structure
+        6. Performance benchmarks
+        7. Disaster recovery guidelines
+        """
+
+        return await self._call(prompt, namespace="architect.overview",
+                                schema=ArchitectureOverview)
+
+    async def _create_context_cache(self,
+                                    specs_json: str,
+                                    ideas_json: str) -> Optional[caching.CachedContent]:
+        """Cache the specs and ideas server-side if they are large enough to qualify."""
+        if (len(specs_json) + len(ideas_json)) // CHARS_PER_TOKEN < CONTEXT_CACHE_MIN_TOKENS:
+            return None
 
+        try:
+            return await asyncio.to_thread(
+                caching.CachedContent.create,
+                model=self.model,
+                display_name=f"arch-{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                contents=[
+                    f"Product Specifications:\n{specs_json}",
+                    f"Selected Solution Ideas:\n{ideas_json}"
+                ],
+                ttl=CONTEXT_CACHE_TTL
+            )
         except Exception as e:
-            logger.error(f"Error generating deployment strategy: {str(e)}")
-            raise
+            logger.warning(f"Context caching unavailable, sending full prompts: {str(e)}")
+            return None
 
     async def generate_architecture(self, 
                                   product_specs: str, 
                                   brainstorm_outcome: str) -> SystemArchitecture:
-        """Generate comprehensive system architecture."""
+        """Generate comprehensive system architecture.
+
+        Small inputs are designed in a single structured call; larger inputs, or a
+        single-call response that fails validation, go through one call per section.
+        """
         try:
             # Parse input JSON
-            specs_data = json.loads(product_specs)
-            outcome_data = json.loads(brainstorm_outcome)
+            specs_data = orjson.loads(product_specs)
+            outcome_data = orjson.loads(brainstorm_outcome)
 
-            # Generate components in parallel
-            tech_stack = await self.generate_tech_stack(specs_data, outcome_data)
-            components = await self.generate_components(specs_data, tech_stack)
-            
-            # Generate flows and security measures
-            data_flows = await self.generate_data_flows(components, tech_stack)
-            security_measures = await self.generate_security_measures(components, data_flows)
-            
-            # Generate deployment strategy
-            deployment_strategy = await self.generate_deployment_strategy(components, tech_stack)
-
-            # Generate additional architecture aspects
-            architecture_prompt = f"""Analyze the system components and provide:
-            1. Overview of the architecture
-            2. Recommended design patterns
-            3. Scalability considerations
-            4. Monitoring requirements
-            5. API documentation structure
-            6. Performance benchmarks
-            7. Disaster recovery guidelines
-
-            Format as JSON with fields:
-            - overview: string
-            - design_patterns: list of strings
-            - scalability_considerations: list of strings
-            - monitoring_requirements: list of strings
-            - api_documentation: object
-            - performance_benchmarks: object
-            - disaster_recovery_plan: object
-            """
+            # Serialize each piece of prompt context once and reuse it across calls
+            specs_json = _to_json(specs_data)
+            ideas_json = _to_json(outcome_data.get('ideas', []))
 
-            response = await self.client.generate_content(architecture_prompt)
-            arch_data = json.loads(response.text)
-
-            # Create and return complete architecture
-            return SystemArchitecture(
-                overview=arch_data["overview"],
-                components=components,
-                data_flows=data_flows,
-                tech_stack=tech_stack,
-                security_measures=security_measures,
-                deployment_strategy=deployment_strategy,
-                design_patterns=arch_data["design_patterns"],
-                scalability_considerations=arch_data["scalability_considerations"],
-                monitoring_requirements=arch_data["monitoring_requirements"],
-                api_documentation=arch_data.get("api_documentation"),
-                performance_benchmarks=arch_data.get("performance_benchmarks"),
-                disaster_recovery_plan=arch_data.get("disaster_recovery_plan")
-            )
+            if (len(specs_json) + len(ideas_json)) // CHARS_PER_TOKEN <= ONESHOT_MAX_INPUT_TOKENS:
+                try:
+                    return await self.generate_architecture_oneshot(specs_json, ideas_json)
+                except ValidationError as e:
+                    logger.warning(f"Single-call architecture did not validate, generating per section: {str(e)}")
+
+            return await self._generate_architecture_stepwise(specs_json, ideas_json)
 
         except Exception as e:
             logger.error(f"Error generating architecture: {str(e)}")
             raise
 
+    async def generate_architecture_oneshot(self, specs_json: str, ideas_json: str) -> SystemArchitecture:
+        """Generate the whole architecture with one structured Gemini call."""
+        prompt = f"""Design a complete system architecture for the product below.
+
+            Product Specifications:
+            {specs_json}
+
+            Selected Solution Ideas:
+            {ideas_json}
+
+            Provide:
+            1. An overview of the architecture
+            2. A technology stack aligned with the technical requirements
+            3. Components with clear responsibilities, dependencies and testing strategies
+            4. Data flows between components with security and validation rules
+            5. Security measures with priorities and compliance requirements
+            6. Deployment stages with prerequisites, success criteria and rollback plans
+            7. Design patterns, scalability considerations and monitoring requirements
+            """
+
+        # A truncated whole-architecture reply is unlikely to fit on a re-ask either,
+        # so let the caller fall back to per-section generation instead
+        return await self._call(prompt, namespace="architect.oneshot",
+                                schema=SystemArchitecture,
+                                exclude=("session_id",),
+                                stream=True,
+                                reask=False)
+
+    async def _generate_architecture_stepwise(self, specs_json: str, ideas_json: str) -> SystemArchitecture:
+        """Generate the architecture one section at a time."""
+        # Tech stack and components are strictly sequential and both embed the
+        # specs, so serve that shared prefix from a context cache when possible
+        context_cache = await self._create_context_cache(specs_json, ideas_json)
+        try:
+            cached_client = (genai.GenerativeModel.from_cached_content(context_cache)
+                             if context_cache else None)
+            tech_stack = await self.generate_tech_stack(specs_json, ideas_json, cached_client)
+            tech_stack_json = tech_stack.model_dump_json(indent=2)
+            components = await self.generate_components(specs_json, tech_stack_json, cached_client)
+            components_json = _COMPONENTS_ADAPTER.dump_json(components, indent=2).decode()
+        finally:
+            if context_cache:
+                await asyncio.to_thread(context_cache.delete)
+
+        # Data flows, deployment strategy and the architecture overview only
+        # depend on components/tech stack, so run them concurrently
+        data_flows, deployment_strategy, overview = await asyncio.gather(
+            self.generate_data_flows(components_json, tech_stack_json),
+            self.generate_deployment_strategy(components_json, tech_stack_json),
+            self.generate_overview(components_json, tech_stack_json)
+        )
+
+        # Security measures need the generated data flows
+        flows_json = _FLOWS_ADAPTER.dump_json(data_flows, indent=2).decode()
+        security_measures = await self.generate_security_measures(components_json, flows_json)
+
+        # Create and return complete architecture
+        return SystemArchitecture(
+            components=components,
+            data_flows=data_flows,
+            tech_stack=tech_stack,
+            security_measures=security_measures,
+            deployment_strategy=deployment_strategy,
+            **overview.model_dump()
+        )
+
     async def design_system(self, specs_file: str, brainstorm_file: str) -> str:
         """Wrapper method for integration test compatibility."""
         # Read the content from files
         try:
             with open(specs_file, 'r', encoding='utf-8') as f:
                 specs = f.read()
-            with open(brainstorm_file, 'r', encoding='utf-8') as f:
+            with open(_brainstorm_source(brainstorm_file), 'r', encoding='utf-8') as f:
                 brainstorm = f.read()
             
             # Call the actual method
@@ -326,138 +481,83 @@ class Architect:
             logger.error(f"Error in design_system: {str(e)}")
             raise
 
-    def save_architecture(self, architecture: SystemArchitecture, output_file: str):
+    async def save_architecture(self, architecture: SystemArchitecture, output_file: str):
         """Save the system architecture to a markdown file."""
         try:
             output_path = pathlib.Path(output_file)
             output_path.parent.mkdir(parents=True, exist_ok=True)
 
-            markdown_content = f"""# System Architecture
-Session ID: {architecture.session_id}
-
-## Overview
-{architecture.overview}
-
-## Technology Stack
-### Frontend
-{chr(10).join(f'- {tech}' for tech in architecture.tech_stack.frontend)}
-
-### Backend
-{chr(10).join(f'- {tech}' for tech in architecture.tech_stack.backend)}
-
-### Database
-{chr(10).join(f'- {tech}' for tech in architecture.tech_stack.database)}
-
-### Infrastructure
-{chr(10).join(f'- {tech}' for tech in architecture.tech_stack.infrastructure)}
-
-### Tools and Services
-{chr(10).join(f'- {tech}' for tech in architecture.tech_stack.tools_and_services)}
-
-## Components
-{chr(10).join([f'''
-### {component.name}
-{component.description}
-
-**Responsibilities:**
-{chr(10).join(f'- {resp}' for resp in component.responsibilities)}
-
-**Technical Requirements:**
-{chr(10).join(f'- {req}' for req in component.technical_requirements)}
-
-**Dependencies:**
-{chr(10).join(f'- {dep}' for dep in component.dependencies)}
-
-**API Endpoints:**
-{json.dumps(component.api_endpoints, indent=2) if component.api_endpoints else "N/A"}
-
-**Performance Requirements:**
-{json.dumps(component.performance_requirements, indent=2) if component.performance_requirements else "N/A"}
-
-**Testing Strategy:**
-{chr(10).join(f'- {test}' for test in (component.testing_strategy or []))}
-''' for component in architecture.components])}
-
-## Data Flows
-{chr(10).join([f'''
-### {flow.source} → {flow.destination}
-{flow.description}
-
-- **Data Type:** {flow.data_type}
-- **Frequency:** {flow.frequency}
-
-**Security Requirements:**
-{chr(10).join(f'- {req}' for req in flow.security_requirements)}
-
-**Validation Rules:**
-{chr(10).join(f'- {rule}' for rule in (flow.validation_rules or []))}
-
-**Error Handling:**
-{json.dumps(flow.error_handling, indent=2) if flow.error_handling else "N/A"}
-
-**Monitoring Metrics:**
-{chr(10).join(f'- {metric}' for metric in (flow.monitoring_metrics or []))}
-''' for flow in architecture.data_flows])}
-
-## Security Measures
-{chr(10).join([f'''
-### {measure.category}
-**Priority:** {measure.implementation_priority}
-
-**Measures:**
-{chr(10).join(f'- {m}' for m in measure.measures)}
-
-**Compliance Requirements:**
-{chr(10).join(f'- {req}' for req in (measure.compliance_requirements or []))}
-
-**Threat Mitigations:**
-{json.dumps(measure.threat_mitigations, indent=2) if measure.threat_mitigations else "N/A"}
-''' for measure in architecture.security_measures])}
-
-## Deployment Strategy
-{chr(10).join([f'''
-### Stage: {stage.name}
-
-**Components:**
-{chr(10).join(f'- {comp}' for comp in stage.components)}
-
-**Prerequisites:**
-{chr(10).join(f'- {pre}' for pre in stage.prerequisites)}
-
-**Success Criteria:**
-{chr(10).join(f'- {crit}' for crit in stage.success_criteria)}
-
-**Rollback Plan:**
-{chr(10).join(f'- {plan}' for plan in stage.rollback_plan)}
-
-**Monitoring Metrics:**
-{chr(10).join(f'- {metric}' for metric in (stage.monitoring_metrics or []))}
-
-**Environment Configuration:**
-{json.dumps(stage.environment_config, indent=2) if stage.environment_config else "N/A"}
-''' for stage in architecture.deployment_strategy])}
-
-## Design Patterns
-{chr(10).join(f'- {pattern}' for pattern in architecture.design_patterns)}
-
-## Scalability Considerations
-{chr(10).join(f'- {consideration}' for consideration in architecture.scalability_considerations)}
-
-## Monitoring Requirements
-{chr(10).join(f'- {req}' for req in architecture.monitoring_requirements)}
-
-## API Documentation
-{json.dumps(architecture.api_documentation, indent=2) if architecture.api_documentation else "N/A"}
-
-## Performance Benchmarks
-{json.dumps(architecture.performance_benchmarks, indent=2) if architecture.performance_benchmarks else "N/A"}
-
-## Disaster Recovery Plan
-{json.dumps(architecture.disaster_recovery_plan, indent=2) if architecture.disaster_recovery_plan else "N/A"}
-"""
-
-            with output_path.open('w', encoding='utf-8') as f:
-                f.write(markdown_content)
+            buf = io.StringIO()
+            w = buf.write
+
+            w("# System Architecture\n")
+            w(f"Session ID: {architecture.session_id}\n\n")
+            w(f"## Overview\n{architecture.overview}\n\n")
+
+            tech_stack = architecture.tech_stack
+            w("## Technology Stack\n")
+            w(f"### Frontend\n{_bullets(tech_stack.frontend)}\n\n")
+            w(f"### Backend\n{_bullets(tech_stack.backend)}\n\n")
+            w(f"### Database\n{_bullets(tech_stack.database)}\n\n")
+            w(f"### Infrastructure\n{_bullets(tech_stack.infrastructure)}\n\n")
+            w(f"### Tools and Services\n{_bullets(tech_stack.tools_and_services)}\n\n")
+
+            w("## Components\n")
+            for i, component in enumerate(architecture.components):
+                if i:
+                    w("\n")
+                w(f"\n### {component.name}\n{component.description}\n\n")
+                w(f"**Responsibilities:**\n{_bullets(component.responsibilities)}\n\n")
+                w(f"**Technical Requirements:**\n{_bullets(component.technical_requirements)}\n\n")
+                w(f"**Dependencies:**\n{_bullets(component.dependencies)}\n\n")
+                w(f"**API Endpoints:**\n{_json_or_na(component.api_endpoints)}\n\n")
+                w(f"**Performance Requirements:**\n{_json_or_na(component.performance_requirements)}\n\n")
+                w(f"**Testing Strategy:**\n{_bullets(component.testing_strategy or [])}\n")
+
+            w("\n\n## Data Flows\n")
+            for i, flow in enumerate(architecture.data_flows):
+                if i:
+                    w("\n")
+                w(f"\n### {flow.source} → {flow.destination}\n{flow.description}\n\n")
+                w(f"- **Data Type:** {flow.data_type}\n")
+                w(f"- **Frequency:** {flow.frequency}\n\n")
+                w(f"**Security Requirements:**\n{_bullets(flow.security_requirements)}\n\n")
+                w(f"**Validation Rules:**\n{_bullets(flow.validation_rules or [])}\n\n")
+                w(f"**Error Handling:**\n{_json_or_na(flow.error_handling)}\n\n")
+                w(f"**Monitoring Metrics:**\n{_bullets(flow.monitoring_metrics or [])}\n")
+
+            w("\n\n## Security Measures\n")
+            for i, measure in enumerate(architecture.security_measures):
+                if i:
+                    w("\n")
+                w(f"\n### {measure.category}\n")
+                w(f"**Priority:** {measure.implementation_priority}\n\n")
+                w(f"**Measures:**\n{_bullets(measure.measures)}\n\n")
+                w(f"**Compliance Requirements:**\n{_bullets(measure.compliance_requirements or [])}\n\n")
+                w(f"**Threat Mitigations:**\n{_json_or_na(measure.threat_mitigations)}\n")
+
+            w("\n\n## Deployment Strategy\n")
+            for i, stage in enumerate(architecture.deployment_strategy):
+                if i:
+                    w("\n")
+                w(f"\n### Stage: {stage.name}\n\n")
+                w(f"**Components:**\n{_bullets(stage.components)}\n\n")
+                w(f"**Prerequisites:**\n{_bullets(stage.prerequisites)}\n\n")
+                w(f"**Success Criteria:**\n{_bullets(stage.success_criteria)}\n\n")
+                w(f"**Rollback Plan:**\n{_bullets(stage.rollback_plan)}\n\n")
+                w(f"**Monitoring Metrics:**\n{_bullets(stage.monitoring_metrics or [])}\n\n")
+                w(f"**Environment Configuration:**\n{_json_or_na(stage.environment_config)}\n")
+
+            w(f"\n\n## Design Patterns\n{_bullets(architecture.design_patterns)}\n\n")
+            w(f"## Scalability Considerations\n{_bullets(architecture.scalability_considerations)}\n\n")
+            w(f"## Monitoring Requirements\n{_bullets(architecture.monitoring_requirements)}\n\n")
+            w(f"## API Documentation\n{_json_or_na(architecture.api_documentation)}\n\n")
+            w(f"## Performance Benchmarks\n{_json_or_na(architecture.performance_benchmarks)}\n\n")
+            w(f"## Disaster Recovery Plan\n{_json_or_na(architecture.disaster_recovery_plan)}\n")
+            markdown_content = buf.getvalue()
+
+            # Keep the event loop free while the file is written
+            await asyncio.to_thread(output_path.write_text, markdown_content, encoding='utf-8')
 
             logger.info(f"Architecture saved to {output_file}")
 
@@ -476,7 +576,7 @@ async def main(specs_file: str, brainstorm_file: str, output: str):
         with open(specs_file, 'r') as f:
             specs = f.read()
         
-        with open(brainstorm_file, 'r') as f:
+        with open(_brainstorm_source(brainstorm_file), 'r') as f:
             brainstorm = f.read()
         
         # Initialize architect and generate architecture
@@ -484,7 +584,7 @@ async def main(specs_file: str, brainstorm_file: str, output: str):
         architecture = await architect.generate_architecture(specs, brainstorm)
         
         # Save architecture
-        architect.save_architecture(architecture, output)
+        await architect.save_architecture(architecture, output)
         
     except Exception as e:
         logger.error(f"Error in architecture generation: {str(e)}")
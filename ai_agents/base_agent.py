@@ -1,13 +1,13 @@
+import asyncio
 import logging
 import os
-from pathlib import Path
-from dotenv import load_dotenv
 import google.generativeai as genai
-import logging
 from functools import wraps
-from typing import Dict, Any, Optional
-from loguru import logger
-from pydantic import BaseModel
+from typing import AsyncIterator, Optional
+from ._gemini_client import default_concurrency, gemini_api_key, get_model, retrying
+from ._llm_cache import cached_text
+
+__all__ = ["BaseAgent"]
 
 # Configure logging
 logging.basicConfig(
@@ -16,16 +16,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Entry/exit tracing is only worth its cost in debug runs
+_DEBUG = bool(os.getenv("ACTIONS_STEP_DEBUG"))
+
 def debug_hook(func):
+    """Trace entry, exit and errors of ``func`` when running with ACTIONS_STEP_DEBUG."""
+    if not _DEBUG:
+        return func
+
+    # Arguments and results are left out of the messages; they can hold full prompts
     @wraps(func)
     def wrapper(*args, **kwargs):
-        logger.debug(f"ENTRY: {func.__name__} - args: {args}, kwargs: {kwargs}")
+        logger.debug("ENTRY: %s", func.__name__)
         try:
             result = func(*args, **kwargs)
-            logger.debug(f"EXIT: {func.__name__} - result: {result}")
+            logger.debug("EXIT: %s", func.__name__)
             return result
         except Exception as e:
-            logger.error(f"ERROR: {func.__name__} - {str(e)}")
+            logger.error("ERROR: %s - %s", func.__name__, e)
             raise
     return wrapper
 
@@ -33,25 +41,20 @@ class BaseAgent:
     def __init__(self, model: str = "gemini-2.0-flash"):
         """Initialize the base agent with Gemini configuration."""
         self.model = model
-        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
         self._validate_and_configure()
-        self.client = genai.GenerativeModel(model)
+        self.client = get_model(model)
+        # Caps concurrent completions to stay within Gemini RPM quotas
+        self._sem = asyncio.Semaphore(default_concurrency())
         
     @debug_hook
     def _validate_and_configure(self):
-        """Validate and configure the Gemini API."""
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            logger.error("GEMINI_API_KEY environment variable is not set")
-            raise ValueError("GEMINI_API_KEY environment variable is not set")
-            
+        """Validate the Gemini API key; the SDK itself is configured once per process."""
         try:
-            logger.info("Successfully configured Gemini API")
-        except Exception as e:
-            logger.error(f"Failed to configure Gemini API: {str(e)}")
+            gemini_api_key()
+        except ValueError:
+            logger.error("GEMINI_API_KEY environment variable is not set")
             raise
     
-    @debug_hook
     async def get_completion(self, 
                            prompt: str, 
                            system_message: Optional[str] = None,
@@ -61,24 +64,59 @@ class BaseAgent:
             # Combine system message and prompt if provided
             full_prompt = f"{system_message}\n\n{prompt}" if system_message else prompt
             
-            response = self.client.generate_content(
-                contents=full_prompt,
+            # Identical concurrent prompts share one request; only temperature-0
+            # completions are served from the shared response cache
+            async for attempt in retrying():
+                with attempt:
+                    async with self._sem:
+                        return await cached_text(
+                            self.client, full_prompt,
+                            namespace="base_agent.completion",
+                            options={"temperature": temperature},
+                            fetch=lambda: self._generate(full_prompt, temperature)
+                        )
+            
+        except Exception as e:
+            logger.error(f"Error getting completion: {str(e)}")
+            raise
+
+    async def stream_completion(self,
+                                prompt: str,
+                                system_message: Optional[str] = None,
+                                temperature: float = 0.7) -> AsyncIterator[str]:
+        """Yield completion text from Gemini as it is generated."""
+        try:
+            full_prompt = f"{system_message}\n\n{prompt}" if system_message else prompt
+            
+            response = await self.client.generate_content_async(
+                full_prompt,
                 generation_config=genai.GenerationConfig(
                     temperature=temperature
-                )
+                ),
+                stream=True
             )
-            
-            # Check if the response has content
-            if not response.candidates:
-                raise Exception("No response generated")
-            
-            return response.text
-            
+            async for chunk in response:
+                yield chunk.text
+                
         except Exception as e:
-            logger.error(f"Error getting completion: {str(e)}")
+            logger.error(f"Error streaming completion: {str(e)}")
             raise
+
+    async def _generate(self, full_prompt: str, temperature: float) -> str:
+        """Call Gemini for a completion that missed the cache."""
+        response = await self.client.generate_content_async(
+            contents=full_prompt,
+            generation_config=genai.GenerationConfig(
+                temperature=temperature
+            )
+        )
+        
+        # Check if the response has content
+        if not response.candidates:
+            raise Exception("No response generated")
+        
+        return response.text
     
-    @debug_hook
     def load_file(self, filepath: str) -> str:
         """Safely load file content."""
         try:
@@ -88,7 +126,6 @@ class BaseAgent:
             logger.error(f"Error loading file {filepath}: {str(e)}")
             raise
     
-    @debug_hook
     def save_file(self, filepath: str, content: str) -> None:
         """Safely save content to file."""
         try:
@@ -99,10 +136,20 @@ class BaseAgent:
             logger.error(f"Error saving file {filepath}: {str(e)}")
             raise
             
+    async def aload_file(self, filepath: str) -> str:
+        """Load file content without blocking the event loop."""
+        return await asyncio.to_thread(self.load_file, filepath)
+
+    async def asave_file(self, filepath: str, content: str) -> None:
+        """Save content to file without blocking the event loop."""
+        await asyncio.to_thread(self.save_file, filepath, content)
+            
     @debug_hook
     def validate_file_exists(self, filepath: str) -> bool:
         """Validate that a required file exists."""
-        if not os.path.exists(filepath):
+        try:
+            os.stat(filepath)
+        except OSError:
             logger.error(f"Required file not found: {filepath}")
             return False
         return True
@@ -1,20 +1,56 @@
 import click
 from loguru import logger
-from typing import List, Dict, Any, Optional
-import google.generativeai as genai
-from pydantic import BaseModel
-import json
+from typing import List, Dict, Any, Optional, Set
+from pydantic import BaseModel, ConfigDict, Field
 import os
-from dotenv import load_dotenv
 import asyncio
 from datetime import datetime
 from pathlib import Path
-from .parallel_ideation import ParallelIdeationSystem, IdeationContext
+from .parallel_ideation import IdeaFragment, ParallelIdeationSystem, IdeationContext
+from ._gemini_client import default_concurrency, generate_with_retry, get_model
 
-# Load environment variables
-load_dotenv()
+CONSOLIDATION_PROMPT = """You are a strategic innovation consultant tasked with consolidating multiple solution ideas into a final recommendation.
+Review the following solution ideas and provide a consolidated recommendation that captures the best aspects of each:
+
+{ideas_json}
+
+Focus on:
+1. Key synergies between ideas
+2. Most promising technical approaches
+3. Highest-value features
+4. Risk mitigation strategies
+
+Provide a clear, actionable recommendation in 2-3 paragraphs."""
+
+# Markdown section written for each idea by save_outcome
+IDEA_TEMPLATE = """### {index}. {title}
+{description}
+
+**Key Features:**
+{key_features}
+
+**Technical Approach:**
+{technical_approach}
+
+**Pros:**
+{pros}
+
+**Cons:**
+{cons}
+
+Score: {score}
+"""
+
+def _bullets(items: List[str]) -> str:
+    """Render a markdown bullet list."""
+    return "\n".join(f"- {item}" for item in items)
+
+# Ideas and outcomes are built once and only read afterwards
+_MODEL_CONFIG = ConfigDict(frozen=True, defer_build=False)
 
 class SolutionIdea(BaseModel):
+    model_config = _MODEL_CONFIG
+
     title: str
     description: str
     key_features: List[str]
@@ -26,24 +62,49 @@ class SolutionIdea(BaseModel):
     source_fragments: Optional[List[str]] = None
     synergy_score: Optional[float] = None
 
+    @classmethod
+    def from_fragment(cls, fragment: IdeaFragment) -> "SolutionIdea":
+        """Build a solution idea from a sub-agent fragment without another model call.
+
+        The fragment is already validated, so the idea is constructed without
+        validating its fields again.
+        """
+        return cls.model_construct(
+            title=fragment.concept,
+            description=fragment.rationale or fragment.concept,
+            key_features=fragment.key_features,
+            technical_approach=fragment.approach,
+            pros=fragment.pros,
+            cons=fragment.cons,
+            score=(fragment.potential_impact + fragment.innovation_score + fragment.feasibility_score) / 3,
+            contributing_specializations=[fragment.specialization]
+        )
+
 class BrainstormOutcome(BaseModel):
+    model_config = _MODEL_CONFIG
+
     ideas: List[SolutionIdea]
     consolidated_recommendation: str
-    timestamp: datetime = datetime.now()
+    timestamp: datetime = Field(default_factory=datetime.now)
     version: str = "3.2.0"
 
 class BrainstormFacilitator:
-    def __init__(self, model: str = "gemini-2.0-flash", num_agents: int = 3):
-        """Initialize the Brainstorm Facilitator with parallel ideation system."""
+    def __init__(self,
+                 model: str = "gemini-2.0-flash",
+                 num_agents: int = 3,
+                 ideation_model: str = "gemini-2.0-flash-lite"):
+        """Initialize the Brainstorm Facilitator with parallel ideation system.
+
+        The fan-out of structured fragment requests runs on the lighter
+        ``ideation_model``; only the final synthesis uses ``model``.
+        """
         self.model = model
-        self.parallel_ideation = ParallelIdeationSystem(model, num_agents)
+        self.parallel_ideation = ParallelIdeationSystem(ideation_model, num_agents)
         
-        # Configure Gemini for main facilitator
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables")
-        genai.configure(api_key=api_key)
-        self.client = genai.GenerativeModel(self.model)
+        self.client = get_model(self.model)
+        self._sem = asyncio.Semaphore(default_concurrency())
+        # Output directories already created by save_outcome
+        self._ensured_dirs: Set[str] = set()
     
     async def generate_ideas(self, 
                            product_specs: str, 
@@ -60,27 +121,17 @@ class BrainstormFacilitator:
                 innovation_targets=innovation_targets
             )
             
-            # Generate ideas in parallel
-            ideas = await self.parallel_ideation.generate_ideas(context)
-            
-            # Consolidate recommendations
-            consolidation_prompt = f"""
-            You are a strategic innovation consultant tasked with consolidating multiple solution ideas into a final recommendation.
-            Review the following solution ideas and provide a consolidated recommendation that captures the best aspects of each:
-
-            {json.dumps([idea.dict() for idea in ideas], indent=2)}
-            
-            Focus on:
-            1. Key synergies between ideas
-            2. Most promising technical approaches
-            3. Highest-value features
-            4. Risk mitigation strategies
+            # Generate ideas in parallel; fragments already carry their pros and cons
+            fragments = await self.parallel_ideation.generate_ideas(context)
+            ideas = [SolutionIdea.from_fragment(fragment) for fragment in fragments]
             
-            Provide a clear, actionable recommendation in 2-3 paragraphs.
-            """
+            # Consolidate recommendations; ideas are sent as compact JSON
+            ideas_json = "[" + ",".join(idea.model_dump_json() for idea in ideas) + "]"
+            consolidation_prompt = CONSOLIDATION_PROMPT.format(ideas_json=ideas_json)
             
-            response = self.client.generate_content(consolidation_prompt)
-            consolidated_recommendation = response.text
+            consolidated_recommendation = await generate_with_retry(self.client, consolidation_prompt,
+                                                                    namespace="brainstorm.consolidation",
+                                                                    semaphore=self._sem)
             
             # Create final outcome
             outcome = BrainstormOutcome(
@@ -99,11 +150,12 @@ class BrainstormFacilitator:
         try:
             # Create output directory if it doesn't exist
             output_dir = os.path.dirname(output_file)
-            if output_dir:
+            if output_dir and output_dir not in self._ensured_dirs:
                 os.makedirs(output_dir, exist_ok=True)
+                self._ensured_dirs.add(output_dir)
             
             # Format output as markdown
-            markdown = f"""# Brainstorm Outcome
+            parts = [f"""# Brainstorm Outcome
 Version: {outcome.version}
 Generated: {outcome.timestamp.isoformat()}
 
@@ -112,42 +164,46 @@ Generated: {outcome.timestamp.isoformat()}
 
 ## Solution Ideas
 
-"""
+"""]
             # Add each idea
             for i, idea in enumerate(outcome.ideas, 1):
-                markdown += f"""### {i}. {idea.title}
-{idea.description}
-
-**Key Features:**
-{chr(10).join([f"- {feature}" for feature in idea.key_features])}
-
-**Technical Approach:**
-{chr(10).join([f"- {approach}" for approach in idea.technical_approach])}
-
-**Pros:**
-{chr(10).join([f"- {pro}" for pro in idea.pros])}
-
-**Cons:**
-{chr(10).join([f"- {con}" for con in idea.cons])}
-
-Score: {idea.score}
-"""
+                parts.append(IDEA_TEMPLATE.format(
+                    index=i,
+                    title=idea.title,
+                    description=idea.description,
+                    key_features=_bullets(idea.key_features),
+                    technical_approach=_bullets(idea.technical_approach),
+                    pros=_bullets(idea.pros),
+                    cons=_bullets(idea.cons),
+                    score=idea.score
+                ))
                 if idea.contributing_specializations:
-                    markdown += f"\nContributing Specializations: {', '.join(idea.contributing_specializations)}"
+                    parts.append(f"\nContributing Specializations: {', '.join(idea.contributing_specializations)}")
                 if idea.synergy_score:
-                    markdown += f"\nSynergy Score: {idea.synergy_score}"
-                markdown += "\n\n"
+                    parts.append(f"\nSynergy Score: {idea.synergy_score}")
+                parts.append("\n\n")
             
             # Save to file
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(markdown)
+            output_path = Path(output_file)
+            output_path.write_text("".join(parts), encoding='utf-8')
+            # Structured copy so later stages can reload the outcome without re-parsing markdown
+            output_path.with_suffix(".json").write_text(outcome.model_dump_json(), encoding='utf-8')
                 
-            logger.info(f"Saved brainstorm outcome to {output_file}")
+            logger.info("Saved brainstorm outcome to {}", output_file)
             
         except Exception as e:
             logger.error(f"Error saving outcome: {str(e)}")
             raise
 
+    @staticmethod
+    def load_outcome(output_file: str) -> BrainstormOutcome:
+        """Load the structured outcome saved alongside a brainstorm markdown file."""
+        try:
+            return BrainstormOutcome.model_validate_json(Path(output_file).with_suffix(".json").read_bytes())
+        except Exception as e:
+            logger.error(f"Error loading outcome: {str(e)}")
+            raise
+
 @click.group()
 def cli():
     """Brainstorm Facilitator CLI"""
@@ -171,25 +227,35 @@ def generate(verbose):
         if verbose:
             logger.info(f"Created artifacts directory: {artifacts_dir.absolute()}")
         
-        # Initialize facilitator
-        facilitator = BrainstormFacilitator()
-        if verbose:
-            logger.info("Initialized BrainstormFacilitator")
-        
-        # Read product specs if available
         specs_file = artifacts_dir / "PRODUCT_SPECS.md"
-        product_specs = specs_file.read_text() if specs_file.exists() else "No product specs available"
-        
-        if verbose:
-            logger.info(f"Product specs file exists: {specs_file.exists()}")
-            if specs_file.exists():
-                logger.info(f"Product specs size: {len(product_specs)} characters")
         
-        # Generate ideas
-        if verbose:
-            logger.info("Starting idea generation")
+        async def run():
+            # Read product specs, if available, in a worker thread while the facilitator is set up
+            specs_read = asyncio.ensure_future(asyncio.to_thread(
+                lambda: specs_file.read_text() if specs_file.exists() else "No product specs available"
+            ))
+            # Let the task hand the read to its thread before the synchronous setup below
+            await asyncio.sleep(0)
+            
+            # Initialize facilitator
+            facilitator = BrainstormFacilitator()
+            if verbose:
+                logger.info("Initialized BrainstormFacilitator")
+            
+            product_specs = await specs_read
+            
+            if verbose:
+                logger.info(f"Product specs file exists: {specs_file.exists()}")
+                if specs_file.exists():
+                    logger.info(f"Product specs size: {len(product_specs)} characters")
+            
+            # Generate ideas
+            if verbose:
+                logger.info("Starting idea generation")
+            
+            return facilitator, await facilitator.generate_ideas(product_specs)
         
-        outcome = asyncio.run(facilitator.generate_ideas(product_specs))
+        facilitator, outcome = asyncio.run(run())
         
         if verbose:
             logger.info(f"Generated {len(outcome.ideas)} ideas")
@@ -2,9 +2,10 @@
 Automated checkpoint system for managing and tracking approval states across the development process.
 """
 from typing import Dict, Any, List, Optional
+import asyncio
 from pydantic import BaseModel
-from datetime import datetime
-import json
+from datetime import datetime, timezone
+from pathlib import Path
 from loguru import logger
 from .approval_system import ApprovalSystem, ValidationResult, RoleFeedback
 
@@ -19,11 +20,25 @@ class CheckpointStatus(BaseModel):
     approved_by: Optional[List[str]] = None
     blocking_issues: Optional[List[str]] = None
 
+class CheckpointReport(BaseModel):
+    """Validation report saved for a checkpoint."""
+    checkpoint_id: str
+    stage: str
+    status: str
+    timestamp: datetime
+    validation_result: Optional[ValidationResult] = None
+    cross_validation_results: Optional[Dict[str, RoleFeedback]] = None
+    approved_by: Optional[List[str]] = None
+    blocking_issues: Optional[List[str]] = None
+
 class CheckpointSystem:
     def __init__(self, approval_system: ApprovalSystem):
         """Initialize the checkpoint system with an approval system instance."""
         self.approval_system = approval_system
         self.checkpoints: Dict[str, CheckpointStatus] = {}
+        self._report_dir = Path("docs/validation_reports")
+        # Whether _report_dir has been created yet
+        self._report_dir_ready = False
         
     def create_checkpoint(self, checkpoint_id: str, stage: str) -> CheckpointStatus:
         """Create a new checkpoint for a specific stage."""
@@ -31,11 +46,11 @@ class CheckpointSystem:
             checkpoint_id=checkpoint_id,
             stage=stage,
             status="pending",
-            timestamp=datetime.now()
+            timestamp=datetime.now(timezone.utc)
         )
         
         self.checkpoints[checkpoint_id] = checkpoint
-        logger.info(f"Created checkpoint {checkpoint_id} for stage {stage}")
+        logger.info("Created checkpoint {} for stage {}", checkpoint_id, stage)
         return checkpoint
     
     async def validate_checkpoint(self, 
@@ -50,32 +65,30 @@ class CheckpointSystem:
         checkpoint = self.checkpoints[checkpoint_id]
         
         try:
-            # Perform main validation based on stage
+            # Pick the main validation based on stage
             if checkpoint.stage == "product_specs":
-                validation_result = await self.approval_system.validate_product_specs(content)
+                main_validation = self.approval_system.validate_product_specs(content)
             elif checkpoint.stage == "architecture":
-                validation_result = await self.approval_system.validate_architecture(content, context or {})
+                main_validation = self.approval_system.validate_architecture(content, context or {})
             else:
                 # Default validation for other stages
-                validation_result = await self.approval_system.validate_product_specs(content)
+                main_validation = self.approval_system.validate_product_specs(content)
             
-            checkpoint.validation_result = validation_result
-            
-            # Cross-validate with specified roles
-            cross_validation_results = {}
-            blocking_issues = []
-            
-            for role in validation_roles:
-                feedback = await self.approval_system.cross_validate_with_role(
+            # The main validation and each role's cross-validation are independent
+            # LLM round-trips, so run them all at once
+            validation_result, *feedbacks = await asyncio.gather(
+                main_validation,
+                *(self.approval_system.cross_validate_with_role(
                     content=content,
                     role=role,
                     context=context
-                )
-                
-                cross_validation_results[role] = feedback
-                
-                if feedback.concerns:
-                    blocking_issues.extend(feedback.concerns)
+                ) for role in validation_roles)
+            )
+            
+            checkpoint.validation_result = validation_result
+            
+            cross_validation_results = dict(zip(validation_roles, feedbacks))
+            blocking_issues = [concern for feedback in feedbacks for concern in feedback.concerns or []]
             
             checkpoint.cross_validation_results = cross_validation_results
             checkpoint.blocking_issues = blocking_issues if blocking_issues else None
@@ -107,31 +120,29 @@ class CheckpointSystem:
     def _save_validation_report(self, checkpoint: CheckpointStatus) -> None:
         """Save the validation report for a checkpoint."""
         try:
-            report = {
-                "checkpoint_id": checkpoint.checkpoint_id,
-                "stage": checkpoint.stage,
-                "status": checkpoint.status,
-                "timestamp": checkpoint.timestamp.isoformat(),
-                "validation_result": checkpoint.validation_result.model_dump() if checkpoint.validation_result else None,
-                "cross_validation_results": {
-                    role: feedback.model_dump()
-                    for role, feedback in (checkpoint.cross_validation_results or {}).items()
-                } if checkpoint.cross_validation_results else None,
-                "approved_by": checkpoint.approved_by,
-                "blocking_issues": checkpoint.blocking_issues
-            }
+            report = CheckpointReport(
+                checkpoint_id=checkpoint.checkpoint_id,
+                stage=checkpoint.stage,
+                status=checkpoint.status,
+                timestamp=checkpoint.timestamp,
+                validation_result=checkpoint.validation_result,
+                cross_validation_results=checkpoint.cross_validation_results or None,
+                approved_by=checkpoint.approved_by,
+                blocking_issues=checkpoint.blocking_issues
+            )
             
             # Save to validation reports directory
-            from pathlib import Path
-            report_dir = Path("docs/validation_reports")
-            report_dir.mkdir(parents=True, exist_ok=True)
+            if not self._report_dir_ready:
+                self._report_dir.mkdir(parents=True, exist_ok=True)
+                self._report_dir_ready = True
             
-            report_path = report_dir / f"checkpoint_{checkpoint.checkpoint_id}_{checkpoint.timestamp.strftime('%Y%m%d_%H%M%S')}.json"
+            report_path = self._report_dir / f"checkpoint_{checkpoint.checkpoint_id}_{checkpoint.timestamp.strftime('%Y%m%d_%H%M%S')}.json"
             
-            with open(report_path, "w") as f:
-                json.dump(report, f, indent=2)
+            # Serialized straight from the models, without an intermediate dict tree;
+            # unset optional sections are left out rather than written as null
+            report_path.write_text(report.model_dump_json(indent=2, exclude_none=True))
                 
-            logger.info(f"Saved validation report to {report_path}")
+            logger.info("Saved validation report to {}", report_path)
             
         except Exception as e:
             logger.error(f"Error saving validation report: {str(e)}")
@@ -1,20 +1,28 @@
 import os
-from typing import Dict, List, Optional, Any, Union
-from datetime import datetime
+from typing import Dict, List, Optional, Any, Set, Tuple
+from datetime import datetime, timezone
 from pathlib import Path
-import json
-from pydantic import BaseModel, Field
-import google.generativeai as genai
-from dotenv import load_dotenv
+import orjson
+from pydantic import BaseModel
 from loguru import logger
 import asyncio
-import re
-from dataclasses import dataclass
-import yaml
-import subprocess
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
 import psutil
 import numpy as np
-from scipy import stats
+from ._gemini_client import default_concurrency, generate_with_retry, get_model
+
+# Metrics checked for anomalies, in history column order
+METRIC_FIELDS = ("cpu_usage", "memory_usage", "response_time", "error_rate")
+# Seconds a health-check result is shared between services using the same endpoint
+HEALTH_CHECK_TTL = 5.0
+# Samples kept per service, and so the anomaly-detection baseline, before the oldest are dropped
+METRICS_HISTORY_WINDOW = 512
+
+def _to_json(data: Any) -> str:
+    """Serialize report and prompt data as indented JSON, NumPy values included."""
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
 
 class DeploymentConfig(BaseModel):
     environment: str
@@ -36,6 +44,76 @@ class ServiceMetrics(BaseModel):
     request_count: int
     timestamp: datetime
 
+def _metric_vector(metrics: ServiceMetrics) -> np.ndarray:
+    """Return the anomaly-checked metrics of one sample as a row vector."""
+    return np.array([metrics.cpu_usage, metrics.memory_usage, metrics.response_time, metrics.error_rate])
+
+@dataclass
+class RunningStats:
+    """Welford running mean and variance of a service's metric vectors."""
+    n: int = 0
+    mean: np.ndarray = field(default_factory=lambda: np.zeros(len(METRIC_FIELDS)))
+    m2: np.ndarray = field(default_factory=lambda: np.zeros(len(METRIC_FIELDS)))
+
+    def update(self, sample: np.ndarray) -> None:
+        """Fold one sample into the running statistics."""
+        self.n += 1
+        delta = sample - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (sample - self.mean)
+
+    def remove(self, sample: np.ndarray) -> None:
+        """Take a previously folded sample back out of the running statistics."""
+        self.n -= 1
+        if self.n == 0:
+            self.mean[:] = 0
+            self.m2[:] = 0
+            return
+        delta = sample - self.mean
+        self.mean -= delta / self.n
+        # Clamp rounding drift so the variance never goes negative
+        self.m2 = np.maximum(self.m2 - delta * (sample - self.mean), 0)
+
+    def std(self) -> np.ndarray:
+        """Population standard deviation of the tracked samples."""
+        return np.sqrt(self.m2 / self.n)
+
+def _z_scores(samples: np.ndarray, means: np.ndarray, stds: np.ndarray) -> np.ndarray:
+    """Absolute z-scores of each sample row against its history; 0 where the history does not vary."""
+    safe_stds = np.where(stds == 0, 1, stds)
+    return np.where(stds == 0, 0.0, np.abs(samples - means) / safe_stds)
+
+@dataclass
+class MetricsRing:
+    """Fixed-capacity history of a service's metric vectors, oldest overwritten first."""
+    capacity: int = METRICS_HISTORY_WINDOW
+    values: np.ndarray = field(init=False)
+    timestamps: np.ndarray = field(init=False)
+    head: int = 0
+    size: int = 0
+
+    def __post_init__(self) -> None:
+        self.values = np.empty((self.capacity, len(METRIC_FIELDS)))
+        self.timestamps = np.empty(self.capacity)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, sample: np.ndarray, timestamp: float) -> Optional[np.ndarray]:
+        """Store one sample taken at ``timestamp`` (Unix seconds); once full, overwrite and return the oldest."""
+        evicted = self.values[self.head].copy() if self.size == self.capacity else None
+        self.values[self.head] = sample
+        self.timestamps[self.head] = timestamp
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return evicted
+
+    def view(self) -> np.ndarray:
+        """Stored samples oldest first, one row each; a view unless the ring has wrapped."""
+        if self.size < self.capacity:
+            return self.values[:self.size]
+        return np.concatenate((self.values[self.head:], self.values[:self.head]))
+
 class Anomaly(BaseModel):
     service: str
     metric: str
@@ -64,6 +142,12 @@ class RollbackTrigger(BaseModel):
     affected_components: List[str]
     recovery_steps: List[str]
 
+def _format_anomalies(anomalies: List[Anomaly]) -> str:
+    """Render anomalies as a markdown bullet list."""
+    if not anomalies:
+        return "None"
+    return "\n".join(f"- **{a.service}** {a.metric} ({a.severity}): {a.description}" for a in anomalies)
+
 @dataclass
 class DeploymentReport:
     timestamp: datetime
@@ -78,28 +162,46 @@ class DeploymentReport:
     rollbacks_performed: List[RollbackTrigger]
     recommendations: List[str]
 
+    # Rendered once per report, so saving it to several places reformats nothing;
+    # they do not follow later changes to the report's fields
+
+    @cached_property
+    def configuration_changes_json(self) -> str:
+        return _to_json(self.configuration_changes)
+
+    @cached_property
+    def metrics_summary_json(self) -> str:
+        return _to_json(self.metrics_summary)
+
+    @cached_property
+    def anomalies_markdown(self) -> str:
+        return _format_anomalies(self.anomalies_detected)
+
 class DevOpsManager:
-    def __init__(self, model: str = "gemini-2.0-flash"):
-        """Initialize the DevOps Manager with AI configuration."""
+    def __init__(self, model: str = "gemini-2.0-flash", history_window: int = METRICS_HISTORY_WINDOW):
+        """Initialize the DevOps Manager with AI configuration.
+
+        ``history_window`` is the number of recent samples kept per service, which
+        is also the baseline anomalies are scored against.
+        """
         self.model = model
+        self.history_window = history_window
         
-        # Load environment variables
-        load_dotenv()
-        
-        # Configure Gemini
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-            
-        genai.configure(api_key=api_key)
-        self.client = genai.GenerativeModel(self.model)
+        self.client = get_model(self.model)
+        self._sem = asyncio.Semaphore(default_concurrency())
         
         # Initialize deployment directory
         self.deploy_dir = Path(__file__).parent / "deployments"
         self.deploy_dir.mkdir(exist_ok=True)
         
-        # Initialize metrics history
-        self.metrics_history: Dict[str, List[ServiceMetrics]] = {}
+        # Metrics history per service: one row per sample, columns as in METRIC_FIELDS
+        self.metrics_history: Dict[str, MetricsRing] = {}
+        # Running statistics over each service's history window, so detection never rescans it
+        self._running: Dict[str, RunningStats] = {}
+        # Latest health check per endpoint: when it started and its (possibly in-flight) result
+        self._health_checks: Dict[str, Tuple[float, "asyncio.Future[bool]"]] = {}
+        # Log directories already created by save_deployment_log
+        self._ensured_dirs: Set[Path] = set()
         
     async def generate_deployment_config(self, 
                                       architecture: Dict[str, Any],
@@ -110,7 +212,7 @@ class DevOpsManager:
             deploy_prompt = f"""Generate deployment configuration for:
 
             Architecture:
-            {json.dumps(architecture, indent=2)}
+            {_to_json(architecture)}
 
             Environment: {environment}
 
@@ -126,20 +228,27 @@ class DevOpsManager:
             Return as JSON matching DeploymentConfig model.
             """
 
-            response = await self.client.generate_content(deploy_prompt)
-            config_data = json.loads(response.text)
-            
-            return DeploymentConfig(**config_data)
+            # Configs for large architectures run to tens of KB, so stream the reply
+            # and validate the assembled JSON in one pass
+            response_text = await generate_with_retry(
+                self.client, deploy_prompt,
+                namespace="devops.deployment_config",
+                semaphore=self._sem,
+                stream=True,
+                generation_config={"response_mime_type": "application/json"}
+            )
+            return DeploymentConfig.model_validate_json(response_text)
             
         except Exception as e:
             logger.error(f"Error generating deployment config: {str(e)}")
             raise
 
     async def deploy_services(self, 
-                            config: DeploymentConfig) -> DeploymentStatus:
-        """Deploy services based on configuration."""
+                            config: DeploymentConfig,
+                            max_concurrency: int = 8) -> DeploymentStatus:
+        """Deploy services based on configuration, up to ``max_concurrency`` at a time."""
         try:
-            start_time = datetime.now()
+            start_time = datetime.now(timezone.utc)
             status = DeploymentStatus(
                 version=config.version,
                 environment=config.environment,
@@ -152,61 +261,22 @@ class DevOpsManager:
                 logs=[]
             )
             
-            # Deploy each service
-            for service in config.services:
-                try:
-                    # Simulate service deployment
-                    # In reality, this would use Docker, Kubernetes, etc.
-                    logger.info(f"Deploying {service}...")
-                    await asyncio.sleep(2)  # Simulate deployment time
-                    
-                    # Update environment variables
-                    os.environ.update(config.env_vars)
-                    
-                    # Perform health check
-                    health_endpoint = config.health_checks.get(service)
-                    if health_endpoint:
-                        # Simulate health check
-                        is_healthy = True  # Would actually check endpoint
-                        
-                        if is_healthy:
-                            status.services_status[service] = "healthy"
-                        else:
-                            status.services_status[service] = "unhealthy"
-                            raise Exception(f"Health check failed for {service}")
-                    
-                    # Collect initial metrics
-                    metrics = await self.collect_service_metrics(service)
-                    status.metrics.append(metrics)
-                    
-                    # Store metrics in history
-                    if service not in self.metrics_history:
-                        self.metrics_history[service] = []
-                    self.metrics_history[service].append(metrics)
-                    
-                except Exception as e:
-                    logger.error(f"Error deploying {service}: {str(e)}")
-                    status.services_status[service] = "failed"
-                    status.logs.append(f"Failed to deploy {service}: {str(e)}")
-                    
-                    # Trigger rollback if needed
-                    if config.rollback_version:
-                        await self.rollback_deployment(
-                            config,
-                            RollbackTrigger(
-                                service=service,
-                                reason=str(e),
-                                metrics={},
-                                timestamp=datetime.now(),
-                                affected_components=[service],
-                                recovery_steps=[
-                                    f"Rollback {service} to version {config.rollback_version}"
-                                ]
-                            )
-                        )
+            # Host-level usage is the same for every service, so sample it once per round
+            cpu_usage = psutil.cpu_percent(interval=None)
+            memory_usage = psutil.virtual_memory().percent
+            
+            # Services are independent, so deploy them concurrently
+            semaphore = asyncio.Semaphore(max_concurrency)
+            
+            async def deploy(service: str) -> Optional[ServiceMetrics]:
+                async with semaphore:
+                    return await self._deploy_service(config, status, service, cpu_usage, memory_usage)
+            
+            results = await asyncio.gather(*(deploy(service) for service in config.services))
+            status.metrics.extend(metrics for metrics in results if metrics is not None)
             
             # Update final status
-            status.end_time = datetime.now()
+            status.end_time = datetime.now(timezone.utc)
             if all(s == "healthy" for s in status.services_status.values()):
                 status.status = "success"
             else:
@@ -218,71 +288,152 @@ class DevOpsManager:
             logger.error(f"Error in deployment: {str(e)}")
             raise
 
+    async def _deploy_service(self,
+                              config: DeploymentConfig,
+                              status: DeploymentStatus,
+                              service: str,
+                              cpu_usage: float,
+                              memory_usage: float) -> Optional[ServiceMetrics]:
+        """Deploy one service, recording its health in ``status``; returns its initial metrics."""
+        try:
+            # Simulate service deployment
+            # In reality, this would use Docker, Kubernetes, etc.
+            logger.info("Deploying {}...", service)
+            await asyncio.sleep(2)  # Simulate deployment time
+            
+            # Update environment variables
+            os.environ.update(config.env_vars)
+            
+            # Perform health check
+            health_endpoint = config.health_checks.get(service)
+            if health_endpoint:
+                is_healthy = await self._check_health(health_endpoint)
+                
+                if is_healthy:
+                    status.services_status[service] = "healthy"
+                else:
+                    status.services_status[service] = "unhealthy"
+                    raise Exception(f"Health check failed for {service}")
+            
+            # Collect initial metrics and store them in history; recording does not
+            # await, so concurrent deployments cannot interleave inside it
+            metrics = await self.collect_service_metrics(service, cpu_usage, memory_usage)
+            self._record_metrics(service, metrics)
+            return metrics
+            
+        except Exception as e:
+            logger.error(f"Error deploying {service}: {str(e)}")
+            status.services_status[service] = "failed"
+            status.logs.append(f"Failed to deploy {service}: {str(e)}")
+            
+            # Trigger rollback if needed
+            if config.rollback_version:
+                await self.rollback_deployment(
+                    config,
+                    RollbackTrigger(
+                        service=service,
+                        reason=str(e),
+                        metrics={},
+                        timestamp=datetime.now(timezone.utc),
+                        affected_components=[service],
+                        recovery_steps=[
+                            f"Rollback {service} to version {config.rollback_version}"
+                        ]
+                    )
+                )
+            return None
+
+    async def _check_health(self, endpoint: str) -> bool:
+        """Check ``endpoint``, sharing one check among services that use it within HEALTH_CHECK_TTL."""
+        now = time.monotonic()
+        cached = self._health_checks.get(endpoint)
+        if (cached is None or now - cached[0] > HEALTH_CHECK_TTL
+                or cached[1].get_loop() is not asyncio.get_running_loop()):
+            task = asyncio.ensure_future(self._probe_health(endpoint))
+            self._health_checks[endpoint] = (now, task)
+        else:
+            logger.debug("Reusing health check of {}", endpoint)
+            task = cached[1]
+        # A cancelled deployment must not cancel the check for the others waiting on it
+        return await asyncio.shield(task)
+
+    async def _probe_health(self, endpoint: str) -> bool:
+        """Probe a health endpoint once."""
+        # Simulate health check
+        return True  # Would actually check endpoint
+
     async def collect_service_metrics(self, 
-                                    service: str) -> ServiceMetrics:
-        """Collect performance metrics for a service."""
+                                    service: str,
+                                    cpu_usage: Optional[float] = None,
+                                    memory_usage: Optional[float] = None) -> ServiceMetrics:
+        """Collect performance metrics for a service, reusing host usage sampled by the caller."""
         try:
             # Simulate metric collection
             # In reality, would use Prometheus, Grafana, etc.
             return ServiceMetrics(
                 service_name=service,
-                cpu_usage=psutil.cpu_percent(),
-                memory_usage=psutil.virtual_memory().percent,
+                cpu_usage=psutil.cpu_percent() if cpu_usage is None else cpu_usage,
+                memory_usage=psutil.virtual_memory().percent if memory_usage is None else memory_usage,
                 response_time=np.random.normal(100, 20),  # Simulated ms
                 error_rate=np.random.random() * 0.1,  # Simulated 0-10%
                 request_count=int(np.random.normal(1000, 200)),  # Simulated
-                timestamp=datetime.now()
+                timestamp=datetime.now(timezone.utc)
             )
             
         except Exception as e:
             logger.error(f"Error collecting metrics for {service}: {str(e)}")
             raise
 
+    def _record_metrics(self, service: str, metrics: ServiceMetrics) -> None:
+        """Append a metrics sample to the service's history, dropping the oldest beyond the window."""
+        sample = _metric_vector(metrics)
+        history = self.metrics_history.get(service)
+        if history is None:
+            history = self.metrics_history[service] = MetricsRing(self.history_window)
+        running = self._running.setdefault(service, RunningStats())
+        evicted = history.append(sample, metrics.timestamp.timestamp())
+        if evicted is not None:
+            running.remove(evicted)
+        running.update(sample)
+
     async def detect_anomalies(self, 
                              metrics: List[ServiceMetrics],
                              thresholds: Dict[str, float]) -> List[Anomaly]:
         """Detect anomalies in service metrics."""
         try:
             anomalies = []
+            threshold_vector = np.array([thresholds.get(name, 3.0) for name in METRIC_FIELDS])  # Default 3 sigma
             
-            for metric in metrics:
-                # Get historical metrics for the service
-                history = self.metrics_history.get(metric.service_name, [])
-                if len(history) < 10:  # Need enough history for detection
-                    continue
-                
-                # Calculate z-scores for each metric
-                historical_values = {
-                    "cpu_usage": [m.cpu_usage for m in history],
-                    "memory_usage": [m.memory_usage for m in history],
-                    "response_time": [m.response_time for m in history],
-                    "error_rate": [m.error_rate for m in history]
-                }
-                
-                current_values = {
-                    "cpu_usage": metric.cpu_usage,
-                    "memory_usage": metric.memory_usage,
-                    "response_time": metric.response_time,
-                    "error_rate": metric.error_rate
-                }
+            # Pair each sample with its service's running statistics; need enough history for detection
+            checked = [(metric, running) for metric in metrics
+                       if (running := self._running.get(metric.service_name)) is not None and running.n >= 10]
+            if not checked:
+                return anomalies
+            
+            # z-scores of every current sample against its service's history in one pass
+            current = np.array([_metric_vector(metric) for metric, _ in checked])
+            means = np.array([running.mean for _, running in checked])
+            stds = np.array([running.std() for _, running in checked])
+            z_scores = _z_scores(current, means, stds)
+            
+            detected_at = datetime.now(timezone.utc)
+            for row, i in zip(*np.nonzero(z_scores > threshold_vector)):
+                service = checked[row][0].service_name
+                metric_name = METRIC_FIELDS[i]
+                current_value = float(current[row, i])
+                z_score = float(z_scores[row, i])
+                threshold = float(threshold_vector[i])
+                severity = "critical" if z_score > threshold * 1.5 else "warning"
                 
-                for metric_name, current_value in current_values.items():
-                    historical = historical_values[metric_name]
-                    z_score = abs(stats.zscore([current_value] + historical))[0]
-                    threshold = thresholds.get(metric_name, 3.0)  # Default 3 sigma
-                    
-                    if z_score > threshold:
-                        severity = "critical" if z_score > threshold * 1.5 else "warning"
-                        
-                        anomalies.append(Anomaly(
-                            service=metric.service_name,
-                            metric=metric_name,
-                            value=current_value,
-                            threshold=threshold,
-                            timestamp=datetime.now(),
-                            severity=severity,
-                            description=f"Anomalous {metric_name}: {current_value:.2f} (z-score: {z_score:.2f})"
-                        ))
+                anomalies.append(Anomaly(
+                    service=service,
+                    metric=metric_name,
+                    value=current_value,
+                    threshold=threshold,
+                    timestamp=detected_at,
+                    severity=severity,
+                    description=f"Anomalous {metric_name}: {current_value:.2f} (z-score: {z_score:.2f})"
+                ))
             
             return anomalies
             
@@ -299,7 +450,7 @@ class DevOpsManager:
                 logger.error("No rollback version specified")
                 return False
             
-            logger.info(f"Rolling back {trigger.service} to {config.rollback_version}")
+            logger.info("Rolling back {} to {}", trigger.service, config.rollback_version)
             
             # Simulate rollback
             # In reality, would use container orchestration, etc.
@@ -334,16 +485,22 @@ class DevOpsManager:
                                  config: DeploymentConfig) -> DeploymentReport:
         """Generate comprehensive deployment report."""
         try:
-            # Calculate metrics summary
+            # Group the deployment's samples by service in one pass
+            by_service: Dict[str, List[np.ndarray]] = {service: [] for service in config.services}
+            for m in status.metrics:
+                if m.service_name in by_service:
+                    by_service[m.service_name].append(_metric_vector(m))
+            
+            # Calculate metrics summary, all four means per service at once
             metrics_summary = {}
-            for service in config.services:
-                service_metrics = [m for m in status.metrics if m.service_name == service]
-                if service_metrics:
+            for service, samples in by_service.items():
+                if samples:
+                    avg_cpu, avg_memory, avg_response, error_rate = np.mean(samples, axis=0)
                     metrics_summary[service] = {
-                        "avg_cpu": np.mean([m.cpu_usage for m in service_metrics]),
-                        "avg_memory": np.mean([m.memory_usage for m in service_metrics]),
-                        "avg_response": np.mean([m.response_time for m in service_metrics]),
-                        "error_rate": np.mean([m.error_rate for m in service_metrics])
+                        "avg_cpu": avg_cpu,
+                        "avg_memory": avg_memory,
+                        "avg_response": avg_response,
+                        "error_rate": error_rate
                     }
             
             # Generate recommendations
@@ -378,7 +535,7 @@ class DevOpsManager:
                 )
             
             return DeploymentReport(
-                timestamp=datetime.now(),
+                timestamp=datetime.now(timezone.utc),
                 environment=config.environment,
                 version=config.version,
                 status=status.status,
@@ -405,29 +562,16 @@ class DevOpsManager:
         try:
             base_path = Path(base_dir)
             logs_dir = base_path / "deployment_logs"
-            logs_dir.mkdir(exist_ok=True)
+            if logs_dir not in self._ensured_dirs:
+                logs_dir.mkdir(exist_ok=True)
+                self._ensured_dirs.add(logs_dir)
             
             # Generate log filename
             timestamp = report.timestamp.strftime("%Y%m%d_%H%M%S")
             log_file = logs_dir / f"deployment_{timestamp}.md"
             
-            # Format rollbacks section
-            rollbacks_text = ""
-            for rollback in report.rollbacks_performed:
-                recovery_steps = "\n".join(f"    - {step}" for step in rollback.recovery_steps)
-                rollbacks_text += f"""
-- **{rollback.service}**
-  - Reason: {rollback.reason}
-  - Affected Components: {", ".join(rollback.affected_components)}
-  - Recovery Steps:
-{recovery_steps}
-"""
-
-            # Format recommendations
-            recommendations = "\n".join(f"- {rec}" for rec in report.recommendations)
-
-            # Write deployment log
-            log_file.write_text(f"""# Deployment Report
+            # Assemble the log section by section and join once at the end
+            parts = [f"""# Deployment Report
 
 ## Overview
 - Timestamp: {report.timestamp}
@@ -440,22 +584,33 @@ class DevOpsManager:
 {", ".join(report.services_deployed)}
 
 ## Configuration Changes
-{json.dumps(report.configuration_changes, indent=2)}
+{report.configuration_changes_json}
 
 ## Metrics Summary
-{json.dumps(report.metrics_summary, indent=2)}
+{report.metrics_summary_json}
 
 ## Anomalies Detected
-{self._format_anomalies(report.anomalies_detected)}
+{report.anomalies_markdown}
 
 ## Rollbacks Performed
-{rollbacks_text}
-
-## Recommendations
-{recommendations}
+"""]
+            for rollback in report.rollbacks_performed:
+                parts.append(f"""
+- **{rollback.service}**
+  - Reason: {rollback.reason}
+  - Affected Components: {", ".join(rollback.affected_components)}
+  - Recovery Steps:
 """)
+                parts.extend(f"    - {step}\n" for step in rollback.recovery_steps)
+            
+            parts.append("\n\n## Recommendations\n")
+            parts.append("\n".join(f"- {rec}" for rec in report.recommendations))
+            parts.append("\n")
+            
+            # Write deployment log
+            log_file.write_text("".join(parts))
 
-            logger.info(f"Deployment log saved to {log_file}")
+            logger.info("Deployment log saved to {}", log_file)
             
         except Exception as e:
             logger.error(f"Error saving deployment log: {str(e)}")
@@ -1,17 +1,312 @@
 import click
 from loguru import logger
-import google.generativeai as genai
 import os
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, Iterator, List, Optional, Any, Tuple
 from pathlib import Path
-import json
+import asyncio
+from collections import OrderedDict
+import hashlib
 import re
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from dataclasses import dataclass
-import yaml
+from functools import lru_cache
+import orjson
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from google.generativeai import caching
+from ._frozen import FrozenSlots
+from ._gemini_client import default_concurrency, generate_validated, generate_with_retry, get_model
+from ._summarize import summarize_python
+
+# Prompt scaffolds, built once at import and filled in per call with str.format
+DOCUMENTATION_PROMPT = """You are a Technical Documentation Specialist responsible for creating
+comprehensive, clear, and well-structured documentation. Focus on making the documentation
+accessible to developers while maintaining technical accuracy.
+
+Based on this system architecture:
+{architecture}
+
+And these code files:
+{code_section}
+
+Generate comprehensive documentation including:
+1. Overview
+   - System purpose and goals
+   - Key features and capabilities
+   - Technology stack
+   - Architecture overview
+
+2. System Architecture
+   - Component breakdown
+   - Data flow diagrams
+   - Integration points
+   - Security considerations
+
+3. Component Documentation
+   - Purpose and responsibilities
+   - Dependencies and relationships
+   - Configuration options
+   - Usage examples
+
+4. API Reference
+   - Endpoints and methods
+   - Request/response formats
+   - Authentication
+   - Rate limiting
+
+5. Setup Guide
+   - Prerequisites
+   - Installation steps
+   - Configuration
+   - Environment setup
+
+6. Deployment Instructions
+   - Deployment options
+   - Environment variables
+   - Infrastructure requirements
+   - Monitoring setup
+
+7. Troubleshooting Guide
+   - Common issues
+   - Debug procedures
+   - Logging and monitoring
+   - Support resources
+
+8. Development Workflow
+   - Code organization
+   - Testing strategy
+   - CI/CD pipeline
+   - Contributing guidelines
+"""
+
+MERGE_DOCUMENTATION_PROMPT = """You are a Technical Documentation Specialist. The documentation below was written
+in {count} parts, each covering a different subset of the same system's code files.
+
+Merge the parts into one comprehensive document with the same sections, combining what
+each part says about a section and removing repetition.
+
+{documents}
+"""
+
+API_DOC_PROMPT = """You are an API Documentation Specialist focusing on creating
+clear, accurate, and developer-friendly API documentation.
+
+Based on these code files:
+{code_section}
+
+{api_context}
+Generate comprehensive API documentation including:
+1. Endpoint specifications
+   - Path and method
+   - Description and purpose
+   - Parameters and types
+   - Response formats
+   - Authentication requirements
+
+2. Usage examples
+   - Request examples
+   - Response examples
+   - Error scenarios
+   - Rate limiting
+
+3. Best practices
+   - Security considerations
+   - Performance optimization
+   - Error handling
+   - Versioning strategy
+
+Return the documentation in a structured format that can be parsed into APIEndpoint objects.
+"""
+
+COMPONENT_DOC_PROMPT = """You are a Component Documentation Specialist focusing on creating
+clear and comprehensive component documentation.
+
+{arch_context}
+For these components:
+{components}
+
+Generate detailed component documentation including:
+1. Component overview
+   - Purpose and responsibilities
+   - Design principles
+   - Dependencies
+
+2. Public API
+   - Methods and functions
+   - Parameters and return types
+   - Usage patterns
+
+3. Configuration
+   - Required settings
+   - Optional parameters
+   - Environment variables
+
+4. Integration
+   - Dependencies
+   - Event handling
+   - Error scenarios
+
+5. Examples
+   - Usage examples
+   - Integration examples
+   - Configuration examples
+
+Return the documentation in a structured format that can be parsed into ComponentDoc objects.
+"""
 
-@dataclass
-class APIEndpoint:
+CHANGELOG_PROMPT = """Generate a detailed changelog for version {current_version} (previous: {previous_version})
+based on these changes:
+
+{changes}
+
+Include:
+1. Version and date
+2. Changes by category
+   - Features
+   - Improvements
+   - Bug fixes
+   - Performance
+3. Breaking changes
+4. Migration guide
+5. Upgrade steps
+
+Return in a format that can be parsed into a ChangelogEntry object.
+"""
+
+CURSOR_RULES_PROMPT = """{context}
+Based on this documentation:
+
+{documentation}
+
+Generate updated .cursorrules that:
+1. Enforce documentation standards
+   - Required sections
+   - Format consistency
+   - Example inclusion
+
+2. Maintain API documentation
+   - Parameter documentation
+   - Return type documentation
+   - Error handling documentation
+
+3. Component documentation
+   - Purpose documentation
+   - Dependency documentation
+   - Configuration documentation
+
+4. Code examples
+   - Usage examples
+   - Error handling examples
+   - Configuration examples
+
+Return the rules as a JSON array with one object per rule, giving its category, pattern,
+message and severity.
+"""
+
+# Gemini only accepts explicit context caches above a minimum size
+CONTEXT_CACHE_MIN_TOKENS = 2048
+CONTEXT_CACHE_TTL = timedelta(hours=1)
+# Rough chars-per-token ratio used to size prompts without a count_tokens round-trip
+CHARS_PER_TOKEN = 4
+# Code contexts kept per Documenter, least recently used evicted first
+CODE_CONTEXT_MEMO_SIZE = 8
+# Files whose contents are kept in memory, keyed by path and modification time
+FILE_MEMO_SIZE = 512
+# Stands in for the code files in prompts sent against a cached context
+CACHED_CODE_NOTE = "The code files are provided in the cached context."
+# Prompt budget, kept well under Gemini's 1M-token input window to absorb the rough estimate
+MAX_PROMPT_TOKENS = 800_000
+
+# Block headers and the indented fields read from them in generated API and component docs
+API_DOC_LINE = re.compile(r"^(?:Endpoint:|  (?P<field>Path|Method|Description):(?P<value>.*))", re.MULTILINE)
+COMPONENT_DOC_LINE = re.compile(r"^(?:Component:|  (?P<field>Name|Description):(?P<value>.*))", re.MULTILINE)
+# Section headers of a generated changelog; "Breaking Changes:" is tried before its "Changes:" suffix
+CHANGELOG_SECTION = re.compile(r"(Breaking Changes|Migration Guide|Changes):")
+CHANGE_CATEGORY = re.compile(r"(feature|fix|improvement):", re.IGNORECASE)
+
+def _parse_blocks(raw_docs: str, line_re: re.Pattern) -> List[Dict[str, str]]:
+    """Collect the fields of each block in one regex scan, keyed by lowercased field name."""
+    blocks = []
+    for match in line_re.finditer(raw_docs):
+        if match["field"] is None:
+            blocks.append({})
+        elif blocks:
+            blocks[-1][match["field"].lower()] = match["value"].strip()
+    return blocks
+
+def _to_json(data: Any) -> str:
+    """Serialize prompt content as indented JSON with sorted keys, so equal data gives an identical prompt."""
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS).decode()
+
+def _changelog_sections(raw_changelog: str) -> Dict[str, str]:
+    """Split a changelog into its sections in one regex scan; the first section of each name wins."""
+    headers = list(CHANGELOG_SECTION.finditer(raw_changelog))
+    sections: Dict[str, str] = {}
+    for header, following in zip(headers, headers[1:] + [None]):
+        end = following.start() if following else len(raw_changelog)
+        sections.setdefault(header[1], raw_changelog[header.end():end].strip())
+    return sections
+
+def _iter_python_files(directory: str) -> Iterator[str]:
+    """Yield the paths of the .py files under ``directory``, not following directory symlinks."""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_python_files(entry.path)
+            elif entry.name.endswith('.py') and entry.is_file():
+                yield entry.path
+
+@lru_cache(maxsize=FILE_MEMO_SIZE)
+def _read_text(path: str, mtime_ns: int) -> str:
+    """Read ``path``; ``mtime_ns`` only keys the cache, so an edited file is read again."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def _pack_chunks(parts: Tuple[str, ...], max_chars: int) -> List[str]:
+    """Greedily join consecutive ``parts`` into chunks of at most ``max_chars``.
+
+    A part longer than ``max_chars`` on its own becomes a chunk by itself.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for part in parts:
+        if current and size + len(part) > max_chars:
+            chunks.append(''.join(current))
+            current, size = [], 0
+        current.append(part)
+        size += len(part)
+    if current:
+        chunks.append(''.join(current))
+    return chunks
+
+def _file_versions(paths: List[str]) -> Tuple[Tuple[str, Optional[int]], ...]:
+    """Pair each path with its modification time, None for files that cannot be stat'ed."""
+    versions = []
+    for path in paths:
+        try:
+            versions.append((path, os.stat(path).st_mtime_ns))
+        except OSError:
+            versions.append((path, None))
+    return tuple(versions)
+
+def _cursor_rule_lines(rules: List["CursorRule"]) -> Iterator[str]:
+    """Yield the .cursorrules lines for ``rules``, grouped by category in first-seen order."""
+    by_category: Dict[str, List[CursorRule]] = {}
+    for rule in rules:
+        by_category.setdefault(rule.category, []).append(rule)
+    for category, grouped in by_category.items():
+        yield f"# {category}"
+        for rule in grouped:
+            yield f"- pattern: {rule.pattern}"
+            yield f"  message: {rule.message}"
+            yield f"  severity: {rule.severity}"
+        yield ""
+
+# Parsed docs are read-only and slotted; dataclass(slots=True) needs Python 3.10, so slots are listed by hand
+@dataclass(frozen=True)
+class APIEndpoint(FrozenSlots):
+    __slots__ = ("path", "method", "description", "parameters", "responses", "examples")
     path: str
     method: str
     description: str
@@ -19,8 +314,9 @@ class APIEndpoint:
     responses: Dict[str, Any]
     examples: List[Dict[str, Any]]
 
-@dataclass
-class ComponentDoc:
+@dataclass(frozen=True)
+class ComponentDoc(FrozenSlots):
+    __slots__ = ("name", "description", "dependencies", "public_api", "usage_examples", "configuration")
     name: str
     description: str
     dependencies: List[str]
@@ -28,30 +324,39 @@ class ComponentDoc:
     usage_examples: List[str]
     configuration: Dict[str, Any]
 
-@dataclass
-class ChangelogEntry:
+@dataclass(frozen=True)
+class ChangelogEntry(FrozenSlots):
+    __slots__ = ("version", "date", "changes", "breaking_changes", "migration_guide")
     version: str
     date: datetime
     changes: List[Dict[str, Any]]
     breaking_changes: List[str]
     migration_guide: Optional[str]
 
+@dataclass(frozen=True)
+class CursorRule(FrozenSlots):
+    __slots__ = ("category", "pattern", "message", "severity")
+    category: str
+    pattern: str
+    message: str
+    severity: str
+
 class Documenter:
-    def __init__(self, model: str = "gemini-2.0-flash"):
-        """Initialize the Documenter with AI configuration."""
+    def __init__(self, model: str = "gemini-2.0-flash", full_source: bool = False):
+        """Initialize the Documenter with AI configuration.
+
+        Python files are sent to the model as outlines (imports, signatures, docstrings and
+        the first lines of each body) unless ``full_source`` is set.
+        """
         self.model = model
+        self.full_source = full_source
         
-        # Load environment variables
-        from dotenv import load_dotenv
-        load_dotenv()
-        
-        # Configure Gemini
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-            
-        genai.configure(api_key=api_key)
-        self.client = genai.GenerativeModel(self.model)
+        self.client = get_model(self.model)
+        self._sem = asyncio.Semaphore(default_concurrency())
+        # Server-side caches of code corpora, keyed by content hash, reused until they expire
+        self._context_caches: Dict[str, caching.CachedContent] = {}
+        # Concatenated code files per file set and versions, shared by the doc methods
+        self._code_contexts: "OrderedDict[tuple, asyncio.Future[Tuple[Tuple[str, ...], str]]]" = OrderedDict()
         
         # Initialize documentation directory
         self.docs_dir = Path(__file__).parent.parent / "docs"
@@ -63,81 +368,20 @@ class Documenter:
         """Generate comprehensive documentation based on architecture and code."""
         try:
             # Load architecture and code files
-            architecture = self.load_file(architecture_file)
-            code_contents = []
-            for file in code_files:
-                try:
-                    content = self.load_file(file)
-                    code_contents.append(f"File: {file}\n{content}")
-                except Exception as e:
-                    logger.warning(f"Could not load file {file}: {str(e)}")
-            
-            # Prepare the prompt
-            system_message = """You are a Technical Documentation Specialist responsible for creating
-            comprehensive, clear, and well-structured documentation. Focus on making the documentation
-            accessible to developers while maintaining technical accuracy."""
-            
-            prompt = f"""{system_message}
-
-            Based on this system architecture:
-            {architecture}
-
-            And these code files:
-            {''.join(code_contents)}
-
-            Generate comprehensive documentation including:
-            1. Overview
-               - System purpose and goals
-               - Key features and capabilities
-               - Technology stack
-               - Architecture overview
-            
-            2. System Architecture
-               - Component breakdown
-               - Data flow diagrams
-               - Integration points
-               - Security considerations
-            
-            3. Component Documentation
-               - Purpose and responsibilities
-               - Dependencies and relationships
-               - Configuration options
-               - Usage examples
+            architecture, (code_parts, code_text) = await asyncio.gather(self.aload_file(architecture_file),
+                                                                         self._code_context_parts(code_files))
             
-            4. API Reference
-               - Endpoints and methods
-               - Request/response formats
-               - Authentication
-               - Rate limiting
+            prompt_for = lambda code_section: DOCUMENTATION_PROMPT.format(architecture=architecture,
+                                                                          code_section=code_section)
             
-            5. Setup Guide
-               - Prerequisites
-               - Installation steps
-               - Configuration
-               - Environment setup
-            
-            6. Deployment Instructions
-               - Deployment options
-               - Environment variables
-               - Infrastructure requirements
-               - Monitoring setup
-            
-            7. Troubleshooting Guide
-               - Common issues
-               - Debug procedures
-               - Logging and monitoring
-               - Support resources
-            
-            8. Development Workflow
-               - Code organization
-               - Testing strategy
-               - CI/CD pipeline
-               - Contributing guidelines
-            """
+            # Code that would overflow the prompt budget is documented in chunks and merged
+            max_chars = MAX_PROMPT_TOKENS * CHARS_PER_TOKEN - len(prompt_for(""))
+            if len(code_text) > max_chars:
+                return await self._generate_chunked_documentation(prompt_for, code_parts, max_chars)
             
             # Get completion from the model
-            response = await self.client.generate_content(prompt)
-            return response.text
+            return await self._generate_with_code(prompt_for, code_text,
+                                                  namespace="documenter.documentation")
             
         except Exception as e:
             logger.error(f"Error generating documentation: {str(e)}")
@@ -149,52 +393,17 @@ class Documenter:
         """Generate API documentation with examples and best practices."""
         try:
             # Load code files
-            code_contents = []
-            for file in code_files:
-                try:
-                    content = self.load_file(file)
-                    code_contents.append(f"File: {file}\n{content}")
-                except Exception as e:
-                    logger.warning(f"Could not load file {file}: {str(e)}")
+            code_text = await self._code_context(code_files)
             
             # Prepare API context
-            api_context = f"API Specification:\n{json.dumps(api_spec, indent=2)}\n" if api_spec else ""
-            
-            # Generate documentation
-            system_message = """You are an API Documentation Specialist focusing on creating
-            clear, accurate, and developer-friendly API documentation."""
+            api_context = f"API Specification:\n{_to_json(api_spec)}\n" if api_spec else ""
             
-            prompt = f"""{system_message}
-
-            Based on these code files:
-            {''.join(code_contents)}
-
-            {api_context}
-            Generate comprehensive API documentation including:
-            1. Endpoint specifications
-               - Path and method
-               - Description and purpose
-               - Parameters and types
-               - Response formats
-               - Authentication requirements
+            prompt_for = lambda code_section: API_DOC_PROMPT.format(code_section=code_section,
+                                                                    api_context=api_context)
             
-            2. Usage examples
-               - Request examples
-               - Response examples
-               - Error scenarios
-               - Rate limiting
-            
-            3. Best practices
-               - Security considerations
-               - Performance optimization
-               - Error handling
-               - Versioning strategy
-            
-            Return the documentation in a structured format that can be parsed into APIEndpoint objects.
-            """
-            
-            response = await self.client.generate_content(prompt)
-            return self._parse_api_documentation(response.text)
+            response_text = await self._generate_with_code(prompt_for, code_text,
+                                                           namespace="documenter.api")
+            return self._parse_api_documentation(response_text)
             
         except Exception as e:
             logger.error(f"Error generating API documentation: {str(e)}")
@@ -206,49 +415,13 @@ class Documenter:
         """Generate detailed component documentation."""
         try:
             # Prepare component context
-            arch_context = f"Architecture:\n{json.dumps(architecture, indent=2)}\n" if architecture else ""
-            
-            # Generate documentation
-            system_message = """You are a Component Documentation Specialist focusing on creating
-            clear and comprehensive component documentation."""
-            
-            prompt = f"""{system_message}
-
-            {arch_context}
-            For these components:
-            {json.dumps(component_files, indent=2)}
-
-            Generate detailed component documentation including:
-            1. Component overview
-               - Purpose and responsibilities
-               - Design principles
-               - Dependencies
+            arch_context = f"Architecture:\n{_to_json(architecture)}\n" if architecture else ""
             
-            2. Public API
-               - Methods and functions
-               - Parameters and return types
-               - Usage patterns
+            prompt = COMPONENT_DOC_PROMPT.format(arch_context=arch_context,
+                                                 components=_to_json(component_files))
             
-            3. Configuration
-               - Required settings
-               - Optional parameters
-               - Environment variables
-            
-            4. Integration
-               - Dependencies
-               - Event handling
-               - Error scenarios
-            
-            5. Examples
-               - Usage examples
-               - Integration examples
-               - Configuration examples
-            
-            Return the documentation in a structured format that can be parsed into ComponentDoc objects.
-            """
-            
-            response = await self.client.generate_content(prompt)
-            return self._parse_component_documentation(response.text)
+            response_text = await self._call(prompt, namespace="documenter.components", stream=True)
+            return self._parse_component_documentation(response_text)
             
         except Exception as e:
             logger.error(f"Error generating component documentation: {str(e)}")
@@ -260,31 +433,12 @@ class Documenter:
                               changes: List[Dict[str, Any]]) -> ChangelogEntry:
         """Generate a detailed changelog with migration guide."""
         try:
-            system_message = """You are a Release Documentation Specialist focusing on creating
-            clear and informative changelogs with migration guidance."""
+            prompt = CHANGELOG_PROMPT.format(current_version=current_version,
+                                             previous_version=previous_version,
+                                             changes=_to_json(changes))
             
-            prompt = f"""
-            Generate a detailed changelog for version {current_version} (previous: {previous_version})
-            based on these changes:
-
-            {json.dumps(changes, indent=2)}
-
-            Include:
-            1. Version and date
-            2. Changes by category
-               - Features
-               - Improvements
-               - Bug fixes
-               - Performance
-            3. Breaking changes
-            4. Migration guide
-            5. Upgrade steps
-            
-            Return in a format that can be parsed into a ChangelogEntry object.
-            """
-            
-            response = await self.client.generate_content(prompt)
-            return self._parse_changelog(response.text, current_version)
+            response_text = await self._call(prompt, namespace="documenter.changelog")
+            return self._parse_changelog(response_text, current_version)
             
         except Exception as e:
             logger.error(f"Error generating changelog: {str(e)}")
@@ -295,44 +449,131 @@ class Documenter:
                                existing_rules: Optional[str] = None) -> str:
         """Update .cursorrules based on documentation insights."""
         try:
-            system_message = """You are a Development Tools Expert updating IDE rules
-            to maintain documentation quality and consistency."""
-            
             context = f"Existing rules:\n{existing_rules}\n" if existing_rules else ""
-            prompt = f"""{context}
-            Based on this documentation:
-
-            {documentation}
-
-            Generate updated .cursorrules that:
-            1. Enforce documentation standards
-               - Required sections
-               - Format consistency
-               - Example inclusion
-            
-            2. Maintain API documentation
-               - Parameter documentation
-               - Return type documentation
-               - Error handling documentation
-            
-            3. Component documentation
-               - Purpose documentation
-               - Dependency documentation
-               - Configuration documentation
-            
-            4. Code examples
-               - Usage examples
-               - Error handling examples
-               - Configuration examples
-            """
+            prompt = CURSOR_RULES_PROMPT.format(context=context, documentation=documentation)
             
-            response = await self.client.generate_content(prompt)
-            return self._format_cursor_rules(response.text)
+            rules = await generate_validated(self.client, prompt,
+                                             namespace="documenter.cursor_rules",
+                                             semaphore=self._sem,
+                                             schema=List[CursorRule])
+            return self._format_cursor_rules(rules)
             
         except Exception as e:
             logger.error(f"Error updating cursor rules: {str(e)}")
             raise
 
+    async def generate_full_docset(self,
+                                   architecture_file: str,
+                                   code_files: List[str],
+                                   api_spec: Optional[Dict] = None,
+                                   component_files: Optional[Dict[str, str]] = None,
+                                   architecture: Optional[Dict] = None,
+                                   version_info: Optional[Dict[str, Any]] = None,
+                                   existing_rules: Optional[str] = None) -> Dict[str, Any]:
+        """Generate the whole documentation suite with independent Gemini calls in flight together.
+
+        Returns ``documentation``, ``api``, ``components``, ``changelog`` and ``cursor_rules``.
+        Component docs need ``component_files`` and the changelog needs ``version_info``
+        (``current_version``, ``previous_version`` and ``changes``); parts that are skipped
+        or fail are None, so one failure does not lose the rest of the suite. Cursor rules
+        are derived from the documentation and follow it.
+        """
+        async def documentation_and_rules() -> tuple:
+            documentation = await self.generate_documentation(architecture_file, code_files)
+            try:
+                rules = await self.update_cursor_rules(documentation, existing_rules)
+            except Exception as e:
+                logger.error(f"Skipping cursor rules in docset: {str(e)}")
+                rules = None
+            return documentation, rules
+
+        parts = {
+            "documentation": documentation_and_rules(),
+            "api": self.generate_api_documentation(code_files, api_spec)
+        }
+        if component_files:
+            parts["components"] = self.generate_component_documentation(component_files, architecture)
+        if version_info:
+            parts["changelog"] = self.generate_changelog(**version_info)
+        
+        docset = dict.fromkeys(("documentation", "api", "components", "changelog", "cursor_rules"))
+        results = await asyncio.gather(*parts.values(), return_exceptions=True)
+        for name, result in zip(parts, results):
+            if isinstance(result, Exception):
+                logger.error(f"Skipping {name} in docset: {str(result)}")
+            elif name == "documentation":
+                docset["documentation"], docset["cursor_rules"] = result
+            else:
+                docset[name] = result
+        
+        return docset
+
+    async def _call(self,
+                    prompt: str,
+                    *,
+                    namespace: str,
+                    client: Optional[genai.GenerativeModel] = None,
+                    stream: bool = False) -> str:
+        """Send a prompt to Gemini and return the reply text.
+
+        Repeat and near-identical prompts are answered from the shared response cache;
+        quota and transient server errors are retried inside the shared client helpers.
+        ``stream`` consumes long replies incrementally so time-to-first-token is visible
+        in the debug log.
+        """
+        return await generate_with_retry(client or self.client, prompt,
+                                         namespace=namespace,
+                                         semaphore=self._sem,
+                                         stream=stream)
+
+    async def _generate_with_code(self,
+                                  prompt_for: Callable[[str], str],
+                                  code_text: str,
+                                  *,
+                                  namespace: str) -> str:
+        """Generate from ``prompt_for(code_section)``, serving large ``code_text`` from a context cache.
+
+        Documenting the same files again, e.g. their API after their overview, then
+        reuses the cached corpus instead of resending it. Replies documenting a whole
+        code base are long, so they are always streamed.
+        """
+        key = hashlib.sha256(code_text.encode()).hexdigest()
+        cache = await self._code_context_cache(key, code_text)
+        if cache is not None:
+            try:
+                return await self._call(prompt_for(CACHED_CODE_NOTE), namespace=namespace,
+                                        client=genai.GenerativeModel.from_cached_content(cache),
+                                        stream=True)
+            except google_exceptions.NotFound:
+                logger.warning("Code context cache is gone, sending the full prompt")
+                self._context_caches.pop(key, None)
+        
+        return await self._call(prompt_for(code_text), namespace=namespace, stream=True)
+
+    async def _code_context_cache(self, key: str, code_text: str) -> Optional[caching.CachedContent]:
+        """Return a live context cache holding ``code_text`` if it is large enough to qualify."""
+        if len(code_text) // CHARS_PER_TOKEN < CONTEXT_CACHE_MIN_TOKENS:
+            return None
+        
+        cache = self._context_caches.get(key)
+        # Leave a margin so the cache cannot expire mid-request
+        if cache is not None and cache.expire_time > datetime.now(timezone.utc) + timedelta(minutes=1):
+            return cache
+        
+        try:
+            cache = await asyncio.to_thread(
+                caching.CachedContent.create,
+                model=self.model,
+                display_name=f"docs-{key[:12]}",
+                contents=[f"Code files:\n{code_text}"],
+                ttl=CONTEXT_CACHE_TTL
+            )
+        except Exception as e:
+            logger.warning(f"Context caching unavailable, sending full prompts: {str(e)}")
+            return None
+        self._context_caches[key] = cache
+        return cache
+
     def save_file(self, content: str, filepath: str) -> None:
         """Save content to a file, creating directories if needed."""
         try:
@@ -344,11 +585,75 @@ class Documenter:
             logger.error(f"Error saving file {filepath}: {str(e)}")
             raise
 
+    async def aload_file(self, filepath: str) -> str:
+        """Load file content without blocking the event loop."""
+        return await asyncio.to_thread(self.load_file, filepath)
+
+    async def _generate_chunked_documentation(self,
+                                              prompt_for: Callable[[str], str],
+                                              code_parts: Tuple[str, ...],
+                                              max_chars: int) -> str:
+        """Document chunks of ``code_parts`` in parallel, then merge the partial docs in one call."""
+        chunks = _pack_chunks(code_parts, max_chars)
+        logger.info("Code exceeds the prompt budget, documenting it in {} chunks", len(chunks))
+        partials = await asyncio.gather(*(self._call(prompt_for(chunk), namespace="documenter.documentation",
+                                                     stream=True)
+                                          for chunk in chunks))
+        merge_prompt = MERGE_DOCUMENTATION_PROMPT.format(count=len(partials),
+                                                         documents="\n\n---\n\n".join(partials))
+        return await self._call(merge_prompt, namespace="documenter.documentation_merge", stream=True)
+
+    async def _code_context(self, code_files: List[str]) -> str:
+        """Return the labelled contents of ``code_files`` as one string."""
+        _, code_text = await self._code_context_parts(code_files)
+        return code_text
+
+    async def _code_context_parts(self, code_files: List[str]) -> Tuple[Tuple[str, ...], str]:
+        """Return the labelled contents of ``code_files``, per file and concatenated.
+
+        Both are built once per file set and rebuilt when any file changes;
+        concurrent doc methods asking for the same files share one read.
+        """
+        key = await asyncio.to_thread(_file_versions, code_files)
+        task = self._code_contexts.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(self._build_code_context(code_files))
+            self._code_contexts[key] = task
+            if len(self._code_contexts) > CODE_CONTEXT_MEMO_SIZE:
+                self._code_contexts.popitem(last=False)
+        else:
+            self._code_contexts.move_to_end(key)
+        # A cancelled caller must not cancel the read for the others waiting on it
+        return await asyncio.shield(task)
+
+    async def _build_code_context(self, code_files: List[str]) -> Tuple[Tuple[str, ...], str]:
+        """Read ``code_files`` and concatenate them."""
+        parts = tuple(await self._load_code_files(code_files))
+        return parts, ''.join(parts)
+
+    async def _load_code_files(self, code_files: List[str]) -> List[str]:
+        """Read all code files concurrently, each labelled with its path; unreadable files are skipped."""
+        contents = await asyncio.gather(*(asyncio.to_thread(self._read_code_file, file) for file in code_files),
+                                        return_exceptions=True)
+        code_contents = []
+        for file, content in zip(code_files, contents):
+            if isinstance(content, Exception):
+                logger.warning(f"Could not load file {file}: {str(content)}")
+            else:
+                code_contents.append(f"File: {file}\n{content}")
+        return code_contents
+
+    def _read_code_file(self, filepath: str) -> str:
+        """Load a code file as sent to the model, outlining Python sources unless full_source is set."""
+        content = self.load_file(filepath)
+        if self.full_source or not filepath.endswith('.py'):
+            return content
+        return summarize_python(content)
+
     def load_file(self, filepath: str) -> str:
-        """Load content from a file."""
+        """Load content from a file, reusing the last read while the file is unchanged."""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return f.read()
+            return _read_text(filepath, os.stat(filepath).st_mtime_ns)
         except Exception as e:
             logger.error(f"Error loading file {filepath}: {str(e)}")
             raise
@@ -356,27 +661,13 @@ class Documenter:
     def _parse_api_documentation(self, raw_docs: str) -> List[APIEndpoint]:
         """Parse raw API documentation into structured format."""
         try:
-            endpoints = []
-            current_endpoint = None
-            
-            for line in raw_docs.split('\n'):
-                if line.startswith('Endpoint:'):
-                    if current_endpoint:
-                        endpoints.append(current_endpoint)
-                    current_endpoint = {}
-                elif current_endpoint is not None:
-                    if line.startswith('  Path:'):
-                        current_endpoint['path'] = line.split(':', 1)[1].strip()
-                    elif line.startswith('  Method:'):
-                        current_endpoint['method'] = line.split(':', 1)[1].strip()
-                    elif line.startswith('  Description:'):
-                        current_endpoint['description'] = line.split(':', 1)[1].strip()
-                    # Add more parsing logic for parameters, responses, etc.
-            
-            if current_endpoint:
-                endpoints.append(current_endpoint)
-            
-            return [APIEndpoint(**endpoint) for endpoint in endpoints]
+            return [APIEndpoint(path=block.get("path", ""),
+                                method=block.get("method", ""),
+                                description=block.get("description", ""),
+                                parameters=[],
+                                responses={},
+                                examples=[])
+                    for block in _parse_blocks(raw_docs, API_DOC_LINE)]
             
         except Exception as e:
             logger.error(f"Error parsing API documentation: {str(e)}")
@@ -385,25 +676,13 @@ class Documenter:
     def _parse_component_documentation(self, raw_docs: str) -> List[ComponentDoc]:
         """Parse raw component documentation into structured format."""
         try:
-            components = []
-            current_component = None
-            
-            for line in raw_docs.split('\n'):
-                if line.startswith('Component:'):
-                    if current_component:
-                        components.append(current_component)
-                    current_component = {}
-                elif current_component is not None:
-                    if line.startswith('  Name:'):
-                        current_component['name'] = line.split(':', 1)[1].strip()
-                    elif line.startswith('  Description:'):
-                        current_component['description'] = line.split(':', 1)[1].strip()
-                    # Add more parsing logic for dependencies, API, etc.
-            
-            if current_component:
-                components.append(current_component)
-            
-            return [ComponentDoc(**component) for component in components]
+            return [ComponentDoc(name=block.get("name", ""),
+                                 description=block.get("description", ""),
+                                 dependencies=[],
+                                 public_api=[],
+                                 usage_examples=[],
+                                 configuration={})
+                    for block in _parse_blocks(raw_docs, COMPONENT_DOC_LINE)]
             
         except Exception as e:
             logger.error(f"Error parsing component documentation: {str(e)}")
@@ -412,68 +691,39 @@ class Documenter:
     def _parse_changelog(self, raw_changelog: str, version: str) -> ChangelogEntry:
         """Parse raw changelog into structured format."""
         try:
-            # Extract sections using regex
-            changes_section = re.search(r"Changes:(.*?)(?=Breaking Changes:|$)", 
-                                     raw_changelog, re.DOTALL)
-            breaking_section = re.search(r"Breaking Changes:(.*?)(?=Migration Guide:|$)", 
-                                      raw_changelog, re.DOTALL)
-            migration_section = re.search(r"Migration Guide:(.*?)(?=$)", 
-                                       raw_changelog, re.DOTALL)
+            sections = _changelog_sections(raw_changelog)
             
             # Parse changes into categories
             changes = []
-            if changes_section:
-                for line in changes_section.group(1).strip().split('\n'):
-                    if line.strip():
-                        category = "other"
-                        if "feature:" in line.lower():
-                            category = "feature"
-                        elif "fix:" in line.lower():
-                            category = "fix"
-                        elif "improvement:" in line.lower():
-                            category = "improvement"
-                        changes.append({
-                            "category": category,
-                            "description": line.strip()
-                        })
+            for line in sections.get("Changes", "").split('\n'):
+                if line.strip():
+                    category = CHANGE_CATEGORY.search(line)
+                    changes.append({
+                        "category": category[1].lower() if category else "other",
+                        "description": line.strip()
+                    })
             
             # Parse breaking changes
-            breaking_changes = []
-            if breaking_section:
-                breaking_changes = [line.strip() 
-                                 for line in breaking_section.group(1).strip().split('\n')
-                                 if line.strip()]
+            breaking_changes = [line.strip()
+                                for line in sections.get("Breaking Changes", "").split('\n')
+                                if line.strip()]
             
             return ChangelogEntry(
                 version=version,
                 date=datetime.now(),
                 changes=changes,
                 breaking_changes=breaking_changes,
-                migration_guide=migration_section.group(1).strip() if migration_section else None
+                migration_guide=sections.get("Migration Guide")
             )
             
         except Exception as e:
             logger.error(f"Error parsing changelog: {str(e)}")
             raise
 
-    def _format_cursor_rules(self, raw_rules: str) -> str:
+    def _format_cursor_rules(self, rules: List[CursorRule]) -> str:
         """Format rules into .cursorrules format."""
         try:
-            # Parse the rules into a structured format
-            rules_dict = yaml.safe_load(raw_rules)
-            
-            # Convert to .cursorrules format
-            formatted_rules = []
-            
-            for category, rules in rules_dict.items():
-                formatted_rules.append(f"# {category}")
-                for rule in rules:
-                    formatted_rules.append(f"- pattern: {rule['pattern']}")
-                    formatted_rules.append(f"  message: {rule['message']}")
-                    formatted_rules.append(f"  severity: {rule['severity']}")
-                formatted_rules.append("")
-            
-            return "\n".join(formatted_rules)
+            return "\n".join(_cursor_rule_lines(rules))
             
         except Exception as e:
             logger.error(f"Error formatting cursor rules: {str(e)}")
@@ -483,20 +733,17 @@ class Documenter:
 @click.option('--architecture-file', required=True, help='Path to the system architecture file')
 @click.option('--code-dir', required=True, help='Directory containing code files to document')
 @click.option('--output', required=True, help='Output file path for documentation')
-def main(architecture_file: str, code_dir: str, output: str):
+@click.option('--full-source', is_flag=True, help='Send complete source files instead of outlines')
+def main(architecture_file: str, code_dir: str, output: str, full_source: bool):
     """Generate comprehensive documentation using the Documenter agent."""
     try:
-        documenter = Documenter()
+        documenter = Documenter(full_source=full_source)
         
-        # Get all Python files in the code directory
-        code_files = []
-        for root, _, files in os.walk(code_dir):
-            for file in files:
-                if file.endswith('.py'):
-                    code_files.append(os.path.join(root, file))
+        # Get all Python files in the code directory, in a stable order so prompts repeat exactly
+        code_files = sorted(_iter_python_files(code_dir))
         
         # Generate documentation
-        documentation = documenter.generate_documentation(architecture_file, code_files)
+        documentation = asyncio.run(documenter.generate_documentation(architecture_file, code_files))
         
         # Save to file
         documenter.save_file(documentation, output)
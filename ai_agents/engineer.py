@@ -1,17 +1,21 @@
 import click
-import os
 import json
+import orjson
 from loguru import logger
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, Iterable, List, Optional, Any, Set, Union
 from datetime import datetime
 from pathlib import Path
-import google.generativeai as genai
-from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 import asyncio
 import ast
+import hashlib
+from collections import OrderedDict
 from dataclasses import dataclass
-import re
+import yaml
+from ._code_analysis import CodeCollector
+from ._dependencies import extract_dependencies
+from ._frozen import FrozenSlots
+from ._gemini_client import default_concurrency, generate_with_retry, get_model
 
 class CodeQuality(BaseModel):
     complexity: int
@@ -47,8 +51,10 @@ class E2ETest(TestCase):
     environment_setup: Dict[str, Any]
     cleanup_steps: List[str]
 
-@dataclass
-class CodeAnalysis:
+# Read-only and without a per-instance __dict__; slots are listed by hand to stay on Python 3.9
+@dataclass(frozen=True)
+class CodeAnalysis(FrozenSlots):
+    __slots__ = ("imports", "classes", "functions", "dependencies", "complexity", "potential_issues")
     imports: List[str]
     classes: List[str]
     functions: List[str]
@@ -67,115 +73,158 @@ class CodeImplementation(BaseModel):
     commit_message: str
     review_status: Optional[Dict[str, Any]] = None
 
+def _to_json(data: Any) -> str:
+    """Serialize prompt and report content as indented JSON; YAML plans may carry non-string keys."""
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+
+# Skeleton written for each generated test case, filled in with str.format
+TEST_FILE_TEMPLATE = '''"""
+Test: {name}
+Description: {description}
+Type: {test_type}
+"""
+import pytest
+from typing import Dict, Any
+import json
+import asyncio
+from pathlib import Path
+
+# Test setup
+{setup}
+
+# Test implementation
+def test_{name}():
+    # Arrange
+    inputs = {inputs}
+    expected = {expected}
+    
+    # Act
+    # TODO: Implement test logic
+    
+    # Assert
+    # TODO: Add assertions
+
+# Test teardown
+{teardown}
+'''
+
+# Code analyses kept in memory per Engineer, least recently used evicted first
+ANALYSIS_MEMO_SIZE = 256
+
+def _commit_message(component_spec: Dict[str, Any], tests: List[TestCase], quality: CodeQuality) -> str:
+    """Conventional commit message for a generated component."""
+    name = component_spec.get('name', 'Unknown Component')
+    return (f"feat({name}): implement {name}\n\n"
+            f"Adds {len(tests)} tests.\n"
+            f"Quality: complexity {quality.complexity}, test coverage {quality.test_coverage}%, "
+            f"security score {quality.security_score}.")
+
+def _copy_analysis(analysis: CodeAnalysis) -> CodeAnalysis:
+    """Copy ``analysis`` with fresh containers, keeping the memoized one unchanged."""
+    return CodeAnalysis(
+        imports=list(analysis.imports),
+        classes=list(analysis.classes),
+        functions=list(analysis.functions),
+        dependencies=list(analysis.dependencies),
+        complexity=dict(analysis.complexity),
+        potential_issues=list(analysis.potential_issues)
+    )
+
+def _make_dirs(directories: List[Path]) -> None:
+    """Create ``directories`` in order, including missing parents."""
+    for directory in directories:
+        directory.mkdir(parents=True, exist_ok=True)
+
+def _write_file(path: Path, content: str, mode: str = 'w') -> None:
+    """Write ``content`` to ``path``."""
+    with path.open(mode, encoding='utf-8') as f:
+        f.write(content)
+
 class Engineer:
     def __init__(self, model: str = "gemini-2.0-flash"):
         """Initialize the Engineer with AI configuration and development tools."""
         self.model = model
         
-        # Load environment variables
-        load_dotenv()
-        
-        # Configure Gemini
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-            
-        genai.configure(api_key=api_key)
-        self.client = genai.GenerativeModel(self.model)
+        self.client = get_model(self.model)
+        self._sem = asyncio.Semaphore(default_concurrency())
+        # Analyses keyed by a digest of the analyzed source
+        self._analyses: "OrderedDict[bytes, CodeAnalysis]" = OrderedDict()
+        # Directories already created by this engineer, so repeat saves skip the mkdir;
+        # checked and created under the lock so concurrent saves never race on it
+        self._ensured_dirs: Set[Path] = set()
+        self._dirs_lock = asyncio.Lock()
+        # Saves append to the shared commit summary, so those appends run one at a time
+        self._summary_lock = asyncio.Lock()
         
         # Initialize test templates directory
         self.templates_dir = Path(__file__).parent / "templates"
         self.templates_dir.mkdir(exist_ok=True)
         
+    def load_plan(self, plan_file: str) -> Dict[str, Any]:
+        """Load a development plan, parsed as data according to its extension.
+
+        Plans are JSON (``.json``) or YAML (``.yaml``/``.yml``, read with the libyaml
+        loader when available); any other file is refused rather than guessed at.
+        """
+        suffix = Path(plan_file).suffix.lower()
+        if suffix not in (".json", ".yaml", ".yml"):
+            raise ValueError(f"Unsupported plan format {suffix!r}; use .json, .yaml or .yml")
+        
+        with open(plan_file, 'r', encoding='utf-8') as f:
+            if suffix == ".json":
+                return orjson.loads(f.read())
+            return yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+    async def _call(self, prompt: str, *, namespace: str) -> str:
+        """Send a prompt to Gemini and return the reply text.
+
+        Prompts seen before, such as those of components unchanged since the last run,
+        are answered from the on-disk response cache unless GEMINI_RESPONSE_CACHE=0;
+        quota and transient server errors are retried inside the shared client helpers.
+        """
+        return await generate_with_retry(self.client, prompt,
+                                         namespace=namespace,
+                                         semaphore=self._sem,
+                                         persist=True)
+
     async def analyze_code(self, code: str) -> CodeAnalysis:
-        """Analyze code structure and complexity."""
+        """Analyze code structure and complexity.
+
+        Analyses are memoized on a digest of the source, so unchanged code is not parsed again;
+        each call gets its own copy, so callers may change the result freely. Callers that only
+        need dependency names should use ``extract_dependencies``, which skips the parse.
+        """
         try:
-            tree = ast.parse(code)
-            
-            # Extract imports
-            imports = [node.names[0].name for node in ast.walk(tree) if isinstance(node, ast.Import)]
-            imports.extend([f"{node.module}.{name.name}" for node in ast.walk(tree) 
-                          if isinstance(node, ast.ImportFrom) for name in node.names])
+            key = hashlib.blake2b(code.encode("utf-8"), digest_size=16).digest()
+            analysis = self._analyses.get(key)
+            if analysis is not None:
+                self._analyses.move_to_end(key)
+                return _copy_analysis(analysis)
             
-            # Extract classes and functions
-            classes = [node.name for node in ast.walk(tree) if isinstance(node, ast.ClassDef)]
-            functions = [node.name for node in ast.walk(tree) if isinstance(node, ast.FunctionDef)]
-            
-            # Calculate complexity
-            complexity = {}
-            for node in ast.walk(tree):
-                if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
-                    complexity[node.name] = self._calculate_complexity(node)
-            
-            # Identify potential issues
-            issues = self._identify_code_issues(tree)
+            # Imports, definitions, complexity and issues in one pass over the tree
+            collector = CodeCollector()
+            collector.visit(ast.parse(code))
             
             # Extract dependencies
-            dependencies = self._extract_dependencies(code)
+            dependencies = extract_dependencies(code)
             
-            return CodeAnalysis(
-                imports=imports,
-                classes=classes,
-                functions=functions,
+            analysis = CodeAnalysis(
+                imports=collector.imports + collector.from_imports,
+                classes=collector.classes,
+                functions=collector.functions,
                 dependencies=dependencies,
-                complexity=complexity,
-                potential_issues=issues
+                complexity=collector.complexity,
+                potential_issues=collector.issues
             )
+            self._analyses[key] = analysis
+            if len(self._analyses) > ANALYSIS_MEMO_SIZE:
+                self._analyses.popitem(last=False)
+            return _copy_analysis(analysis)
             
         except Exception as e:
             logger.error(f"Error analyzing code: {str(e)}")
             raise
 
-    def _calculate_complexity(self, node: ast.AST) -> int:
-        """Calculate cyclomatic complexity of a code block."""
-        complexity = 1
-        for child in ast.walk(node):
-            if isinstance(child, (ast.If, ast.While, ast.For, ast.ExceptHandler)):
-                complexity += 1
-            elif isinstance(child, ast.BoolOp):
-                complexity += len(child.values) - 1
-        return complexity
-
-    def _identify_code_issues(self, tree: ast.AST) -> List[str]:
-        """Identify potential code issues and anti-patterns."""
-        issues = []
-        
-        for node in ast.walk(tree):
-            # Check for overly complex functions
-            if isinstance(node, ast.FunctionDef):
-                if self._calculate_complexity(node) > 10:
-                    issues.append(f"High complexity in function {node.name}")
-                    
-            # Check for large try-except blocks
-            if isinstance(node, ast.Try):
-                if len(node.body) > 15:
-                    issues.append("Large try-except block detected")
-                    
-            # Check for multiple returns
-            if isinstance(node, ast.FunctionDef):
-                returns = len([n for n in ast.walk(node) if isinstance(n, ast.Return)])
-                if returns > 3:
-                    issues.append(f"Multiple return statements in {node.name}")
-        
-        return issues
-
-    def _extract_dependencies(self, code: str) -> List[str]:
-        """Extract external dependencies from code."""
-        dependencies = set()
-        
-        # Regular expressions for different import patterns
-        import_patterns = [
-            r'import\s+(\w+)',
-            r'from\s+(\w+)\s+import',
-            r'require\s*\(\s*[\'"](.+?)[\'"]\s*\)'
-        ]
-        
-        for pattern in import_patterns:
-            matches = re.finditer(pattern, code)
-            dependencies.update(match.group(1) for match in matches)
-        
-        return list(dependencies)
-
     async def generate_component_code(self, 
                                    component_spec: Dict[str, Any], 
                                    architecture: Dict[str, Any],
@@ -190,14 +239,17 @@ class Engineer:
                 "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
             
+            # The spec goes into every prompt below, so serialize it once
+            spec_json = _to_json(component_spec)
+            
             # Generate implementation code
             implementation_prompt = f"""Generate production-ready implementation code for this component:
 
             Component Specification:
-            {json.dumps(component_spec, indent=2)}
+            {spec_json}
 
             System Architecture:
-            {json.dumps(architecture, indent=2)}
+            {_to_json(architecture)}
 
             Existing Code (if any):
             {existing_code if existing_code else 'No existing code'}
@@ -221,17 +273,17 @@ class Engineer:
             5. documentation: API docs and usage examples
             """
 
-            implementation_response = await self.client.generate_content(implementation_prompt)
-            implementation_data = json.loads(implementation_response.text)
+            implementation_text = await self._call(implementation_prompt, namespace="engineer.implementation")
+            implementation_data = orjson.loads(implementation_text)
             
-            # Generate tests
+            # Tests and quality metrics both depend only on the implementation, so they run together
             test_prompt = f"""Create comprehensive tests for this implementation:
 
             Implementation:
             {implementation_data['code_content']}
 
             Component Specification:
-            {json.dumps(component_spec, indent=2)}
+            {spec_json}
 
             Create:
             1. Unit tests for each function/method
@@ -243,55 +295,41 @@ class Engineer:
             Format as JSON array of test objects (UnitTest, IntegrationTest, or E2ETest).
             """
 
-            test_response = await self.client.generate_content(test_prompt)
-            test_data = json.loads(test_response.text)
-            
-            # Parse test data into appropriate test objects
-            tests = []
-            for test in test_data:
-                if test["test_type"] == "unit":
-                    tests.append(UnitTest(**test))
-                elif test["test_type"] == "integration":
-                    tests.append(IntegrationTest(**test))
-                else:
-                    tests.append(E2ETest(**test))
-            
-            # Calculate quality metrics
             quality_prompt = f"""Analyze this implementation for quality metrics:
 
             Code:
             {implementation_data['code_content']}
 
-            Tests:
-            {json.dumps(test_data, indent=2)}
+            Component Specification:
+            {spec_json}
 
             Calculate:
             1. Code complexity
             2. Maintainability index
             3. Documentation coverage
-            4. Test coverage
+            4. Test coverage (expected once the specification's behaviour is tested)
             5. Security score
             6. Performance score
 
             Return as JSON object matching CodeQuality model.
             """
 
-            quality_response = await self.client.generate_content(quality_prompt)
-            quality_data = json.loads(quality_response.text)
+            test_text, quality_text = await asyncio.gather(
+                self._call(test_prompt, namespace="engineer.tests"),
+                self._call(quality_prompt, namespace="engineer.quality"),
+            )
+            test_data = orjson.loads(test_text)
+            quality = CodeQuality(**orjson.loads(quality_text))
             
-            # Generate commit message
-            commit_prompt = f"""Create a descriptive commit message for these changes:
-
-            Component: {component_spec.get('name', 'Unknown Component')}
-            Changes:
-            1. New implementation
-            2. Added {len(tests)} tests
-            3. Quality metrics: {json.dumps(quality_data, indent=2)}
-
-            Follow conventional commit format.
-            """
-
-            commit_response = await self.client.generate_content(commit_prompt)
+            # Parse test data into appropriate test objects
+            tests = []
+            for test in test_data:
+                if test["test_type"] == "unit":
+                    tests.append(UnitTest(**test))
+                elif test["test_type"] == "integration":
+                    tests.append(IntegrationTest(**test))
+                else:
+                    tests.append(E2ETest(**test))
             
             # Create and return CodeImplementation
             return CodeImplementation(
@@ -299,10 +337,10 @@ class Engineer:
                 code_content=implementation_data["code_content"],
                 language=implementation_data["language"],
                 dependencies=implementation_data["dependencies"],
-                quality_metrics=CodeQuality(**quality_data),
+                quality_metrics=quality,
                 tests=tests,
                 documentation=implementation_data["documentation"],
-                commit_message=commit_response.text.strip()
+                commit_message=_commit_message(component_spec, tests, quality)
             )
 
         except Exception as e:
@@ -319,8 +357,8 @@ class Engineer:
             
             # Call the actual implementation method
             implementation = await self.generate_component_code(
-                json.loads(plan),
-                json.loads(architecture)
+                orjson.loads(plan),
+                orjson.loads(architecture)
             )
             return implementation.code_content
             
@@ -339,7 +377,7 @@ class Engineer:
             {implementation.code_content}
 
             Test Case:
-            {json.dumps(test_case.dict(), indent=2)}
+            {test_case.model_dump_json(indent=2)}
 
             Requirements:
             1. Use appropriate testing framework
@@ -352,78 +390,85 @@ class Engineer:
             8. Include error case testing
             """
 
-            response = await self.client.generate_content(test_prompt)
-            return response.text
+            return await self._call(test_prompt, namespace="engineer.test_code")
 
         except Exception as e:
             logger.error(f"Error generating test code: {str(e)}")
             raise
 
-    def save_implementation(self, 
-                          implementation: CodeImplementation,
-                          base_dir: str):
-        """Save implementation code and tests."""
+    async def implement_plan(self, plan_data: Dict[str, Any], output_dir: str) -> List[CodeImplementation]:
+        """Generate and save every component of a development plan concurrently.
+
+        Gemini calls stay bounded by the engineer's GEMINI_CONCURRENCY semaphore and are
+        retried on quota and transient server errors. Every component is attempted and each
+        failure is logged by component name; the first is raised once the others have finished.
+        """
+        architecture = plan_data.get("architecture", {})
+        
+        async def implement(component: Dict[str, Any]) -> CodeImplementation:
+            implementation = await self.generate_component_code(component, architecture)
+            await self.save_implementation(implementation, output_dir)
+            return implementation
+        
+        components = plan_data.get("components", [])
+        results = await asyncio.gather(*(implement(component) for component in components),
+                                       return_exceptions=True)
+        failures = [(component, result) for component, result in zip(components, results)
+                    if isinstance(result, Exception)]
+        for component, error in failures:
+            logger.error(f"Component {component.get('name', '<unnamed>')} failed: {str(error)}")
+        if failures:
+            logger.error(f"{len(failures)} of {len(components)} components failed; the rest were saved")
+            raise failures[0][1]
+        return results
+
+    async def _ensure_dirs(self, directories: Iterable[Path]) -> None:
+        """Create each of ``directories`` once; later saves into them skip the mkdir call."""
+        async with self._dirs_lock:
+            # Sorted paths list parents before their children
+            missing = sorted(set(directories) - self._ensured_dirs)
+            if missing:
+                await asyncio.to_thread(_make_dirs, missing)
+                self._ensured_dirs.update(missing)
+
+    async def asave_file(self, path: Path, content: str, mode: str = 'w') -> None:
+        """Write a file without blocking the event loop, creating its directory on first use."""
+        await self._ensure_dirs((path.parent,))
+        await asyncio.to_thread(_write_file, path, content, mode)
+
+    async def save_implementation(self, 
+                                  implementation: CodeImplementation,
+                                  base_dir: str):
+        """Save implementation code, tests, docs and quality report, writing the files concurrently."""
         try:
             base_path = Path(base_dir)
             
-            # Save main implementation
+            # Main implementation
             impl_path = base_path / implementation.file_path
-            impl_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            with impl_path.open('w') as f:
-                f.write(implementation.code_content)
+            files: Dict[Path, str] = {impl_path: implementation.code_content}
             
-            # Save tests
+            # Tests
             test_dir = impl_path.parent / "tests"
-            test_dir.mkdir(exist_ok=True)
             
             for test in implementation.tests:
                 test_path = test_dir / f"test_{impl_path.stem}_{test.name}.py"
-                
-                with test_path.open('w') as f:
-                    f.write(f"""\"\"\"
-Test: {test.name}
-Description: {test.description}
-Type: {test.test_type}
-\"\"\"
-import pytest
-from typing import Dict, Any
-import json
-import asyncio
-from pathlib import Path
-
-# Test setup
-{test.setup_code if test.setup_code else '# No setup required'}
-
-# Test implementation
-def test_{test.name}():
-    # Arrange
-    inputs = {json.dumps(test.inputs, indent=4)}
-    expected = {json.dumps(test.expected_outputs, indent=4)}
-    
-    # Act
-    # TODO: Implement test logic
-    
-    # Assert
-    # TODO: Add assertions
-
-# Test teardown
-{test.teardown_code if test.teardown_code else '# No teardown required'}
-""")
+                files[test_path] = TEST_FILE_TEMPLATE.format(
+                    name=test.name,
+                    description=test.description,
+                    test_type=test.test_type,
+                    setup=test.setup_code or '# No setup required',
+                    inputs=json.dumps(test.inputs, indent=4),
+                    expected=json.dumps(test.expected_outputs, indent=4),
+                    teardown=test.teardown_code or '# No teardown required'
+                )
             
-            # Save documentation
+            # Documentation
             docs_dir = impl_path.parent / "docs"
-            docs_dir.mkdir(exist_ok=True)
-            
-            with (docs_dir / f"{impl_path.stem}_api.md").open('w') as f:
-                f.write(implementation.documentation.get("api", ""))
+            files[docs_dir / f"{impl_path.stem}_api.md"] = implementation.documentation.get("api", "")
+            files[docs_dir / f"{impl_path.stem}_usage.md"] = implementation.documentation.get("usage", "")
             
-            with (docs_dir / f"{impl_path.stem}_usage.md").open('w') as f:
-                f.write(implementation.documentation.get("usage", ""))
-            
-            # Save quality report
-            with (docs_dir / f"{impl_path.stem}_quality.md").open('w') as f:
-                f.write(f"""# Code Quality Report
+            # Quality report
+            files[docs_dir / f"{impl_path.stem}_quality.md"] = f"""# Code Quality Report
 
 ## Metrics
 - Complexity: {implementation.quality_metrics.complexity}
@@ -443,12 +488,16 @@ Total Tests: {len(implementation.tests)}
 {chr(10).join(f'- {dep}' for dep in implementation.dependencies)}
 
 ## Review Status
-{json.dumps(implementation.review_status, indent=2) if implementation.review_status else 'Not reviewed yet'}
-""")
+{_to_json(implementation.review_status) if implementation.review_status else 'Not reviewed yet'}
+"""
+            
+            # Create every directory up front so the concurrent writes find them in place
+            await self._ensure_dirs([base_path, *(path.parent for path in files)])
+            await asyncio.gather(*(self.asave_file(path, content) for path, content in files.items()))
             
-            # Save commit summary
-            with (base_path / "COMMIT_SUMMARY.md").open('a') as f:
-                f.write(f"""
+            # Commit summary, shared by every component in the output directory
+            async with self._summary_lock:
+                await self.asave_file(base_path / "COMMIT_SUMMARY.md", f"""
 ## {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 {implementation.commit_message}
 
@@ -461,9 +510,9 @@ Total Tests: {len(implementation.tests)}
 - Complexity: {implementation.quality_metrics.complexity}
 - Test Coverage: {implementation.quality_metrics.test_coverage}%
 - Security Score: {implementation.quality_metrics.security_score}
-""")
+""", mode='a')
             
-            logger.info(f"Implementation saved to {impl_path}")
+            logger.info("Implementation saved to {}", impl_path)
             
         except Exception as e:
             logger.error(f"Error saving implementation: {str(e)}")
@@ -472,26 +521,15 @@ Total Tests: {len(implementation.tests)}
 @click.command()
 @click.argument('plan', type=click.Path(exists=True))
 @click.argument('output_dir', type=click.Path())
-async def main(plan: str, output_dir: str):
+def main(plan: str, output_dir: str):
     """Generate implementation code and tests based on the development plan."""
     try:
-        # Read development plan
-        with open(plan, 'r') as f:
-            plan_data = json.load(f)
-        
-        # Initialize engineer
+        # Initialize engineer and read development plan
         engineer = Engineer()
+        plan_data = engineer.load_plan(plan)
         
-        # Process each component
-        for component in plan_data.get("components", []):
-            # Generate implementation
-            implementation = await engineer.generate_component_code(
-                component,
-                plan_data.get("architecture", {})
-            )
-            
-            # Save implementation and tests
-            engineer.save_implementation(implementation, output_dir)
+        # Generate and save all components concurrently
+        asyncio.run(engineer.implement_plan(plan_data, output_dir))
             
         logger.info(f"Implementation completed successfully")
         
@@ -500,4 +538,4 @@ async def main(plan: str, output_dir: str):
         raise
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    main()
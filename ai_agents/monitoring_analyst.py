@@ -1,11 +1,55 @@
 import click
 import json
+import asyncio
 from datetime import datetime, timedelta
+from itertools import islice
 import boto3
 from loguru import logger
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 from .base_agent import BaseAgent
 
+# CloudWatch EC2 metrics collected per run, by GetMetricData query id
+EC2_METRICS = {
+    'cpu': 'CPUUtilization',
+    'memory': 'MemoryUtilization',
+}
+
+# Log events sent to the model per behavior-analysis prompt
+LOG_BATCH_SIZE = 500
+
+BEHAVIOR_SYSTEM_MESSAGE = """You are a User Behavior Analyst specializing in
+understanding user interaction patterns and identifying UX improvements."""
+
+BEHAVIOR_PROMPT = """Analyze the following user interaction logs:
+
+{logs}
+
+Provide insights on:
+1. User Patterns
+   - Common workflows
+   - Feature usage
+   - Session characteristics
+2. Pain Points
+   - Error frequencies
+   - Abandoned actions
+   - Performance impact
+3. UX Improvements
+   - Workflow optimizations
+   - Interface enhancements
+   - Feature suggestions
+4. Behavioral Segments
+   - User categories
+   - Usage patterns
+   - Preference clusters
+"""
+
+MERGE_BEHAVIOR_PROMPT = """The user behavior analyses below each cover a consecutive batch of the
+same interaction logs. Merge them into one analysis with the same four sections,
+combining the findings for each section and removing repetition.
+
+{analyses}
+"""
+
 class MonitoringAnalyst(BaseAgent):
     def __init__(self, model: str = "gpt-4-turbo-preview"):
         super().__init__(model)
@@ -51,37 +95,45 @@ class MonitoringAnalyst(BaseAgent):
             logger.error(f"Error analyzing metrics: {str(e)}")
             raise
     
-    async def analyze_user_behavior(self, 
-                                  interaction_logs: List[Dict]) -> Dict:
-        """Analyze user interaction patterns and behavior."""
-        system_message = """You are a User Behavior Analyst specializing in 
-        understanding user interaction patterns and identifying UX improvements."""
-        
-        prompt = f"""Analyze the following user interaction logs:
-
-        {interaction_logs}
+    async def analyze_user_behavior(self,
+                                  interaction_logs: Iterable[Dict],
+                                  batch_size: int = LOG_BATCH_SIZE) -> Dict:
+        """Analyze user interaction patterns and behavior.
 
-        Provide insights on:
-        1. User Patterns
-           - Common workflows
-           - Feature usage
-           - Session characteristics
-        2. Pain Points
-           - Error frequencies
-           - Abandoned actions
-           - Performance impact
-        3. UX Improvements
-           - Workflow optimizations
-           - Interface enhancements
-           - Feature suggestions
-        4. Behavioral Segments
-           - User categories
-           - Usage patterns
-           - Preference clusters
+        Logs are consumed lazily, ``batch_size`` events per prompt. The next batch is read
+        while the current one is analyzed, so at most two batches are held in memory;
+        the analyses of several batches are merged in one final call.
         """
+        logs = iter(interaction_logs)
+        read_batch = lambda: list(islice(logs, batch_size))
         
         try:
-            analysis = await self.get_completion(prompt, system_message, temperature=0.7)
+            analyses = []
+            batch = await asyncio.to_thread(read_batch)
+            if not batch:
+                logger.info("No interaction logs to analyze")
+                return self._parse_behavior_analysis("")
+            while True:
+                upcoming = asyncio.ensure_future(asyncio.to_thread(read_batch))
+                try:
+                    analyses.append(await self.get_completion(BEHAVIOR_PROMPT.format(logs=batch),
+                                                              BEHAVIOR_SYSTEM_MESSAGE,
+                                                              temperature=0.7))
+                except BaseException:
+                    upcoming.cancel()
+                    raise
+                batch = await upcoming
+                if not batch:
+                    break
+            
+            if len(analyses) > 1:
+                logger.info("Merging user behavior analyses of {} log batches", len(analyses))
+                analysis = await self.get_completion(
+                    MERGE_BEHAVIOR_PROMPT.format(analyses="\n\n---\n\n".join(analyses)),
+                    BEHAVIOR_SYSTEM_MESSAGE,
+                    temperature=0.7)
+            else:
+                analysis = analyses[0]
             return self._parse_behavior_analysis(analysis)
         except Exception as e:
             logger.error(f"Error analyzing user behavior: {str(e)}")
@@ -90,50 +142,31 @@ class MonitoringAnalyst(BaseAgent):
     def collect_metrics(self, 
                        start_time: datetime,
                        end_time: datetime) -> Dict:
-        """Collect system metrics from CloudWatch."""
+        """Collect system metrics from CloudWatch in a single GetMetricData request."""
         try:
-            metrics = {}
-            
-            # CPU Utilization
-            cpu_response = self.cloudwatch.get_metric_data(
+            response = self.cloudwatch.get_metric_data(
                 MetricDataQueries=[
                     {
-                        'Id': 'cpu',
+                        'Id': metric_id,
                         'MetricStat': {
                             'Metric': {
                                 'Namespace': 'AWS/EC2',
-                                'MetricName': 'CPUUtilization'
+                                'MetricName': metric_name
                             },
                             'Period': 300,
                             'Stat': 'Average'
                         }
                     }
+                    for metric_id, metric_name in EC2_METRICS.items()
                 ],
                 StartTime=start_time,
                 EndTime=end_time
             )
-            metrics['cpu'] = cpu_response['MetricDataResults']
-            
-            # Memory Utilization
-            memory_response = self.cloudwatch.get_metric_data(
-                MetricDataQueries=[
-                    {
-                        'Id': 'memory',
-                        'MetricStat': {
-                            'Metric': {
-                                'Namespace': 'AWS/EC2',
-                                'MetricName': 'MemoryUtilization'
-                            },
-                            'Period': 300,
-                            'Stat': 'Average'
-                        }
-                    }
-                ],
-                StartTime=start_time,
-                EndTime=end_time
-            )
-            metrics['memory'] = memory_response['MetricDataResults']
             
+            # Results come back together; split them by query id
+            metrics = {metric_id: [] for metric_id in EC2_METRICS}
+            for result in response['MetricDataResults']:
+                metrics[result['Id']].append(result)
             return metrics
             
         except Exception as e:
@@ -144,9 +177,15 @@ class MonitoringAnalyst(BaseAgent):
                     start_time: datetime,
                     end_time: datetime,
                     log_group: str) -> List[Dict]:
-        """Collect application logs from CloudWatch Logs."""
+        """Collect application logs from CloudWatch Logs into a list; see ``iter_logs`` to stream them."""
+        return list(self.iter_logs(start_time, end_time, log_group))
+    
+    def iter_logs(self,
+                  start_time: datetime,
+                  end_time: datetime,
+                  log_group: str) -> Iterator[Dict]:
+        """Yield application log events from CloudWatch Logs, fetching pages as they are consumed."""
         try:
-            logs = []
             paginator = self.logs.get_paginator('filter_log_events')
             
             for page in paginator.paginate(
@@ -154,9 +193,7 @@ class MonitoringAnalyst(BaseAgent):
                 startTime=int(start_time.timestamp() * 1000),
                 endTime=int(end_time.timestamp() * 1000)
             ):
-                logs.extend(page['events'])
-            
-            return logs
+                yield from page['events']
             
         except Exception as e:
             logger.error(f"Error collecting logs: {str(e)}")
@@ -207,13 +244,16 @@ def main(output: str, duration: int, log_group: str):
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(seconds=duration)
         
-        # Collect data
+        # Collect metrics; logs are paged in lazily while they are analyzed
         metrics = analyst.collect_metrics(start_time, end_time)
-        logs = analyst.collect_logs(start_time, end_time, log_group)
+        logs = analyst.iter_logs(start_time, end_time, log_group)
         
         # Analyze data
-        metrics_analysis = analyst.analyze_metrics(metrics)
-        behavior_analysis = analyst.analyze_user_behavior(logs)
+        async def analyze():
+            return await asyncio.gather(analyst.analyze_metrics(metrics),
+                                        analyst.analyze_user_behavior(logs))
+        
+        metrics_analysis, behavior_analysis = asyncio.run(analyze())
         
         # Generate and save report
         report = analyst._generate_monitoring_report(
@@ -1,11 +1,8 @@
-import os
 from typing import Dict, List, Optional, Any, Union
 from datetime import datetime, timedelta
 from pathlib import Path
 import json
 from pydantic import BaseModel, Field
-import google.generativeai as genai
-from dotenv import load_dotenv
 from loguru import logger
 import asyncio
 import numpy as np
@@ -13,6 +10,7 @@ from scipy import stats
 import pandas as pd
 from dataclasses import dataclass
 from collections import defaultdict
+from ._gemini_client import get_model
 
 class UserInteraction(BaseModel):
     timestamp: datetime
@@ -66,16 +64,7 @@ class MonitoringAnalytics:
         """Initialize the Monitoring & Analytics system."""
         self.model = model
         
-        # Load environment variables
-        load_dotenv()
-        
-        # Configure Gemini
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-            
-        genai.configure(api_key=api_key)
-        self.client = genai.GenerativeModel(self.model)
+        self.client = get_model(self.model)
         
         # Initialize data storage
         self.monitoring_dir = Path(__file__).parent / "monitoring"
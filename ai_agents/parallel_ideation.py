@@ -4,17 +4,35 @@ Parallel ideation system for generating and consolidating ideas from multiple AI
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 import asyncio
-import google.generativeai as genai
 from loguru import logger
-import json
-from concurrent.futures import ThreadPoolExecutor
-from dataclasses import dataclass
+import orjson
+from dataclasses import dataclass, field
 from datetime import datetime
-import os
-from dotenv import load_dotenv
+from ._gemini_client import default_concurrency, generate_validated, get_model
 
-# Load environment variables
-load_dotenv()
+FRAGMENT_PROMPT = """You are a specialized innovation agent focused on {specialization}.
+Your expertise covers: {focus_areas}
+
+Product Specifications:
+{product_specs}
+
+{market_context}
+{technical_constraints}
+{innovation_targets}
+
+Generate 2-3 innovative solution fragments focusing on your specialization.
+
+For each fragment, provide:
+1. Core concept
+2. Technical/implementation approach
+3. Key features
+4. Pros and cons
+5. Impact assessment (0-10)
+6. Innovation score (0-10)
+7. Feasibility score (0-10)
+8. Rationale for scores
+
+Format as a JSON array of fragments."""
 
 @dataclass
 class IdeationContext:
@@ -23,12 +41,15 @@ class IdeationContext:
     market_context: Optional[str] = None
     technical_constraints: Optional[List[str]] = None
     innovation_targets: Optional[List[str]] = None
-    session_id: str = datetime.now().strftime("%Y%m%d_%H%M%S")
+    session_id: str = field(default_factory=lambda: datetime.now().strftime("%Y%m%d_%H%M%S"))
 
 class IdeaFragment(BaseModel):
     """A partial idea generated by a sub-agent."""
     concept: str
     approach: List[str]
+    key_features: List[str]
+    pros: List[str]
+    cons: List[str]
     potential_impact: float
     innovation_score: float
     feasibility_score: float
@@ -49,12 +70,6 @@ class ParallelIdeationSystem:
         self.model = model
         self.num_agents = num_agents
         
-        # Configure Gemini
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables")
-        genai.configure(api_key=api_key)
-        
         # Define sub-agent specializations with detailed focus areas
         self.specializations = {
             "Technical Innovation": {
@@ -79,8 +94,10 @@ class ParallelIdeationSystem:
             }
         }
         
-        # Initialize Gemini clients for each agent
-        self.clients = [genai.GenerativeModel(model) for _ in range(num_agents)]
+        # Sub-agents share one model client; GenerativeModel holds no per-call state
+        self.clients = [get_model(model)] * num_agents
+        # Caps concurrent sub-agent requests to stay within Gemini RPM quotas
+        self._sem = asyncio.Semaphore(default_concurrency())
     
     async def generate_idea_fragments(self, 
                                     context: IdeationContext, 
@@ -90,37 +107,22 @@ class ParallelIdeationSystem:
         try:
             # Create specialized prompt
             focus_areas = self.specializations[specialization]["focus"]
-            prompt = f"""You are a specialized innovation agent focused on {specialization}.
-            Your expertise covers: {', '.join(focus_areas)}
-            
-            Product Specifications:
-            {context.product_specs}
-            
-            {f'Market Context: {context.market_context}' if context.market_context else ''}
-            {f'Technical Constraints: {json.dumps(context.technical_constraints)}' if context.technical_constraints else ''}
-            {f'Innovation Targets: {json.dumps(context.innovation_targets)}' if context.innovation_targets else ''}
-            
-            Generate 2-3 innovative solution fragments focusing on your specialization.
-            
-            For each fragment, provide:
-            1. Core concept
-            2. Technical/implementation approach
-            3. Impact assessment (0-10)
-            4. Innovation score (0-10)
-            5. Feasibility score (0-10)
-            6. Rationale for scores
-            
-            Format as JSON with fields matching the IdeaFragment model.
-            """
-            
-            # Generate fragments
-            response = await asyncio.to_thread(
-                self.clients[agent_id].generate_content,
-                prompt
+            prompt = FRAGMENT_PROMPT.format(
+                specialization=specialization,
+                focus_areas=', '.join(focus_areas),
+                product_specs=context.product_specs,
+                market_context=f'Market Context: {context.market_context}' if context.market_context else '',
+                technical_constraints=(f'Technical Constraints: {orjson.dumps(context.technical_constraints).decode()}'
+                                       if context.technical_constraints else ''),
+                innovation_targets=(f'Innovation Targets: {orjson.dumps(context.innovation_targets).decode()}'
+                                    if context.innovation_targets else '')
             )
             
-            fragments_data = json.loads(response.text)
-            fragments = [IdeaFragment(**fragment) for fragment in fragments_data]
+            # Generate fragments, pros and cons included, in one schema-constrained call
+            fragments = await generate_validated(self.clients[agent_id], prompt,
+                                                 namespace=f"ideation.fragments.{agent_id}",
+                                                 semaphore=self._sem,
+                                                 schema=List[IdeaFragment])
             
             # Calculate confidence score based on fragment quality
             confidence_score = sum(f.innovation_score * f.feasibility_score for f in fragments) / len(fragments) / 100
@@ -1,14 +1,12 @@
 import click
 from loguru import logger
 from typing import Dict, List, Any, Optional
-import google.generativeai as genai
-import os
-from dotenv import load_dotenv
 import json
 import asyncio
 from datetime import datetime
 from pathlib import Path
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from ._gemini_client import get_model
 
 class Task(BaseModel):
     id: str
@@ -49,22 +47,14 @@ class DevelopmentPlan(BaseModel):
     development_phases: List[Dict[str, Any]]
     risk_mitigation: Dict[str, List[str]]
     quality_gates: List[Dict[str, Any]]
-    session_id: str = datetime.now().strftime("%Y%m%d_%H%M%S")
+    session_id: str = Field(default_factory=lambda: datetime.now().strftime("%Y%m%d_%H%M%S"))
 
 class Planner:
     def __init__(self, model: str = "gemini-2.0-flash"):
         """Initialize the Planner with Gemini configuration."""
         self.model = model
         
-        # Load environment variables
-        load_dotenv()
-        
-        # Configure Gemini
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-            
-        genai.configure(api_key=api_key)
+        self.client = get_model(self.model)
 
     async def generate_tasks(self, 
                            specs: Dict[str, Any], 
@@ -98,8 +88,7 @@ class Planner:
             logger.info("Sending prompt to Gemini model...")
             logger.debug(f"Prompt: {prompt}")
             
-            # Create model for each request to ensure clean state
-            model = genai.GenerativeModel(self.model)
+            model = self.client
             
             # Generate with safety settings
             safety_settings = {
@@ -185,8 +174,7 @@ class Planner:
             logger.info("Sending prompt to Gemini model...")
             logger.debug(f"Prompt: {prompt}")
             
-            # Create model for each request to ensure clean state
-            model = genai.GenerativeModel(self.model)
+            model = self.client
             
             # Generate with safety settings
             safety_settings = {
@@ -274,8 +262,7 @@ class Planner:
             logger.info("Sending prompt to Gemini model...")
             logger.debug(f"Prompt: {prompt}")
             
-            # Create model for each request to ensure clean state
-            model = genai.GenerativeModel(self.model)
+            model = self.client
             
             # Generate with safety settings
             safety_settings = {
@@ -361,8 +348,7 @@ class Planner:
             logger.info("Sending prompt to Gemini model...")
             logger.debug(f"Prompt: {prompt}")
             
-            # Create model for each request to ensure clean state
-            model = genai.GenerativeModel(self.model)
+            model = self.client
             
             # Generate with safety settings
             safety_settings = {
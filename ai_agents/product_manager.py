@@ -8,10 +8,10 @@ from .approval_system import ApprovalSystem, ValidationResult
 from .checkpoint_system import CheckpointSystem
 from .base_agent import BaseAgent
 import json
+import orjson
 import asyncio
 import google.generativeai as genai
 import os
-from dotenv import load_dotenv
 
 class MarketContext(BaseModel):
     """Model for market context."""
@@ -91,7 +91,7 @@ class ProductManager(BaseAgent):
             
             # Validate JSON structure before returning
             try:
-                parsed = json.loads(response)
+                parsed = orjson.loads(response)
                 logger.debug(f"[Market Analysis] Parsed structure: {type(parsed)}")
                 logger.debug(f"[Market Analysis] Available keys: {parsed.keys() if isinstance(parsed, dict) else 'Not a dict'}")
                 return response
@@ -126,9 +126,9 @@ class ProductManager(BaseAgent):
             
             # Validate JSON structure
             try:
-                parsed = json.loads(response)
+                parsed = orjson.loads(response)
                 logger.debug(f"[Personas] Parsed type: {type(parsed)}")
-                logger.debug(f"[Personas] Parsed structure: {json.dumps(parsed, indent=2)[:500]}")
+                logger.debug(f"[Personas] Parsed structure: {orjson.dumps(parsed, option=orjson.OPT_INDENT_2).decode()[:500]}")
                 
                 if not isinstance(parsed, list):
                     logger.error(f"[Personas] Expected list but got {type(parsed)}")
@@ -182,7 +182,7 @@ class ProductManager(BaseAgent):
             
             # Validate JSON structure
             try:
-                parsed = json.loads(response)
+                parsed = orjson.loads(response)
                 logger.debug(f"[Features] Parsed structure: {type(parsed)}")
                 if isinstance(parsed, list):
                     logger.debug(f"[Features] First feature keys: {parsed[0].keys() if parsed else 'Empty list'}")
@@ -248,7 +248,7 @@ class ProductManager(BaseAgent):
             logger.debug(f"[Response Format] Market context raw response structure: {market_context_response}")
             
             try:
-                market_data = json.loads(market_context_response)
+                market_data = orjson.loads(market_context_response)
                 logger.debug(f"[Data Structure] Parsed market data keys: {market_data.keys() if isinstance(market_data, dict) else 'Not a dict'}")
                 logger.debug(f"[Data Structure] Market data types: {[(k, type(v)) for k, v in market_data.items() if isinstance(market_data, dict)]}")
             except json.JSONDecodeError as e:
@@ -270,7 +270,7 @@ class ProductManager(BaseAgent):
             logger.debug(f"[Response Format] Raw personas response: {personas_response}")
             
             try:
-                personas_data = json.loads(personas_response)
+                personas_data = orjson.loads(personas_response)
                 logger.debug(f"[Data Structure] Parsed personas data type: {type(personas_data)}")
                 logger.debug(f"[Data Structure] First persona keys (if list): {personas_data[0].keys() if isinstance(personas_data, list) and len(personas_data) > 0 else 'No personas'}")
             except Exception as e:
@@ -290,7 +290,7 @@ class ProductManager(BaseAgent):
             logger.debug(f"[Response Format] Raw features structure: {features_response}")
             
             try:
-                features_data = json.loads(features_response.text)
+                features_data = orjson.loads(features_response.text)
                 logger.debug(f"[Data Structure] Parsed features data type: {type(features_data)}")
                 if isinstance(features_data, list) and features_data:
                     logger.debug(f"[Data Structure] Sample feature keys: {features_data[0].keys()}")
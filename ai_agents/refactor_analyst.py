@@ -1,3 +1,4 @@
+import asyncio
 import click
 import os
 import json
@@ -492,55 +493,55 @@ def main(code_dir: str,
          cursor_rules: Optional[str],
          output: str):
     """CLI interface for the Refactor Analyst."""
-    try:
+    async def run():
         analyst = RefactorAnalyst()
         
         if not os.path.isdir(code_dir):
             raise NotADirectoryError(f"Code directory not found: {code_dir}")
         
-        # Load optional files
-        metrics = None
-        if metrics_file and analyst.validate_file_exists(metrics_file):
-            metrics = json.loads(analyst.load_file(metrics_file))
-        
-        constraints = None
-        if constraints_file and analyst.validate_file_exists(constraints_file):
-            constraints = json.loads(analyst.load_file(constraints_file))
-        
-        existing_rules = None
-        if cursor_rules and analyst.validate_file_exists(cursor_rules):
-            existing_rules = analyst.load_file(cursor_rules)
-        
-        # Analyze all Python files in the directory
-        all_code = ""
-        for root, _, files in os.walk(code_dir):
-            for file in files:
-                if file.endswith('.py'):
-                    file_path = os.path.join(root, file)
-                    all_code += f"\n# File: {file}\n"
-                    all_code += analyst.load_file(file_path)
+        async def load_optional(filepath: Optional[str]) -> Optional[str]:
+            if filepath and analyst.validate_file_exists(filepath):
+                return await analyst.aload_file(filepath)
+            return None
+        
+        code_files = [os.path.join(root, file)
+                      for root, _, files in os.walk(code_dir)
+                      for file in files if file.endswith('.py')]
+        
+        # Read the optional inputs and all Python files in the directory concurrently
+        metrics_data, constraints_data, existing_rules, *sources = await asyncio.gather(
+            load_optional(metrics_file),
+            load_optional(constraints_file),
+            load_optional(cursor_rules),
+            *(analyst.aload_file(file_path) for file_path in code_files)
+        )
+        metrics = json.loads(metrics_data) if metrics_data is not None else None
+        constraints = json.loads(constraints_data) if constraints_data is not None else None
+        all_code = "".join(f"\n# File: {os.path.basename(file_path)}\n{source}"
+                           for file_path, source in zip(code_files, sources))
         
         # Perform analysis
-        analysis = analyst.analyze_code_quality(all_code, metrics)
-        suggestions = analyst.generate_refactor_suggestions(analysis, constraints)
-        rules_update = analyst.update_cursor_rules(suggestions, existing_rules)
+        analysis = await analyst.analyze_code_quality(all_code, metrics)
+        suggestions = await analyst.generate_refactor_suggestions(analysis, constraints)
+        rules_update = await analyst.update_cursor_rules(suggestions, existing_rules)
         
-        # Generate and save report
+        # Generate and save report, plus the updated cursor rules if a path was provided
         report = analyst._generate_refactor_report(
             analysis,
             suggestions,
             rules_update
         )
-        analyst.save_file(output, report)
-        
-        # Save updated cursor rules if path provided
+        writes = [analyst.asave_file(output, report)]
         if cursor_rules:
-            analyst.save_file(cursor_rules, rules_update)
+            writes.append(analyst.asave_file(cursor_rules, rules_update))
+        await asyncio.gather(*writes)
         
         logger.info(f"Successfully generated refactoring report: {output}")
         if cursor_rules:
             logger.info(f"Updated cursor rules: {cursor_rules}")
-        
+    
+    try:
+        asyncio.run(run())
     except Exception as e:
         logger.error(f"Error in refactor analyst execution: {str(e)}")
         raise
@@ -3,20 +3,19 @@ import os
 import json
 from loguru import logger
 from typing import Dict, List, Tuple, Optional
-import google.generativeai as genai
 import os
 from typing import Dict, List, Optional, Any, Union
 from datetime import datetime
 from pathlib import Path
 import json
 from pydantic import BaseModel, Field
-import google.generativeai as genai
-from dotenv import load_dotenv
 from loguru import logger
 import ast
-import re
 from dataclasses import dataclass
 import math
+from ._code_analysis import CodeCollector
+from ._dependencies import extract_dependencies
+from ._gemini_client import get_model
 
 class SecurityIssue(BaseModel):
     severity: str
@@ -82,16 +81,7 @@ class Reviewer:
         """Initialize the Reviewer with AI configuration."""
         self.model = model
         
-        # Load environment variables
-        load_dotenv()
-        
-        # Configure Gemini
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-            
-        genai.configure(api_key=api_key)
-        self.client = genai.GenerativeModel(self.model)
+        self.client = get_model(self.model)
         
         # Initialize review templates
         self.templates_dir = Path(__file__).parent / "templates"
@@ -107,14 +97,13 @@ class Reviewer:
             total_lines = len(lines)
             comment_lines = sum(1 for line in lines if line.strip().startswith('#'))
             
-            # Calculate complexity
-            complexity = {}
-            for node in ast.walk(tree):
-                if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
-                    complexity[node.name] = self._calculate_complexity(node)
+            # Calculate complexity of every function and class in one pass
+            collector = CodeCollector()
+            collector.visit(tree)
+            complexity = collector.complexity
             
             # Extract dependencies
-            dependencies = self._extract_dependencies(code)
+            dependencies = extract_dependencies(code)
             
             # Calculate maintainability index
             maintainability = self._calculate_maintainability(
@@ -141,31 +130,6 @@ class Reviewer:
             logger.error(f"Error analyzing code metrics: {str(e)}")
             raise
 
-    def _calculate_complexity(self, node: ast.AST) -> int:
-        """Calculate cyclomatic complexity."""
-        complexity = 1
-        for child in ast.walk(node):
-            if isinstance(child, (ast.If, ast.While, ast.For, ast.ExceptHandler)):
-                complexity += 1
-            elif isinstance(child, ast.BoolOp):
-                complexity += len(child.values) - 1
-        return complexity
-
-    def _extract_dependencies(self, code: str) -> List[str]:
-        """Extract code dependencies."""
-        dependencies = set()
-        patterns = [
-            r'import\s+(\w+)',
-            r'from\s+(\w+)\s+import',
-            r'require\s*\(\s*[\'"](.+?)[\'"]\s*\)'
-        ]
-        
-        for pattern in patterns:
-            matches = re.finditer(pattern, code)
-            dependencies.update(match.group(1) for match in matches)
-        
-        return list(dependencies)
-
     def _calculate_maintainability(self, 
                                  total_lines: int, 
                                  comment_lines: int, 
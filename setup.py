@@ -20,6 +20,8 @@ setup(
         "click>=8.1.7",
         "rich>=13.7.0",
         "loguru>=0.7.2",
+        "orjson>=3.9.0",
+        "tenacity>=8.2.0",
     ],
     python_requires=">=3.9",
 )
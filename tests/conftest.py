@@ -1,7 +1,21 @@
 import os
 import sys
 from pathlib import Path
+import pytest
 
 # Add the project root directory to Python path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
+
+from ai_agents._gemini_client import get_model
+
+# Keep mocked Gemini responses from being served out of (or written to) the
+# on-disk response cache
+os.environ.setdefault("GEMINI_RESPONSE_CACHE", "0")
+
+@pytest.fixture(autouse=True)
+def _fresh_gemini_models():
+    """Keep shared GenerativeModel instances from leaking across patched tests."""
+    get_model.cache_clear()
+    yield
+    get_model.cache_clear()
@@ -145,7 +145,7 @@ async def test_create_product_specs(product_manager):
         logger.debug(f"[Mock] Generated response: {mock_response.text[:200]}")
         return mock_response
     
-    product_manager.client.generate_content = AsyncMock(side_effect=mock_generate_content)
+    product_manager.client.generate_content_async = AsyncMock(side_effect=mock_generate_content)
     
     try:
         specs = await product_manager.create_product_specs(prompt)
@@ -289,7 +289,7 @@ async def test_feature_validation_edge_cases(product_manager):
         logger.debug(f"[Mock] Generated response: {mock_response.text[:200]}")
         return mock_response
     
-    product_manager.client.generate_content = AsyncMock(side_effect=mock_generate_content)
+    product_manager.client.generate_content_async = AsyncMock(side_effect=mock_generate_content)
     
     try:
         specs = await product_manager.create_product_specs("Test edge cases")
@@ -380,7 +380,7 @@ async def test_invalid_feature_handling(product_manager):
         logger.debug(f"[Mock] Generated response: {mock_response.text[:200]}")
         return mock_response
     
-    product_manager.client.generate_content = AsyncMock(side_effect=mock_generate_content)
+    product_manager.client.generate_content_async = AsyncMock(side_effect=mock_generate_content)
     
     try:
         with pytest.raises(ValueError) as exc_info:
@@ -0,0 +1,29 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from ai_agents.approval_system import ApprovalSystem, _to_json
+
+@pytest.fixture
+def approval_system():
+    client = MagicMock()
+    client.cached_content = None
+    client.generate_content_async = AsyncMock(
+        return_value=MagicMock(text='{"concerns": ["no auth"], "suggestions": []}')
+    )
+    with patch('google.generativeai.GenerativeModel', return_value=client):
+        return ApprovalSystem()
+
+@pytest.mark.asyncio
+async def test_unchanged_content_is_validated_once(approval_system):
+    """Resubmitting the same content for the same role reuses the earlier feedback."""
+    content = {"name": "Notes app", "features": ["sync"]}
+
+    first = await approval_system.cross_validate_with_role(content, "Security Engineer")
+    second = await approval_system.cross_validate_with_role(dict(content), "Security Engineer")
+    await approval_system.cross_validate_with_role(content, "QA Engineer")
+
+    assert first.concerns == second.concerns == ["no auth"]
+    assert approval_system.client.generate_content_async.await_count == 2
+
+def test_to_json_accepts_non_string_keys():
+    """Prompt content keyed by numbers serializes as json.dumps did."""
+    assert _to_json({1: "first", "2": "second"}) == '{\n  "1": "first",\n  "2": "second"\n}'
@@ -0,0 +1,120 @@
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+from ai_agents.architect import Architect
+
+TECH_STACK = {"frontend": ["react"], "backend": ["fastapi"], "database": ["postgres"],
+              "infrastructure": ["k8s"], "tools_and_services": ["github"]}
+COMPONENT = {"name": "API", "description": "Public API", "responsibilities": ["serve"],
+             "dependencies": [], "technical_requirements": ["python"]}
+ARCHITECTURE = {"overview": "Single service", "components": [COMPONENT], "data_flows": [],
+                "tech_stack": TECH_STACK, "security_measures": [], "deployment_strategy": [],
+                "design_patterns": ["layered"], "scalability_considerations": [],
+                "monitoring_requirements": []}
+
+def make_architect(respond):
+    """Build an Architect whose Gemini client answers prompts with ``respond(prompt)``."""
+    async def generate_content_async(prompt, **kwargs):
+        return MagicMock(text=json.dumps(respond(prompt)))
+
+    client = MagicMock()
+    client.cached_content = None
+    client.generate_content_async = MagicMock(side_effect=generate_content_async)
+    with patch('google.generativeai.GenerativeModel', return_value=client):
+        return Architect(), client
+
+@pytest.mark.asyncio
+async def test_small_inputs_use_single_call():
+    """Small specs are designed with one structured request."""
+    architect, client = make_architect(lambda prompt: ARCHITECTURE)
+
+    architecture = await architect.generate_architecture(json.dumps({"name": "app"}),
+                                                         json.dumps({"ideas": []}))
+
+    assert architecture.overview == "Single service"
+    assert client.generate_content_async.call_count == 1
+
+@pytest.mark.asyncio
+async def test_invalid_single_call_falls_back_to_sections():
+    """A single-call reply that fails validation is regenerated section by section."""
+    def respond(prompt):
+        if "complete system architecture" in prompt:
+            return {"overview": "truncated"}
+        if "technology stack" in prompt and "Design the system components" not in prompt:
+            return TECH_STACK
+        if "Design the system components" in prompt:
+            return [COMPONENT]
+        if "Define the data flows" in prompt or "security measures" in prompt \
+                or "deployment strategy" in prompt:
+            return []
+        return {"overview": "Sectioned", "design_patterns": [],
+                "scalability_considerations": [], "monitoring_requirements": []}
+
+    architect, client = make_architect(respond)
+
+    architecture = await architect.generate_architecture(json.dumps({"name": "app"}),
+                                                         json.dumps({"ideas": []}))
+
+    assert architecture.overview == "Sectioned"
+    assert [c.name for c in architecture.components] == ["API"]
+    assert client.generate_content_async.call_count == 7
+
+@pytest.mark.asyncio
+async def test_sections_keep_free_form_maps():
+    """Map fields sent back as JSON strings survive into the stepwise architecture."""
+    component = dict(COMPONENT, api_endpoints=['{"path": "/items", "method": "GET"}'])
+
+    def respond(prompt):
+        if "complete system architecture" in prompt:
+            return {"overview": "truncated"}
+        if "Summarize the architecture" in prompt:
+            assert '"API"' in prompt
+            return {"overview": "Sectioned", "design_patterns": [],
+                    "scalability_considerations": [], "monitoring_requirements": [],
+                    "disaster_recovery_plan": '{"rpo": "1h"}'}
+        if "Design the system components" in prompt:
+            return [component]
+        if "technology stack" in prompt:
+            return TECH_STACK
+        return []
+
+    architect, _ = make_architect(respond)
+
+    architecture = await architect.generate_architecture(json.dumps({"name": "app"}),
+                                                         json.dumps({"ideas": []}))
+
+    assert architecture.components[0].api_endpoints == [{"path": "/items", "method": "GET"}]
+    assert architecture.disaster_recovery_plan == {"rpo": "1h"}
+
+@pytest.mark.asyncio
+async def test_single_call_saves_free_form_sections(tmp_path):
+    """Map fields of the one-shot schema reach the saved architecture instead of N/A."""
+    component = dict(COMPONENT, api_endpoints=['{"path": "/items"}'],
+                     performance_requirements='{"latency": "100ms"}')
+    flow = {"source": "API", "destination": "DB", "description": "writes", "data_type": "row",
+            "frequency": "often", "security_requirements": [],
+            "error_handling": '{"timeout": "retry"}'}
+    measure = {"category": "Auth", "measures": ["oauth"], "implementation_priority": "high",
+               "threat_mitigations": '{"spoofing": ["mfa"]}'}
+    stage = {"name": "prod", "components": ["API"], "prerequisites": [], "success_criteria": [],
+             "rollback_plan": [], "environment_config": '{"replicas": 3}'}
+    reply = dict(ARCHITECTURE, components=[component], data_flows=[flow],
+                 security_measures=[measure], deployment_strategy=[stage],
+                 tech_stack=dict(TECH_STACK, version_constraints='{"python": "3.11"}'),
+                 api_documentation='{"style": "REST"}',
+                 performance_benchmarks='{"p99": "200ms"}',
+                 disaster_recovery_plan='{"rpo": "1h"}')
+    architect, client = make_architect(lambda prompt: reply)
+
+    architecture = await architect.generate_architecture(json.dumps({"name": "app"}),
+                                                         json.dumps({"ideas": []}))
+    output = tmp_path / "architecture.md"
+    await architect.save_architecture(architecture, str(output))
+
+    assert client.generate_content_async.call_count == 1
+    assert architecture.tech_stack.version_constraints == {"python": "3.11"}
+    saved = output.read_text(encoding="utf-8")
+    for value in ('"/items"', '"100ms"', '"retry"', '"mfa"', '"replicas"',
+                  '"REST"', '"200ms"', '"1h"'):
+        assert value in saved
+    assert "N/A" not in saved
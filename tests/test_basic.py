@@ -1,4 +1,6 @@
 """Basic tests for the AI Agents framework."""
+import ast
+import asyncio
 import sys
 from pathlib import Path
 
@@ -7,9 +9,85 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 import pytest
+from unittest.mock import AsyncMock, MagicMock
+from google.api_core import exceptions as google_exceptions
 import ai_agents.base_agent as base_agent
 
 def test_base_agent_init():
     """Test basic initialization of BaseAgent."""
     agent = base_agent.BaseAgent()
     assert agent.model == "gemini-2.0-flash"
+
+@pytest.mark.asyncio
+async def test_stream_completion_yields_chunks():
+    """Streamed completions yield each chunk as Gemini produces it."""
+    async def chunks():
+        for text in ("Hello", ", ", "world"):
+            yield MagicMock(text=text)
+
+    agent = base_agent.BaseAgent()
+    agent.client = MagicMock()
+    agent.client.generate_content_async = AsyncMock(return_value=chunks())
+
+    received = [text async for text in agent.stream_completion("Greet", system_message="Be brief")]
+
+    assert received == ["Hello", ", ", "world"]
+    prompt = agent.client.generate_content_async.await_args.args[0]
+    assert prompt == "Be brief\n\nGreet"
+    assert agent.client.generate_content_async.await_args.kwargs["stream"] is True
+
+def test_single_base_agent_definition():
+    """base_agent.py defines exactly one BaseAgent class."""
+    tree = ast.parse(Path(base_agent.__file__).read_text(encoding="utf-8"))
+    classes = [node for node in tree.body if isinstance(node, ast.ClassDef) and node.name == "BaseAgent"]
+    assert len(classes) == 1
+
+@pytest.mark.asyncio
+async def test_get_completion_retries_quota_errors(monkeypatch):
+    """A transient 429 from Gemini is retried instead of failing the completion."""
+    monkeypatch.setattr(asyncio, "sleep", AsyncMock())
+    agent = base_agent.BaseAgent()
+    agent.client = MagicMock()
+    agent.client.generate_content_async = AsyncMock(side_effect=[
+        google_exceptions.ResourceExhausted("quota"),
+        MagicMock(candidates=[MagicMock()], text="done")
+    ])
+
+    assert await agent.get_completion("Summarize") == "done"
+    assert agent.client.generate_content_async.await_count == 2
+
+def test_debug_hook_is_identity_outside_debug_runs(monkeypatch):
+    """Without ACTIONS_STEP_DEBUG, decorated functions are returned unwrapped."""
+    def method():
+        return "result"
+
+    monkeypatch.setattr(base_agent, "_DEBUG", False)
+    assert base_agent.debug_hook(method) is method
+
+    monkeypatch.setattr(base_agent, "_DEBUG", True)
+    traced = base_agent.debug_hook(method)
+    assert traced is not method and traced.__wrapped__ is method
+    assert traced() == "result"
+
+@pytest.mark.asyncio
+async def test_concurrent_completions_overlap():
+    """Completions await the async client, so gathered calls run concurrently."""
+    agent = base_agent.BaseAgent()
+    agent.client = MagicMock()
+    running = 0
+    peak = 0
+
+    async def generate_content_async(**kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return MagicMock(candidates=[MagicMock()], text=kwargs["contents"])
+
+    agent.client.generate_content_async = AsyncMock(side_effect=generate_content_async)
+
+    results = await asyncio.gather(*(agent.get_completion(f"prompt {i}") for i in range(3)))
+
+    assert results == ["prompt 0", "prompt 1", "prompt 2"]
+    assert peak == 3
@@ -0,0 +1,44 @@
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+from ai_agents.brainstorm_facilitator import BrainstormFacilitator, BrainstormOutcome, SolutionIdea
+from ai_agents.parallel_ideation import IdeaFragment
+
+FRAGMENT = {"concept": "Offline sync", "approach": ["CRDTs"], "key_features": ["works offline"],
+            "pros": ["resilient"], "cons": ["merge complexity"], "potential_impact": 9,
+            "innovation_score": 6, "feasibility_score": 6, "specialization": "Technical Innovation",
+            "rationale": "Users travel a lot"}
+
+@pytest.mark.asyncio
+async def test_ideas_need_no_follow_up_calls():
+    """Pros and cons come back with the fragments; only consolidation adds a call."""
+    async def generate_content_async(prompt, **kwargs):
+        if "consolidated recommendation" in prompt:
+            return MagicMock(text="Build offline sync first.")
+        return MagicMock(text=json.dumps([FRAGMENT]))
+
+    client = MagicMock()
+    client.cached_content = None
+    client.generate_content_async = MagicMock(side_effect=generate_content_async)
+    with patch('google.generativeai.GenerativeModel', return_value=client) as model_cls:
+        facilitator = BrainstormFacilitator(num_agents=2)
+
+    assert sorted(c.args[0] for c in model_cls.call_args_list) == ["gemini-2.0-flash", "gemini-2.0-flash-lite"]
+
+    outcome = await facilitator.generate_ideas("Travel notes app")
+
+    assert client.generate_content_async.call_count == 3
+    assert outcome.consolidated_recommendation == "Build offline sync first."
+    idea = outcome.ideas[0]
+    assert (idea.title, idea.pros, idea.cons, idea.score) == ("Offline sync", ["resilient"], ["merge complexity"], 7)
+
+def test_saved_outcome_reloads_without_parsing_markdown(tmp_path):
+    """save_outcome writes a structured copy that load_outcome restores exactly."""
+    idea = SolutionIdea.from_fragment(IdeaFragment(**FRAGMENT))
+    outcome = BrainstormOutcome(ideas=[idea], consolidated_recommendation="Ship it")
+    output_file = tmp_path / "BRAINSTORM_OUTCOME.md"
+
+    with patch('google.generativeai.GenerativeModel'):
+        BrainstormFacilitator().save_outcome(outcome, str(output_file))
+
+    assert BrainstormFacilitator.load_outcome(str(output_file)) == outcome
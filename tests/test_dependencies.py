@@ -0,0 +1,19 @@
+from unittest.mock import patch
+from ai_agents._dependencies import extract_dependencies
+
+def test_extract_dependencies_reads_python_and_commonjs_imports():
+    """A from-import yields both its module and the imported name, as separate patterns did."""
+    code = "from app import models\nimport os\nconst _ = require('lodash')\n"
+
+    assert sorted(extract_dependencies(code)) == ["app", "lodash", "models", "os"]
+
+def test_extract_dependencies_skips_the_regex_without_import_literals():
+    """Sources with no import or require are answered without scanning."""
+    with patch('ai_agents._dependencies.DEPENDENCY_PATTERN') as pattern:
+        assert extract_dependencies('{"name": "config", "from": "env"}') == []
+
+    pattern.finditer.assert_not_called()
+
+def test_extract_dependencies_does_not_need_parsable_source():
+    """Broken or non-Python sources still yield their imports."""
+    assert sorted(extract_dependencies("import os\ndef broken(:\n")) == ["os"]
@@ -0,0 +1,116 @@
+import asyncio
+import numpy as np
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, patch
+from ai_agents.devops_manager import (Anomaly, DeploymentConfig, DeploymentReport, DevOpsManager,
+                                      METRIC_FIELDS, MetricsRing, ServiceMetrics)
+
+def make_metrics(cpu=50.0, memory=60.0, response=100.0, errors=0.01):
+    return ServiceMetrics(service_name="api", cpu_usage=cpu, memory_usage=memory,
+                          response_time=response, error_rate=errors,
+                          request_count=1000, timestamp=datetime.now())
+
+@pytest.fixture
+def devops_manager():
+    with patch('google.generativeai.GenerativeModel'):
+        return DevOpsManager()
+
+@pytest.mark.asyncio
+async def test_detect_anomalies_flags_outlying_metric(devops_manager):
+    """Only the metric far outside its history is reported, with its z-score."""
+    for i in range(12):
+        devops_manager._record_metrics("api", make_metrics(cpu=50.0 + i % 3, response=100.0 + i % 4))
+
+    anomalies = await devops_manager.detect_anomalies([make_metrics(cpu=51.0, response=400.0)],
+                                                      {"response_time": 3.0})
+
+    assert [(a.metric, a.severity) for a in anomalies] == [("response_time", "critical")]
+    # z-score of the current value against the 12 historical samples
+    assert "z-score: 266.99" in anomalies[0].description
+
+@pytest.mark.asyncio
+async def test_detect_anomalies_needs_history(devops_manager):
+    """Services with fewer than ten samples are not checked."""
+    for _ in range(9):
+        devops_manager._record_metrics("api", make_metrics())
+
+    assert await devops_manager.detect_anomalies([make_metrics(response=10_000.0)], {}) == []
+
+@pytest.mark.asyncio
+async def test_deploy_services_runs_services_concurrently(devops_manager):
+    """Services deploy side by side, capped at max_concurrency."""
+    in_flight = peak = 0
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(_):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await real_sleep(0)
+        in_flight -= 1
+
+    config = DeploymentConfig(environment="staging", version="1.0", services=["a", "b", "c"],
+                              dependencies={}, env_vars={}, rollback_version=None,
+                              health_checks={s: f"/{s}/health" for s in "abc"},
+                              monitoring_config={}, alert_thresholds={})
+    with patch('ai_agents.devops_manager.asyncio.sleep', fake_sleep):
+        status = await devops_manager.deploy_services(config, max_concurrency=2)
+
+    assert peak == 2
+    assert status.status == "success"
+    assert sorted(m.service_name for m in status.metrics) == ["a", "b", "c"]
+    assert set(devops_manager.metrics_history) == {"a", "b", "c"}
+    # Deployment and metric timestamps are all aware UTC, so they compare with each other
+    assert status.start_time.tzinfo is timezone.utc and status.end_time.tzinfo is timezone.utc
+    assert all(status.start_time <= m.timestamp <= status.end_time for m in status.metrics)
+
+def test_metrics_ring_keeps_latest_samples_in_order():
+    """Once full, the ring drops the oldest samples and views the rest oldest first."""
+    ring = MetricsRing(capacity=3)
+    for i in range(5):
+        ring.append(np.full(len(METRIC_FIELDS), float(i)), float(i))
+
+    assert len(ring) == 3
+    assert ring.view()[:, 0].tolist() == [2.0, 3.0, 4.0]
+    assert sorted(ring.timestamps.tolist()) == [2.0, 3.0, 4.0]
+
+def test_running_stats_follow_history_window():
+    """Samples that fall out of the window stop counting towards the baseline."""
+    with patch('google.generativeai.GenerativeModel'):
+        manager = DevOpsManager(history_window=4)
+    for cpu in [1000.0, 10.0, 20.0, 30.0, 40.0]:
+        manager._record_metrics("api", make_metrics(cpu=cpu))
+
+    running = manager._running["api"]
+    assert running.n == 4
+    assert running.mean[0] == pytest.approx(25.0)
+    assert running.std()[0] == pytest.approx(np.std([10.0, 20.0, 30.0, 40.0]))
+
+@pytest.mark.asyncio
+async def test_shared_health_endpoint_is_checked_once(devops_manager):
+    """Concurrent checks of one endpoint share a single probe."""
+    with patch.object(devops_manager, '_probe_health', AsyncMock(return_value=True)) as probe:
+        results = await asyncio.gather(*(devops_manager._check_health("http://lb/health") for _ in range(3)))
+        await devops_manager._check_health("http://other/health")
+
+    assert results == [True, True, True]
+    assert [c.args for c in probe.call_args_list] == [("http://lb/health",), ("http://other/health",)]
+
+def test_save_deployment_log_renders_report(devops_manager, tmp_path):
+    """The log includes the rendered JSON and anomaly sections."""
+    anomaly = Anomaly(service="api", metric="response_time", value=400.0, threshold=3.0,
+                      timestamp=datetime.now(), severity="critical", description="Anomalous response_time")
+    report = DeploymentReport(timestamp=datetime(2026, 1, 2, 3, 4, 5), environment="staging", version="1.0",
+                              status="success", duration=2.0, services_deployed=["api"],
+                              configuration_changes={"env_vars": {"MODE": "prod"}},
+                              metrics_summary={"api": {"avg_cpu": np.float64(12.5)}},
+                              anomalies_detected=[anomaly], rollbacks_performed=[], recommendations=["Scale api"])
+
+    devops_manager.save_deployment_log(report, str(tmp_path))
+
+    log = (tmp_path / "deployment_logs" / "deployment_20260102_030405.md").read_text()
+    assert '"MODE": "prod"' in log
+    assert '"avg_cpu": 12.5' in log
+    assert "- **api** response_time (critical): Anomalous response_time" in log
+    assert log.endswith("## Recommendations\n- Scale api\n")
@@ -0,0 +1,143 @@
+import asyncio
+import copy
+import os
+import pickle
+import dataclasses
+import pytest
+from unittest.mock import AsyncMock, patch
+from ai_agents.documenter import CursorRule, Documenter, _iter_python_files, _pack_chunks, _to_json
+
+@pytest.fixture
+def documenter():
+    with patch('google.generativeai.GenerativeModel'):
+        return Documenter()
+
+@pytest.mark.asyncio
+async def test_full_docset_keeps_parts_that_succeed(documenter):
+    """A failing part is left out without losing the others; skipped parts are None."""
+    with patch.object(documenter, 'generate_documentation', AsyncMock(return_value="# Docs")), \
+         patch.object(documenter, 'update_cursor_rules', AsyncMock(return_value="# rules")) as rules, \
+         patch.object(documenter, 'generate_api_documentation', AsyncMock(side_effect=RuntimeError("quota"))):
+        docset = await documenter.generate_full_docset("architecture.md", ["app.py"])
+
+    rules.assert_awaited_once_with("# Docs", None)
+    assert docset == {"documentation": "# Docs", "api": None, "components": None,
+                      "changelog": None, "cursor_rules": "# rules"}
+
+def test_parse_api_documentation_reads_endpoint_blocks(documenter):
+    """Fields are read per Endpoint block; lines outside a block are ignored."""
+    raw = ("  Path: /ignored\n"
+           "Endpoint:\n  Path: /users\n  Method: GET\nSome prose\n  Description: List users\n"
+           "Endpoint:\n  Method: POST\n")
+
+    endpoints = documenter._parse_api_documentation(raw)
+
+    assert [(e.path, e.method, e.description) for e in endpoints] == [("/users", "GET", "List users"),
+                                                                      ("", "POST", "")]
+
+def test_parse_changelog_splits_sections(documenter):
+    """Each section ends at the next header, and changes are categorized by their prefix."""
+    raw = ("Changes:\n- Feature: dark mode\n- Bugfix: crash on start\n- Docs tidy\n"
+           "Breaking Changes:\n- Drops Python 3.8\n"
+           "Migration Guide:\nUpgrade Python first.\n")
+
+    entry = documenter._parse_changelog(raw, "2.0.0")
+
+    assert [change["category"] for change in entry.changes] == ["feature", "fix", "other"]
+    assert entry.breaking_changes == ["- Drops Python 3.8"]
+    assert entry.migration_guide == "Upgrade Python first."
+
+def test_parsed_endpoints_are_slotted_and_read_only(documenter):
+    """Parsed docs carry no per-instance __dict__ and cannot be changed after parsing."""
+    endpoint, = documenter._parse_api_documentation("Endpoint:\n  Path: /users\n")
+
+    assert not hasattr(endpoint, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        endpoint.path = "/admin"
+
+def test_parsed_docs_round_trip_through_pickle_and_deepcopy(documenter):
+    """Slotted read-only docs can still be pickled and copied."""
+    endpoint, = documenter._parse_api_documentation("Endpoint:\n  Path: /users\n")
+    rule = CursorRule("docs", "def .*", "Add a docstring", "warning")
+
+    for value in (endpoint, rule):
+        assert pickle.loads(pickle.dumps(value)) == value
+        assert copy.deepcopy(value) == value
+        assert copy.copy(value) == value
+
+def test_format_cursor_rules_groups_by_category(documenter):
+    """Rules are rendered as one block per category, in the order categories first appear."""
+    rules = [CursorRule("docs", "def .*", "Add a docstring", "warning"),
+             CursorRule("api", "@app.route", "Document the endpoint", "error"),
+             CursorRule("docs", "class .*", "Describe the class", "info")]
+
+    assert documenter._format_cursor_rules(rules) == (
+        "# docs\n- pattern: def .*\n  message: Add a docstring\n  severity: warning\n"
+        "- pattern: class .*\n  message: Describe the class\n  severity: info\n\n"
+        "# api\n- pattern: @app.route\n  message: Document the endpoint\n  severity: error\n")
+
+@pytest.mark.asyncio
+async def test_code_context_is_built_once_per_file_version(documenter, tmp_path):
+    """Concurrent requests share one read; a changed file is read again."""
+    code_file = tmp_path / "app.py"
+    code_file.write_text("x = 1\n")
+
+    with patch.object(documenter, 'load_file', wraps=documenter.load_file) as load:
+        first, second = await asyncio.gather(documenter._code_context([str(code_file)]),
+                                             documenter._code_context([str(code_file)]))
+        assert load.call_count == 1
+
+        code_file.write_text("x = 2\n")
+        os.utime(code_file, ns=(0, 10**18))
+        changed = await documenter._code_context([str(code_file)])
+
+    assert first == second == f"File: {code_file}\nx = 1\n"
+    assert changed == f"File: {code_file}\nx = 2\n"
+    assert load.call_count == 2
+
+def test_to_json_is_independent_of_key_order():
+    """Prompts built from equal dicts are byte-identical, so they share cache entries."""
+    assert _to_json({"b": 1, "a": {"d": 2, "c": 3}}) == _to_json({"a": {"c": 3, "d": 2}, "b": 1})
+
+def test_iter_python_files_walks_subdirectories(tmp_path):
+    """Only .py files are collected, from every level of the tree."""
+    (tmp_path / "pkg" / "sub").mkdir(parents=True)
+    for name in ("main.py", "README.md", "pkg/api.py", "pkg/sub/util.py", "pkg/sub/data.json"):
+        (tmp_path / name).write_text("")
+
+    assert sorted(_iter_python_files(str(tmp_path))) == [
+        str(tmp_path / "main.py"), str(tmp_path / "pkg" / "api.py"), str(tmp_path / "pkg" / "sub" / "util.py")]
+
+def test_load_file_rereads_only_changed_files(documenter, tmp_path):
+    """Repeat loads of an unchanged file come from memory; an edit is picked up."""
+    arch_file = tmp_path / "architecture.md"
+    arch_file.write_text("v1")
+
+    with patch('builtins.open', wraps=open) as opened:
+        assert documenter.load_file(str(arch_file)) == "v1"
+        assert documenter.load_file(str(arch_file)) == "v1"
+        assert opened.call_count == 1
+
+        arch_file.write_text("v2")
+        os.utime(arch_file, ns=(0, 10**18))
+        assert documenter.load_file(str(arch_file)) == "v2"
+        assert opened.call_count == 2
+
+def test_pack_chunks_fills_each_chunk_up_to_the_budget():
+    """Parts stay whole and in order; an oversized part gets a chunk of its own."""
+    assert _pack_chunks(("aaa", "bb", "c", "dddddd", "e"), 5) == ["aaabb", "c", "dddddd", "e"]
+
+@pytest.mark.asyncio
+async def test_chunked_documentation_merges_partial_docs(documenter):
+    """Each chunk is documented separately and the partial docs are merged in a final call."""
+    replies = {"doc:ab": "Part A", "doc:c": "Part C"}
+
+    async def call(prompt, *, namespace, stream=False):
+        return replies.get(prompt, "Merged")
+
+    with patch.object(documenter, '_call', side_effect=call) as mocked:
+        result = await documenter._generate_chunked_documentation(lambda code: f"doc:{code}", ("a", "b", "c"), 2)
+
+    assert result == "Merged"
+    merge_prompt = mocked.call_args_list[-1].args[0]
+    assert "2 parts" in merge_prompt and "Part A\n\n---\n\nPart C" in merge_prompt
@@ -0,0 +1,183 @@
+import ast
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from pathlib import Path
+from ai_agents._llm_cache import ResponseCache
+from ai_agents.engineer import CodeImplementation, CodeQuality, Engineer, UnitTest
+import ai_agents._llm_cache as llm_cache
+
+@pytest.fixture
+def engineer():
+    with patch('google.generativeai.GenerativeModel'):
+        return Engineer()
+
+@pytest.mark.parametrize("name, content", [
+    ("plan.json", '{"components": [{"name": "api"}]}'),
+    ("plan.yaml", "components:\n  - name: api\n"),
+])
+def test_load_plan_parses_by_extension(engineer, tmp_path, name, content):
+    """JSON and YAML plans load to the same data."""
+    plan_file = tmp_path / name
+    plan_file.write_text(content)
+
+    assert engineer.load_plan(str(plan_file)) == {"components": [{"name": "api"}]}
+
+def test_load_plan_refuses_unknown_formats(engineer, tmp_path):
+    """Plans are never evaluated as code."""
+    plan_file = tmp_path / "plan.py"
+    plan_file.write_text("{'components': []}")
+
+    with pytest.raises(ValueError):
+        engineer.load_plan(str(plan_file))
+
+@pytest.mark.asyncio
+async def test_implement_plan_finishes_other_components_before_raising(engineer, tmp_path):
+    """A failing component does not stop the others from being generated and saved."""
+    async def generate(component, architecture):
+        if component["name"] == "broken":
+            raise RuntimeError("bad spec")
+        return component["name"]
+
+    plan = {"components": [{"name": "api"}, {"name": "broken"}, {"name": "worker"}]}
+    with patch.object(engineer, 'generate_component_code', side_effect=generate), \
+         patch.object(engineer, 'save_implementation') as save:
+        with pytest.raises(RuntimeError, match="bad spec"):
+            await engineer.implement_plan(plan, str(tmp_path))
+
+    assert sorted(call.args[0] for call in save.call_args_list) == ["api", "worker"]
+
+@pytest.mark.asyncio
+async def test_save_implementation_creates_each_directory_once(engineer, tmp_path):
+    """Components saved together into the same package create each directory exactly once."""
+    quality = CodeQuality(complexity=1, maintainability_index=90.0, documentation_coverage=100.0,
+                          test_coverage=80.0, security_score=9.0, performance_score=9.0)
+    implementations = [
+        CodeImplementation(file_path=f"pkg/{name}.py", code_content=f"# {name}\n", language="python",
+                           dependencies=[], quality_metrics=quality, tests=[],
+                           documentation={"api": "api", "usage": "usage"}, commit_message=f"Add {name}")
+        for name in ("api", "worker")
+    ]
+
+    with patch.object(Path, 'mkdir', autospec=True, side_effect=Path.mkdir) as mkdir:
+        await asyncio.gather(*(engineer.save_implementation(implementation, str(tmp_path))
+                               for implementation in implementations))
+        await engineer.save_implementation(implementations[0], str(tmp_path))
+
+    assert [call.args[0] for call in mkdir.call_args_list] == [tmp_path, tmp_path / "pkg", tmp_path / "pkg" / "docs"]
+    assert (tmp_path / "pkg" / "worker.py").read_text() == "# worker\n"
+    assert (tmp_path / "COMMIT_SUMMARY.md").read_text().count("Add ") == 3
+
+@pytest.mark.asyncio
+async def test_generate_component_code_runs_tests_and_quality_together(engineer):
+    """Only the implementation is awaited alone; the commit message needs no model call."""
+    replies = {
+        "engineer.implementation": '{"code_content": "x = 1", "file_path": "api.py", "language": "python",'
+                                   ' "dependencies": [], "documentation": {"api": "", "usage": ""}}',
+        "engineer.tests": '[{"name": "t", "description": "d", "inputs": {}, "expected_outputs": {},'
+                          ' "test_type": "unit", "isolation_level": "full", "mocked_dependencies": []}]',
+        "engineer.quality": '{"complexity": 2, "maintainability_index": 80, "documentation_coverage": 90,'
+                            ' "test_coverage": 75, "security_score": 9, "performance_score": 8}',
+    }
+    in_flight, peak = 0, 0
+
+    async def call(prompt, *, namespace):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        return replies[namespace]
+
+    with patch.object(engineer, '_call', side_effect=call) as mocked:
+        implementation = await engineer.generate_component_code({"name": "api"}, {})
+
+    assert [c.kwargs["namespace"] for c in mocked.call_args_list] == [
+        "engineer.implementation", "engineer.tests", "engineer.quality"]
+    assert peak == 2
+    assert implementation.commit_message.startswith("feat(api): implement api")
+
+@pytest.mark.asyncio
+async def test_engineer_calls_persist_across_runs_by_default(engineer, tmp_path, monkeypatch):
+    """With GEMINI_RESPONSE_CACHE unset, a repeated Engineer prompt is served from disk."""
+    monkeypatch.delenv("GEMINI_RESPONSE_CACHE", raising=False)
+    monkeypatch.setattr(llm_cache, "_shared_response_cache", lambda: ResponseCache(directory=str(tmp_path)))
+    engineer.client = MagicMock(model_name="models/gemini-2.0-flash", cached_content=None)
+    engineer.client.generate_content_async = AsyncMock(return_value=MagicMock(text="reply"))
+
+    first = await engineer._call("implement api", namespace="engineer.implementation")
+    again = await engineer._call("implement api", namespace="engineer.implementation")
+
+    assert first == again == "reply"
+    assert engineer.client.generate_content_async.await_count == 1
+    assert len(list(tmp_path.glob("*.txt"))) == 1
+
+@pytest.mark.asyncio
+async def test_analyze_code_counts_nested_definitions_in_their_parents(engineer):
+    """Complexity and returns of nested functions also count toward the enclosing definition."""
+    code = '''import os
+from typing import List
+
+class Store:
+    def get(self, key, default=None):
+        def check(value):
+            if value is None or value == "":
+                return False
+            return True
+        for attempt in range(3):
+            if check(key):
+                return key
+        return default
+'''
+    analysis = await engineer.analyze_code(code)
+
+    assert analysis.imports == ["os", "typing.List"]
+    assert analysis.classes == ["Store"]
+    assert sorted(analysis.functions) == ["check", "get"]
+    assert analysis.complexity == {"check": 3, "get": 5, "Store": 5}
+    assert analysis.potential_issues == ["Multiple return statements in get"]
+
+@pytest.mark.asyncio
+async def test_analyze_code_reuses_the_analysis_of_unchanged_source(engineer):
+    """The same source is parsed once; different source is analyzed afresh."""
+    with patch('ai_agents.engineer.ast.parse', wraps=ast.parse) as parse:
+        first = await engineer.analyze_code("def f():\n    return 1\n")
+        again = await engineer.analyze_code("def f():\n    return 1\n")
+        other = await engineer.analyze_code("def g():\n    return 2\n")
+
+    assert again == first
+    assert other.functions == ["g"]
+    assert parse.call_count == 2
+
+@pytest.mark.asyncio
+async def test_analyze_code_results_do_not_share_state(engineer):
+    """Changing one returned analysis does not leak into later analyses of the same source."""
+    code = "import os\n\ndef f():\n    return 1\n"
+    first = await engineer.analyze_code(code)
+    first.imports.append("sys")
+    first.complexity["f"] = 99
+    first.potential_issues.append("edited")
+
+    again = await engineer.analyze_code(code)
+
+    assert again.imports == ["os"]
+    assert again.complexity == {"f": 1}
+    assert again.potential_issues == []
+
+@pytest.mark.asyncio
+async def test_save_implementation_renders_a_file_per_test(engineer, tmp_path):
+    """Each test case gets its own skeleton with its inputs and defaults for missing hooks."""
+    quality = CodeQuality(complexity=1, maintainability_index=90.0, documentation_coverage=100.0,
+                          test_coverage=80.0, security_score=9.0, performance_score=9.0)
+    test = UnitTest(name="adds", description="Adds two numbers", inputs={"a": 1}, expected_outputs={"sum": 1},
+                    isolation_level="full", mocked_dependencies=[])
+    implementation = CodeImplementation(file_path="calc.py", code_content="", language="python", dependencies=[],
+                                        quality_metrics=quality, tests=[test], documentation={},
+                                        commit_message="Add calc")
+
+    await engineer.save_implementation(implementation, str(tmp_path))
+
+    rendered = (tmp_path / "tests" / "test_calc_adds.py").read_text()
+    assert rendered.startswith('"""\nTest: adds\nDescription: Adds two numbers\nType: unit\n"""')
+    assert 'inputs = {\n    "a": 1\n}' in rendered
+    assert "# No setup required" in rendered and "def test_adds():" in rendered
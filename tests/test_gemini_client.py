@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from typing import List
+from unittest.mock import AsyncMock, MagicMock
+from google.api_core import exceptions as google_exceptions
+from ai_agents._gemini_client import generate_validated, generate_with_retry, response_schema
+from ai_agents.architect import Component, TechStack
+
+def test_response_schema_inlines_list_items():
+    """Nested models are inlined and Optional fields become nullable."""
+    schema = response_schema(List[Component])
+
+    assert schema["type"] == "array"
+    item = schema["items"]
+    assert item["type"] == "object"
+    assert item["properties"]["testing_strategy"] == {
+        "type": "array", "items": {"type": "string"}, "nullable": True
+    }
+    assert "name" in item["required"]
+    assert "$ref" not in str(schema)
+
+def test_response_schema_encodes_free_form_maps_as_json_text():
+    """Dict fields are requested as JSON strings and decoded again on validation."""
+    schema = response_schema(TechStack)
+
+    assert schema["properties"]["version_constraints"]["type"] == "string"
+    assert schema["properties"]["version_constraints"]["nullable"] is True
+    assert "version_constraints" not in schema["required"]
+
+    stack = TechStack.model_validate_json(
+        '{"frontend": [], "backend": [], "database": [], "infrastructure": [], '
+        '"tools_and_services": [], "version_constraints": "{\\"python\\": \\">=3.9\\"}"}'
+    )
+    assert stack.version_constraints == {"python": ">=3.9"}
+
+@pytest.mark.asyncio
+async def test_generate_with_retry_backs_off_on_quota_errors(monkeypatch):
+    """A 429 is retried instead of failing the whole pipeline."""
+    monkeypatch.setattr(asyncio, "sleep", AsyncMock())
+    client = MagicMock()
+    client.generate_content_async = AsyncMock(side_effect=[
+        google_exceptions.ResourceExhausted("quota"),
+        MagicMock(text='{"ok": true}')
+    ])
+
+    text = await generate_with_retry(client, "prompt", namespace="test",
+                                     semaphore=asyncio.Semaphore(1))
+
+    assert text == '{"ok": true}'
+    assert client.generate_content_async.await_count == 2
+
+@pytest.mark.asyncio
+async def test_generate_validated_reasks_once_on_invalid_reply():
+    """A reply that fails validation is asked for again with the errors attached."""
+    client = MagicMock()
+    client.generate_content_async = AsyncMock(side_effect=[
+        MagicMock(text='{"frontend": "react"}'),
+        MagicMock(text='{"frontend": [], "backend": [], "database": [], '
+                       '"infrastructure": [], "tools_and_services": []}')
+    ])
+
+    result = await generate_validated(client, "prompt", namespace="test",
+                                      semaphore=asyncio.Semaphore(1), schema=TechStack)
+
+    assert isinstance(result, TechStack)
+    retry_prompt = client.generate_content_async.await_args_list[1].args[0]
+    assert retry_prompt.startswith("prompt") and "did not match" in retry_prompt
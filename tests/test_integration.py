@@ -327,6 +327,7 @@ def mock_gemini(mock_responses):
         return mock_response
     
     mock_client.generate_content = mock_generate_content
+    mock_client.generate_content_async = mock_generate_content
     
     with patch('google.generativeai.GenerativeModel', return_value=mock_client):
         yield mock_client
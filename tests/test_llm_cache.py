@@ -0,0 +1,212 @@
+import os
+import subprocess
+import sys
+import time
+import asyncio
+import pytest
+import numpy as np
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+from ai_agents._llm_cache import ResponseCache, cached_generate
+import ai_agents._llm_cache as llm_cache
+
+@pytest.fixture
+def response_cache(tmp_path, monkeypatch):
+    """Route cached_generate through a fresh cache in a temporary directory."""
+    cache = ResponseCache(directory=str(tmp_path))
+    monkeypatch.setattr(llm_cache, "get_response_cache", lambda persist=False: cache)
+    return cache
+
+def make_client(text):
+    client = MagicMock()
+    client.model_name = "models/gemini-2.0-flash"
+    client.cached_content = None
+    client.generate_content_async = AsyncMock(return_value=MagicMock(text=text))
+    return client
+
+@pytest.mark.asyncio
+async def test_exact_hit_skips_gemini(response_cache):
+    """A repeated prompt is served from disk without another API call."""
+    client = make_client('{"is_approved": true}')
+
+    first = await cached_generate(client, "validate this", namespace="test")
+    second = await cached_generate(client, "validate this", namespace="test")
+
+    assert first == second == '{"is_approved": true}'
+    assert client.generate_content_async.await_count == 1
+
+@pytest.mark.asyncio
+async def test_namespaces_do_not_share_entries(response_cache):
+    """The same prompt used by different call sites is cached separately."""
+    client = make_client("response")
+
+    await cached_generate(client, "prompt", namespace="first")
+    await cached_generate(client, "prompt", namespace="second")
+
+    assert client.generate_content_async.await_count == 2
+
+def test_key_includes_cached_context():
+    """Prompts run against different context caches never collide."""
+    plain = make_client("")
+    cached = make_client("")
+    cached.cached_content = "cachedContents/abc"
+
+    assert (ResponseCache.make_key(plain, "ns", "prompt")
+            != ResponseCache.make_key(cached, "ns", "prompt"))
+
+class FakeStream:
+    """Async-iterable stand-in for a streamed Gemini response."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.text = "".join(chunks)
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield MagicMock(text=chunk)
+
+@pytest.mark.asyncio
+async def test_stream_consumes_chunks_and_caches_full_text(response_cache):
+    """Streamed responses report each chunk and store the aggregated text."""
+    client = make_client("")
+    client.generate_content_async = AsyncMock(return_value=FakeStream(['[{"a"', ': 1}]']))
+    seen = []
+
+    text = await cached_generate(client, "prompt", namespace="test",
+                                 stream=True, on_chunk=seen.append)
+
+    assert text == '[{"a": 1}]'
+    assert seen == ['[{"a"', ': 1}]']
+    assert client.generate_content_async.await_args.kwargs["stream"] is True
+    assert await cached_generate(client, "prompt", namespace="test", stream=True) == text
+    assert client.generate_content_async.await_count == 1
+
+def test_semantic_index_survives_restart(tmp_path):
+    """Indexed prompt embeddings are reloaded by a new cache on the same directory."""
+    vector = np.array([0.6, 0.8], dtype=np.float32)
+    ResponseCache(directory=str(tmp_path), similarity_threshold=0.95).add_vector("test", "abc", vector)
+
+    reloaded = ResponseCache(directory=str(tmp_path), similarity_threshold=0.95)
+
+    assert reloaded.find_similar("test", vector) == "abc"
+    assert reloaded.find_similar("other", vector) is None
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_share_one_request(monkeypatch):
+    """Identical prompts issued together make a single call, even with the cache off."""
+    monkeypatch.setattr(llm_cache, "get_response_cache", lambda persist=False: None)
+    release = asyncio.Event()
+
+    async def generate_content_async(prompt, **kwargs):
+        await release.wait()
+        return MagicMock(text="shared")
+
+    client = make_client("")
+    client.generate_content_async = AsyncMock(side_effect=generate_content_async)
+
+    calls = [asyncio.create_task(cached_generate(client, "same", namespace="test")) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*calls) == ["shared"] * 3
+    assert client.generate_content_async.await_count == 1
+    assert not llm_cache._inflight
+
+@pytest.mark.asyncio
+async def test_request_options_are_part_of_the_key(response_cache):
+    """The same prompt sent with a different generation config is not served the old reply."""
+    client = make_client("response")
+
+    await cached_generate(client, "prompt", namespace="test", generation_config={"top_k": 1})
+    await cached_generate(client, "prompt", namespace="test", generation_config={"top_k": 2})
+    await cached_generate(client, "prompt", namespace="test", generation_config={"top_k": 1})
+
+    assert client.generate_content_async.await_count == 2
+
+@pytest.mark.asyncio
+async def test_sampled_requests_bypass_the_disk_cache(response_cache):
+    """Requests with a non-zero temperature always reach Gemini."""
+    client = make_client("idea")
+
+    for _ in range(2):
+        await cached_generate(client, "brainstorm", namespace="test",
+                              generation_config={"temperature": 0.7})
+
+    assert client.generate_content_async.await_count == 2
+    assert not list(response_cache.directory.glob("*.txt"))
+
+@pytest.mark.asyncio
+async def test_rejected_replies_are_not_stored(response_cache):
+    """A reply that fails ``validate`` is never written to disk."""
+    client = make_client("not json")
+
+    def validate(text):
+        raise ValueError(text)
+
+    with pytest.raises(ValueError):
+        await cached_generate(client, "prompt", namespace="test", validate=validate)
+
+    assert not list(response_cache.directory.glob("*.txt"))
+
+@pytest.mark.asyncio
+async def test_stored_reply_failing_validation_is_refetched(response_cache):
+    """Entries written before a schema change are dropped instead of served forever."""
+    client = make_client('{"new": 1}')
+    key = ResponseCache.make_key(client, "test", "prompt")
+    response_cache.set(key, '{"old": 1}')
+
+    def validate(text):
+        if "new" not in text:
+            raise ValueError(text)
+
+    text = await cached_generate(client, "prompt", namespace="test", validate=validate)
+
+    assert text == '{"new": 1}'
+    assert response_cache.get(key) == '{"new": 1}'
+    assert client.generate_content_async.await_count == 1
+
+def test_expired_entries_are_dropped(tmp_path):
+    """Replies older than the TTL are treated as misses and removed."""
+    cache = ResponseCache(directory=str(tmp_path), ttl=60)
+    cache.set("abc", "stale")
+    path = tmp_path / "abc.txt"
+    os.utime(path, (time.time() - 120, time.time() - 120))
+
+    assert cache.get("abc") is None
+    assert not path.exists()
+
+def test_oldest_entries_are_pruned_over_the_size_cap(tmp_path):
+    """Writing past ``max_entries`` evicts the least recently written replies."""
+    cache = ResponseCache(directory=str(tmp_path), max_entries=2)
+    for age, key in enumerate(["c", "b", "a"]):
+        cache.set(key, key)
+        os.utime(tmp_path / f"{key}.txt", (time.time() - 10 * (3 - age),) * 2)
+    cache.set("d", "d")
+
+    assert sorted(p.stem for p in tmp_path.glob("*.txt")) == ["a", "d"]
+
+def test_disk_cache_is_opt_in(monkeypatch, tmp_path):
+    """Unset, only persisting call sites get the cache; =1 enables and =0 disables it for all."""
+    monkeypatch.setenv("GEMINI_RESPONSE_CACHE_DIR", str(tmp_path))
+    llm_cache._shared_response_cache.cache_clear()
+    try:
+        monkeypatch.delenv("GEMINI_RESPONSE_CACHE", raising=False)
+        assert llm_cache.get_response_cache() is None
+        assert llm_cache.get_response_cache(persist=True).directory == tmp_path
+
+        monkeypatch.setenv("GEMINI_RESPONSE_CACHE", "1")
+        assert llm_cache.get_response_cache() is not None
+
+        monkeypatch.setenv("GEMINI_RESPONSE_CACHE", "0")
+        assert llm_cache.get_response_cache(persist=True) is None
+    finally:
+        llm_cache._shared_response_cache.cache_clear()
+
+def test_agents_import_without_numpy():
+    """numpy is only needed by the semantic tier, not to import the agents."""
+    code = ("import sys; sys.modules['numpy'] = None; "
+            "import ai_agents.base_agent, ai_agents._gemini_client")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=Path(__file__).resolve().parent.parent)
+
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,76 @@
+import os
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+from ai_agents.monitoring_analyst import MonitoringAnalyst
+
+@pytest.fixture
+def analyst():
+    with patch.dict(os.environ, {'GEMINI_API_KEY': 'dummy_key'}), \
+         patch('boto3.client'), \
+         patch('google.generativeai.GenerativeModel'):
+        return MonitoringAnalyst()
+
+@pytest.mark.asyncio
+async def test_analyze_user_behavior_batches_and_merges(analyst):
+    """Logs are analyzed a batch at a time and the batch analyses merged once."""
+    consumed = []
+
+    def events():
+        for i in range(5):
+            consumed.append(i)
+            yield {"message": f"event-{i}"}
+
+    with patch.object(analyst, 'get_completion', new=AsyncMock(side_effect=["A", "B", "C", "Merged"])) as completion:
+        result = await analyst.analyze_user_behavior(events(), batch_size=2)
+
+    assert result == {"content": "Merged"}
+    prompts = [call.args[0] for call in completion.call_args_list]
+    assert "event-0" in prompts[0] and "event-2" not in prompts[0]
+    assert "event-4" in prompts[2]
+    assert "A\n\n---\n\nB\n\n---\n\nC" in prompts[3]
+    assert consumed == [0, 1, 2, 3, 4]
+
+@pytest.mark.asyncio
+async def test_analyze_user_behavior_skips_the_model_without_logs(analyst):
+    """An empty log stream is reported without a model call."""
+    with patch.object(analyst, 'get_completion', new=AsyncMock()) as completion:
+        result = await analyst.analyze_user_behavior(iter([]))
+
+    assert result == {"content": ""}
+    completion.assert_not_called()
+
+def test_collect_logs_returns_every_event(analyst):
+    """collect_logs still returns the events of all pages as one list."""
+    analyst.logs.get_paginator.return_value.paginate.return_value = [
+        {"events": [{"id": 1}, {"id": 2}]}, {"events": [{"id": 3}]}]
+
+    logs = analyst.collect_logs(datetime(2024, 1, 1), datetime(2024, 1, 2), "app")
+
+    assert logs == [{"id": 1}, {"id": 2}, {"id": 3}]
+
+def test_iter_logs_yields_events_page_by_page(analyst):
+    """Pages are fetched only as events are consumed."""
+    pages = iter([{"events": [{"id": 1}, {"id": 2}]}, {"events": [{"id": 3}]}])
+    analyst.logs.get_paginator.return_value.paginate.return_value = pages
+
+    events = analyst.iter_logs(datetime(2024, 1, 1), datetime(2024, 1, 2), "app")
+
+    assert next(events) == {"id": 1}
+    assert next(events) == {"id": 2}
+    assert next(pages) == {"events": [{"id": 3}]}
+
+def test_collect_metrics_makes_one_request(analyst):
+    """CPU and memory are queried together and split by query id."""
+    analyst.cloudwatch.get_metric_data.return_value = {"MetricDataResults": [
+        {"Id": "memory", "Values": [40.0]},
+        {"Id": "cpu", "Values": [12.5]},
+    ]}
+
+    metrics = analyst.collect_metrics(datetime(2024, 1, 1), datetime(2024, 1, 2))
+
+    analyst.cloudwatch.get_metric_data.assert_called_once()
+    queries = analyst.cloudwatch.get_metric_data.call_args.kwargs["MetricDataQueries"]
+    assert [query["Id"] for query in queries] == ["cpu", "memory"]
+    assert metrics == {"cpu": [{"Id": "cpu", "Values": [12.5]}],
+                       "memory": [{"Id": "memory", "Values": [40.0]}]}
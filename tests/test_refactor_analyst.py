@@ -2,7 +2,7 @@ import pytest
 import os
 from pathlib import Path
 import json
-from unittest.mock import patch, MagicMock
+from unittest.mock import AsyncMock, patch, MagicMock
 from ai_agents.refactor_analyst import RefactorAnalyst
 
 # Sample test data
@@ -124,7 +124,7 @@ Modern Practices:
 - Add type hints
 """)
     
-    with patch('google.generativeai.GenerativeModel.generate_content', 
+    with patch('google.generativeai.GenerativeModel.generate_content_async', new_callable=AsyncMock,
                return_value=mock_response):
         analysis = await refactor_analyst.analyze_code_quality(SAMPLE_CODE)
         
@@ -160,7 +160,7 @@ Optimization Opportunities:
 - Extract common dependencies
 """)
     
-    with patch('google.generativeai.GenerativeModel.generate_content', 
+    with patch('google.generativeai.GenerativeModel.generate_content_async', new_callable=AsyncMock,
                return_value=mock_response):
         analysis = await refactor_analyst.analyze_dependencies({"test.py": SAMPLE_CODE})
         
@@ -196,7 +196,7 @@ Timeline:
 - Requires coordination
 """)
     
-    with patch('google.generativeai.GenerativeModel.generate_content', 
+    with patch('google.generativeai.GenerativeModel.generate_content_async', new_callable=AsyncMock,
                return_value=mock_response):
         impact = await refactor_analyst.assess_refactor_impact(
             [{"name": "Auth Refactor", "description": "Update auth system"}],
@@ -248,7 +248,7 @@ class IDatabase(ABC):
 ```
 """)
     
-    with patch('google.generativeai.GenerativeModel.generate_content', 
+    with patch('google.generativeai.GenerativeModel.generate_content_async', new_callable=AsyncMock,
                return_value=mock_response):
         code = "class UserService:\n    def __init__(self):\n        self.db = Database()"
         analysis = {
@@ -284,7 +284,7 @@ async def test_update_cursor_rules(refactor_analyst):
 ]
 """)
     
-    with patch('google.generativeai.GenerativeModel.generate_content', 
+    with patch('google.generativeai.GenerativeModel.generate_content_async', new_callable=AsyncMock,
                return_value=mock_response):
         suggestions = [{
             "title": "Implement Dependency Injection",
@@ -0,0 +1,47 @@
+from ai_agents._summarize import summarize_python
+
+SOURCE = '''"""Billing helpers."""
+import math
+
+RATE = 0.2
+LOOKUP = {
+    "a": 1,
+}
+
+@cached
+def total(items: list,
+          tax: float = RATE) -> float:
+    """Sum the items with tax."""
+    subtotal = sum(items)
+    taxed = subtotal * (1 + tax)
+    rounded = math.ceil(taxed)
+    return rounded
+
+class Invoice:
+    """A customer invoice."""
+    currency: str = "EUR"
+
+    def pay(self): return True
+'''
+
+def test_summarize_python_keeps_the_outline():
+    """Signatures, docstrings and short statements survive; long bodies and multi-line constants are cut."""
+    assert summarize_python(SOURCE, max_body_lines=2) == '''"""Billing helpers."""
+import math
+RATE = 0.2
+@cached
+def total(items: list,
+          tax: float = RATE) -> float:
+    """Sum the items with tax."""
+    subtotal = sum(items)
+    taxed = subtotal * (1 + tax)
+    ...
+class Invoice:
+    """A customer invoice."""
+    currency: str = "EUR"
+    def pay(self): return True
+'''
+
+def test_summarize_python_returns_unparsable_source_unchanged():
+    """Files that are not valid Python are sent as they are."""
+    assert summarize_python("def broken(:\n") == "def broken(:\n"